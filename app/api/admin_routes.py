@@ -0,0 +1,70 @@
+"""运维管理 API（需要 X-Admin-Token）"""
+
+import hmac
+import logging
+from functools import wraps
+
+from flask import Blueprint, request
+
+from app.api.responses import success_response, error_response
+from app.settings import Config
+from app.utils.profiler import request_profiler
+
+logger = logging.getLogger('code996.api.admin')
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/dashboard/admin')
+
+
+def require_admin_token(view):
+    """校验 X-Admin-Token；未配置 ADMIN_TOKEN 时管理接口整体关闭"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return error_response(403, "未配置 ADMIN_TOKEN，管理接口已关闭")
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token, Config.ADMIN_TOKEN):
+            return error_response(401, "管理令牌无效")
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@admin_bp.route('/profile', methods=['GET'])
+@require_admin_token
+def get_profile_status():
+    """当前 worker 的剖析状态"""
+    return success_response(request_profiler.status())
+
+
+@admin_bp.route('/profile', methods=['POST'])
+@require_admin_token
+def start_profile():
+    """
+    在处理本请求的 worker 中为接下来的请求开启剖析
+
+    参数（query 或 JSON）:
+        requests: 剖析接下来的请求数
+        seconds: 剖析持续时间（秒）
+    两者都不指定时剖析接下来的 PROFILE_DEFAULT_REQUESTS 个请求
+    """
+    params = dict(request.args)
+    params.update(request.get_json(silent=True) or {})
+    try:
+        requests_count = int(params['requests']) if params.get('requests') not in (None, '') else None
+        seconds = float(params['seconds']) if params.get('seconds') not in (None, '') else None
+        if requests_count is None and seconds is None:
+            requests_count = Config.PROFILE_DEFAULT_REQUESTS
+        status = request_profiler.arm(requests=requests_count, seconds=seconds)
+    except (TypeError, ValueError) as exc:
+        return error_response(400, f"参数错误: {exc}")
+
+    logger.warning(f"管理接口开启请求剖析: {status}")
+    return success_response(status, message="剖析已开启")
+
+
+@admin_bp.route('/profile', methods=['DELETE'])
+@require_admin_token
+def stop_profile():
+    """关闭当前 worker 的剖析"""
+    return success_response(request_profiler.disarm(), message="剖析已关闭")
@@ -2,7 +2,7 @@
 
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from typing import Optional, TYPE_CHECKING
 
 from flask import Blueprint, jsonify, request
@@ -95,6 +95,7 @@ def get_ai_ratio():
         logger.warning("未找到项目本地映射, 使用默认比例: %s", repo)
         return _return_default_ratio(cache_key)
     local_path = entry.path
+    stats_service.sync_working_tree(local_path, project_id=entry.project_id)
 
     max_files = None
     if ai_analyzer and ai_analyzer.config and ai_analyzer.config.max_files is not None:
@@ -152,36 +153,35 @@ def get_ai_ratio():
     analyzed_files = 0
 
     if ai_analyzer and ai_analyzer.enabled:
-        max_workers = max(1, int(Config.AI_ANALYZER_CONCURRENCY or 5))
         logger.info(
             "开始进行 AI 代码检测: files=%s, concurrency=%s, size_limit=%s, char_limit=%s",
             len(samples),
-            max_workers,
+            ai_analyzer.concurrency,
             max_file_size,
             max_characters,
         )
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_map = {
-                executor.submit(ai_analyzer.analyze_content, sample.path, sample.content): sample
-                for sample in samples
-            }
-
-            for future in as_completed(future_map):
-                sample = future_map[future]
-                try:
-                    percentage = future.result()
-                except Exception as exc:  # pragma: no cover
-                    logger.error("AI 分析执行异常 [%s]: %s", sample.path, exc)
-                    continue
-
-                if percentage is None:
-                    logger.debug("AI 分析无结果 [%s]", sample.path)
-                    continue
-
-                analyzed_files += 1
-                ratios.append(percentage)
-                logger.debug("AI 分析结果 [%s]: %.2f%%", sample.path, percentage)
+        # 进程内共享的有界线程池：多个并发请求合计最多 concurrency 个 LLM 调用
+        future_map = {
+            ai_analyzer.submit(sample.path, sample.content): sample
+            for sample in samples
+        }
+
+        for future in as_completed(future_map):
+            sample = future_map[future]
+            try:
+                percentage = future.result()
+            except Exception as exc:  # pragma: no cover
+                logger.error("AI 分析执行异常 [%s]: %s", sample.path, exc)
+                continue
+
+            if percentage is None:
+                logger.debug("AI 分析无结果 [%s]", sample.path)
+                continue
+
+            analyzed_files += 1
+            ratios.append(percentage)
+            logger.debug("AI 分析结果 [%s]: %.2f%%", sample.path, percentage)
     else:
         logger.warning("AIAnalyzer 未启用, 使用默认比例 50%%")
 
@@ -0,0 +1,14 @@
+"""Prometheus 指标导出接口"""
+
+from flask import Blueprint, Response
+
+from app.utils.metrics import metrics
+
+# 不加 /api 前缀：Prometheus 约定的抓取路径，且不经过 Nginx 的 /api/ 代理对外暴露
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def export_metrics():
+    """以 Prometheus 文本格式导出指标（多 worker 时合并所有 worker 的数据）"""
+    return Response(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,9 +2,12 @@
 API 响应格式化
 """
 
+import json
 from flask import jsonify
 from typing import Any, Optional
 
+from app.utils.request_timing import span
+
 
 def success_response(data: Any, message: str = "success") -> tuple:
     """
@@ -17,11 +20,13 @@ def success_response(data: Any, message: str = "success") -> tuple:
     Returns:
         (JSON, status_code)
     """
-    return jsonify({
-        "code": 200,
-        "message": message,
-        "data": data
-    }), 200
+    with span('serialize'):
+        body = jsonify({
+            "code": 200,
+            "message": message,
+            "data": data
+        })
+    return body, 200
 
 
 def error_response(code: int, message: str, data: Optional[Any] = None) -> tuple:
@@ -42,3 +47,17 @@ def error_response(code: int, message: str, data: Optional[Any] = None) -> tuple
         "data": data
     }), code
 
+
+def sse_event(event: str, data: Any) -> str:
+    """
+    格式化一条 Server-Sent Events 消息
+    
+    Args:
+        event: 事件名
+        data: 事件数据（序列化为单行 JSON）
+    
+    Returns:
+        以空行结尾的 SSE 文本
+    """
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -2,9 +2,21 @@
 API 路由定义
 """
 
-from flask import Blueprint, request
-from app.api.validators import validate_projects_param
-from app.api.responses import success_response, error_response
+from typing import Optional
+from flask import Blueprint, Response, request, stream_with_context
+from app.api.validators import (
+    validate_projects_param,
+    validate_date_range,
+    validate_max_count,
+    validate_interval_param,
+    validate_timeseries_range,
+    validate_pagination,
+    validate_sort_param,
+)
+from app.services.contributor_index import ContributorIndex, ContributorIndexCache, DEFAULT_SORT, SORT_FIELDS
+from app.services.stats_service import FetchOutcome
+from app.api.responses import success_response, error_response, sse_event
+from app.api.warmup import dashboard_warmup
 from app.settings import Config
 from app.config.projects import projects_config
 import logging
@@ -18,6 +30,16 @@ api_bp = Blueprint('api', __name__, url_prefix='/api/dashboard')
 stats_service = None
 cache_service = None
 
+# 部分项目未按时完成时的响应消息（数据不写入缓存）
+PARTIAL_MESSAGE = "部分项目数据未就绪"
+
+# 响应缓存时间；有项目失败的结果只短暂缓存，避免一个坏项目让每个请求都重新拉取全部项目
+CACHE_TTL = 300
+FAILED_CACHE_TTL = 30
+
+# 进程内的预排序贡献者索引（与缓存键一一对应）
+contributor_indexes = ContributorIndexCache(ttl=300)
+
 
 def init_services(stats_svc, cache_svc):
     """初始化服务实例"""
@@ -31,6 +53,22 @@ def _parse_force_refresh() -> bool:
     return value in ('1', 'true', 'yes', 'y')
 
 
+def _parse_commit_window() -> dict:
+    """解析 since/until/max_count 查询参数"""
+    since, until = validate_date_range(request.args.get('since'), request.args.get('until'))
+    max_count = validate_max_count(request.args.get('max_count'))
+    return {"since": since, "until": until, "max_count": max_count}
+
+
+def _build_cache_key(prefix: str, projects: list[str], window: dict) -> str:
+    """生成缓存键，时间窗口参数作为键的一部分"""
+    key = f"{prefix}:{','.join(sorted(projects))}"
+    for name in ('since', 'until', 'max_count'):
+        if window.get(name):
+            key += f"|{name}={window[name]}"
+    return key
+
+
 def _resolve_default_projects() -> list[str]:
     configured = [project for project in Config.DEFAULT_PROJECTS if project]
     if configured:
@@ -65,6 +103,9 @@ def get_summary():
     
     Query Parameters:
         projects: 逗号分隔的项目名称列表
+        since: 开始日期 (YYYY-MM-DD，可选)
+        until: 结束日期 (YYYY-MM-DD，可选)
+        max_count: 每个项目最多读取的 commit 数（可选）
     
     Returns:
         JSON: 汇总统计数据
@@ -74,9 +115,10 @@ def get_summary():
         projects_param = request.args.get('projects', '')
         projects = validate_projects_param(projects_param)
         force_refresh = _parse_force_refresh()
+        window = _parse_commit_window()
         
         # 2. 生成缓存键
-        cache_key = f"summary:{','.join(sorted(projects))}"
+        cache_key = _build_cache_key('summary', projects, window)
         
         # 3. 检查缓存
         if force_refresh:
@@ -89,25 +131,13 @@ def get_summary():
         
         # 4. 获取数据
         logger.info(f"开始处理项目: {projects}")
-        stats = stats_service.fetch_multi_project_stats(projects, force_refresh=force_refresh)
+        stats = stats_service.fetch_multi_project_stats(projects, force_refresh=force_refresh, **window)
         
         # 5. 格式化响应
-        data = {
-            "start_date": stats.start_date,
-            "end_date": stats.end_date,
-            "total_count": stats.total_count,
-            "repo_count": stats.repo_count,
-            "hour_data": stats.hour_data,
-            "week_data": stats.week_data,
-            "work_hour_pl": stats.work_hour_pl,
-            "work_week_pl": stats.work_week_pl,
-            "index_996": stats.index_996,
-            "overtime_ratio": stats.overtime_ratio,
-            "is_standard": stats.is_standard
-        }
-        
-        # 6. 写入缓存 (5 分钟)
-        cache_service.set(cache_key, data, ttl=300)
+        data = _summary_data(stats)
+        
+        # 6. 写入缓存 (5 分钟)，有项目未完成时不缓存部分结果
+        _cache_response(cache_key, data)
         
         return success_response(data)
         
@@ -120,6 +150,91 @@ def get_summary():
         return error_response(500, "服务器内部错误")
 
 
+@api_bp.route('/summary/stream', methods=['GET'])
+def stream_summary():
+    """
+    以 Server-Sent Events 渐进返回汇总数据
+    
+    Query Parameters:
+        与 /summary 相同
+    
+    Events:
+        progress: 每完成一个项目推送一次 {"progress", "data"}，data 为已完成项目的合并统计
+        complete: 最终结果 {"progress", "data"}（与 /summary 的 data 相同，完整时写入同一缓存）
+        error: 处理失败 {"code", "message"}
+    """
+    try:
+        # 1. 参数验证
+        projects_param = request.args.get('projects', '')
+        projects = validate_projects_param(projects_param)
+        force_refresh = _parse_force_refresh()
+        window = _parse_commit_window()
+    except ValueError as e:
+        logger.warning(f"参数错误: {str(e)}")
+        return error_response(400, f"参数错误: {str(e)}")
+
+    # 2. 生成缓存键（与 /summary 共用）
+    cache_key = _build_cache_key('summary', projects, window)
+
+    def generate():
+        # 3. 检查缓存
+        if force_refresh:
+            cache_service.delete(cache_key)
+        else:
+            cached_data = cache_service.get(cache_key)
+            if cached_data:
+                logger.info(f"缓存命中: {cache_key}")
+                progress = {"completed": len(projects), "total": len(projects), "finished": True}
+                yield sse_event('complete', {"progress": progress, "data": cached_data})
+                return
+
+        # 4. 逐个项目推送
+        logger.info(f"开始流式处理项目: {projects}")
+        try:
+            for progress, stats in stats_service.stream_multi_project_stats(
+                projects, force_refresh=force_refresh, **window
+            ):
+                data = _summary_data(stats)
+                if not progress["finished"]:
+                    yield sse_event('progress', {"progress": progress, "data": data})
+                    continue
+
+                # 5. 写入缓存 (5 分钟)，有项目未完成时不缓存部分结果
+                _cache_response(cache_key, data)
+                yield sse_event('complete', {"progress": progress, "data": data})
+        except Exception as e:
+            logger.error(f"服务器错误: {str(e)}", exc_info=True)
+            yield sse_event('error', {"code": 500, "message": "服务器内部错误"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # 关闭 nginx 对该响应的缓冲，事件才能实时到达浏览器
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+def _summary_data(stats) -> dict:
+    return {
+        "start_date": stats.start_date,
+        "end_date": stats.end_date,
+        "total_count": stats.total_count,
+        "repo_count": stats.repo_count,
+        "hour_data": stats.hour_data,
+        "week_data": stats.week_data,
+        "work_hour_pl": stats.work_hour_pl,
+        "work_week_pl": stats.work_week_pl,
+        "index_996": stats.index_996,
+        "overtime_ratio": stats.overtime_ratio,
+        "is_standard": stats.is_standard,
+        "failed_projects": stats.failed_projects,
+        "pending_projects": stats.pending_projects,
+    }
+
+
 @api_bp.route('/defaults', methods=['GET'])
 def get_default_projects():
     try:
@@ -140,18 +255,188 @@ def get_contributors():
     
     Query Parameters:
         projects: 逗号分隔的项目名称列表
+        since: 开始日期 (YYYY-MM-DD，可选)
+        until: 结束日期 (YYYY-MM-DD，可选)
+        max_count: 每个项目最多读取的 commit 数（可选）
+        limit / offset: 分页参数（可选）
+        sort / order: 排序字段与方向（可选）
+        email_prefix: 按邮箱前缀过滤（可选）
     
     Returns:
-        JSON: 贡献者列表（按 commits 降序）
+        JSON: 贡献者列表（按贡献度降序）；带分页/排序/过滤参数时返回
+              {"total", "offset", "limit", "sort", "order", "items"}
     """
     try:
         # 1. 参数验证
         projects_param = request.args.get('projects', '')
         projects = validate_projects_param(projects_param)
         force_refresh = _parse_force_refresh()
+        window = _parse_commit_window()
+        query = _parse_contributor_query()
         
         # 2. 生成缓存键
-        cache_key = f"contributors:{','.join(sorted(projects))}"
+        cache_key = _build_cache_key('contributors', projects, window)
+        
+        # 3. 检查缓存
+        contributors = None
+        if force_refresh:
+            cache_service.delete(cache_key)
+            cache_service.delete_prefix(_top_key_prefix(cache_key))
+            contributor_indexes.delete(cache_key)
+        elif query is None:
+            contributors = cache_service.get(cache_key)
+            if contributors:
+                logger.info(f"缓存命中: {cache_key}")
+                return success_response(contributors)
+        else:
+            index = contributor_indexes.get(cache_key)
+            if index is not None:
+                logger.info(f"贡献者索引命中: {cache_key}")
+                return success_response(_contributor_page(index, query))
+            contributors = cache_service.get(cache_key)
+            if not contributors and _is_top_page(query):
+                return success_response(
+                    _top_contributors_page(projects, window, query, cache_key)
+                )
+        
+        # 4. 获取数据
+        outcome = FetchOutcome()
+        if not contributors:
+            logger.info(f"开始获取贡献者: {projects}")
+            contributors, outcome = stats_service.fetch_multi_project_contributors(
+                projects, force_refresh=force_refresh, **window
+            )
+            
+            # 5. 写入缓存 (5 分钟)，有项目未完成时不缓存部分结果
+            if outcome.complete:
+                cache_service.set(cache_key, contributors, ttl=CACHE_TTL)
+
+        if query is None:
+            if not outcome.complete:
+                return success_response(contributors, message=PARTIAL_MESSAGE)
+            return success_response(contributors)
+
+        index = ContributorIndex(contributors)
+        if outcome.complete:
+            contributor_indexes.set(cache_key, index)
+        return success_response(_contributor_page(index, query, outcome))
+        
+    except ValueError as e:
+        logger.warning(f"参数错误: {str(e)}")
+        return error_response(400, f"参数错误: {str(e)}")
+    
+    except Exception as e:
+        logger.error(f"服务器错误: {str(e)}", exc_info=True)
+        return error_response(500, "服务器内部错误")
+
+
+def _parse_contributor_query() -> Optional[dict]:
+    """解析贡献者分页/排序/过滤参数，均未提供时返回 None（保持返回完整列表）"""
+    names = ('limit', 'offset', 'sort', 'order', 'email_prefix')
+    if not any(request.args.get(name) for name in names):
+        return None
+
+    limit, offset = validate_pagination(request.args.get('limit'), request.args.get('offset'))
+    sort, order = validate_sort_param(request.args.get('sort'), request.args.get('order'), SORT_FIELDS)
+    email_prefix = (request.args.get('email_prefix') or '').strip() or None
+    return {"limit": limit, "offset": offset, "sort": sort, "order": order, "email_prefix": email_prefix}
+
+
+def _is_top_page(query: dict) -> bool:
+    """是否只请求默认排序下的第一页（可以用 top-K 部分排序代替全量排序）"""
+    return (
+        query["limit"] is not None
+        and query["offset"] == 0
+        and query["sort"] == DEFAULT_SORT
+        and query["order"] in (None, 'desc')
+        and not query["email_prefix"]
+    )
+
+
+def _top_key_prefix(cache_key: str) -> str:
+    """各个 top-K 分页缓存键的公共前缀（force_refresh 时整体清除）"""
+    return f"{cache_key}|top="
+
+
+def _top_contributors_page(projects: list[str], window: dict, query: dict, cache_key: str) -> dict:
+    top_key = f"{_top_key_prefix(cache_key)}{query['limit']}"
+    page = cache_service.get(top_key)
+    if page:
+        logger.info(f"缓存命中: {top_key}")
+        return page
+
+    logger.info(f"开始获取 top {query['limit']} 贡献者: {projects}")
+    items, total, outcome = stats_service.fetch_multi_project_top_contributors(
+        projects, query["limit"], **window
+    )
+    page = {
+        "total": total,
+        "offset": 0,
+        "limit": query["limit"],
+        "sort": DEFAULT_SORT,
+        "order": 'desc',
+        "items": items,
+        **outcome.to_dict(),
+    }
+    _cache_response(top_key, page)
+    return page
+
+
+def _contributor_page(index: ContributorIndex, query: dict, outcome: Optional[FetchOutcome] = None) -> dict:
+    total, items = index.page(**query)
+    return {
+        "total": total,
+        "offset": query["offset"],
+        "limit": query["limit"],
+        "sort": query["sort"],
+        "order": query["order"] or ('asc' if query["sort"] in ('name', 'email') else 'desc'),
+        "items": items,
+        **(outcome or FetchOutcome()).to_dict(),
+    }
+
+
+def _cache_response(cache_key: str, data: dict) -> None:
+    """
+    写入响应缓存
+
+    有项目超过截止时间仍在后台拉取（pending_projects）时不缓存，下一个请求就能拿到完整结果；
+    有项目失败（failed_projects）时结果中已标明失败的项目，只缓存 FAILED_CACHE_TTL 秒。
+    """
+    if data.get("pending_projects"):
+        return
+    cache_service.set(cache_key, data, ttl=FAILED_CACHE_TTL if data.get("failed_projects") else CACHE_TTL)
+
+
+@api_bp.route('/contributors/<email>', methods=['GET'])
+def get_contributor_detail(email: str):
+    """
+    获取单个贡献者详情接口
+    
+    Query Parameters:
+        projects: 逗号分隔的项目名称列表
+        since: 开始日期 (YYYY-MM-DD，可选)
+        until: 结束日期 (YYYY-MM-DD，可选)
+        max_count: 每个项目最多读取的 commit 数（可选）
+        limit: 返回的最近提交数（默认 20，最大 200）
+    
+    Returns:
+        JSON: 该贡献者的按小时 / 星期分布、按项目汇总和最近提交
+    """
+    try:
+        # 1. 参数验证
+        projects_param = request.args.get('projects', '')
+        projects = validate_projects_param(projects_param)
+        force_refresh = _parse_force_refresh()
+        window = _parse_commit_window()
+        email = email.strip()
+        if not email:
+            raise ValueError("email 不能为空")
+        recent_limit, _ = validate_pagination(request.args.get('limit'), None, max_limit=200)
+        recent_limit = recent_limit or 20
+        
+        # 2. 生成缓存键
+        cache_key = _build_cache_key(f'contributor:{email}', projects, window)
+        cache_key += f"|limit={recent_limit}"
         
         # 3. 检查缓存
         if force_refresh:
@@ -163,13 +448,129 @@ def get_contributors():
                 return success_response(cached_data)
         
         # 4. 获取数据
-        logger.info(f"开始获取贡献者: {projects}")
-        contributors = stats_service.fetch_multi_project_contributors(projects, force_refresh=force_refresh)
+        logger.info(f"开始获取贡献者详情: {email} {projects}")
+        data, outcome = stats_service.fetch_contributor_detail(
+            projects, email, force_refresh=force_refresh, recent_limit=recent_limit, **window
+        )
+        if data is None:
+            if not outcome.complete:
+                # 该作者的提交可能在尚未完成 / 失败的项目中，与汇总接口一样返回部分结果状态而不是 404
+                return success_response({"email": email, **outcome.to_dict()}, message=PARTIAL_MESSAGE)
+            return error_response(404, f"未找到贡献者: {email}", data=outcome.to_dict())
         
-        # 5. 写入缓存 (5 分钟)
-        cache_service.set(cache_key, contributors, ttl=300)
+        # 5. 写入缓存 (5 分钟)，有项目未完成时不缓存部分结果
+        _cache_response(cache_key, data)
         
-        return success_response(contributors)
+        if not outcome.complete:
+            return success_response(data, message=PARTIAL_MESSAGE)
+        return success_response(data)
+        
+    except ValueError as e:
+        logger.warning(f"参数错误: {str(e)}")
+        return error_response(400, f"参数错误: {str(e)}")
+    
+    except Exception as e:
+        logger.error(f"服务器错误: {str(e)}", exc_info=True)
+        return error_response(500, "服务器内部错误")
+
+
+@api_bp.route('/heatmap', methods=['GET'])
+def get_heatmap():
+    """
+    获取星期 × 小时提交热力图接口
+    
+    Query Parameters:
+        projects: 逗号分隔的项目名称列表
+        since: 开始日期 (YYYY-MM-DD，可选)
+        until: 结束日期 (YYYY-MM-DD，可选)
+        max_count: 每个项目最多读取的 commit 数（可选）
+    
+    Returns:
+        JSON: 7 × 24 的提交数矩阵（行为周一至周日，列为 00-23 时）
+    """
+    try:
+        # 1. 参数验证
+        projects_param = request.args.get('projects', '')
+        projects = validate_projects_param(projects_param)
+        force_refresh = _parse_force_refresh()
+        window = _parse_commit_window()
+        
+        # 2. 生成缓存键
+        cache_key = _build_cache_key('heatmap', projects, window)
+        
+        # 3. 检查缓存
+        if force_refresh:
+            cache_service.delete(cache_key)
+        else:
+            cached_data = cache_service.get(cache_key)
+            if cached_data:
+                logger.info(f"缓存命中: {cache_key}")
+                return success_response(cached_data)
+        
+        # 4. 获取数据
+        logger.info(f"开始获取提交热力图: {projects}")
+        data = stats_service.fetch_multi_project_heatmap(projects, force_refresh=force_refresh, **window)
+        
+        # 5. 写入缓存 (5 分钟)，有项目未完成时不缓存部分结果
+        _cache_response(cache_key, data)
+        
+        return success_response(data)
+        
+    except ValueError as e:
+        logger.warning(f"参数错误: {str(e)}")
+        return error_response(400, f"参数错误: {str(e)}")
+    
+    except Exception as e:
+        logger.error(f"服务器错误: {str(e)}", exc_info=True)
+        return error_response(500, "服务器内部错误")
+
+
+@api_bp.route('/timeseries', methods=['GET'])
+def get_timeseries():
+    """
+    获取提交趋势接口
+    
+    Query Parameters:
+        projects: 逗号分隔的项目名称列表
+        since: 开始日期 (YYYY-MM-DD，可选)
+        until: 结束日期 (YYYY-MM-DD，可选)
+        interval: day（默认）或 week
+    
+    Returns:
+        JSON: 按天 / 按周的提交数、增删行数与加班比例
+    """
+    try:
+        # 1. 参数验证
+        projects_param = request.args.get('projects', '')
+        projects = validate_projects_param(projects_param)
+        force_refresh = _parse_force_refresh()
+        since, until = validate_date_range(request.args.get('since'), request.args.get('until'))
+        interval = validate_interval_param(request.args.get('interval'))
+        validate_timeseries_range(since, until, interval)
+        
+        # 2. 生成缓存键
+        cache_key = _build_cache_key('timeseries', projects, {"since": since, "until": until})
+        cache_key += f"|interval={interval}"
+        
+        # 3. 检查缓存
+        if force_refresh:
+            cache_service.delete(cache_key)
+        else:
+            cached_data = cache_service.get(cache_key)
+            if cached_data:
+                logger.info(f"缓存命中: {cache_key}")
+                return success_response(cached_data)
+        
+        # 4. 获取数据
+        logger.info(f"开始获取提交趋势: {projects}")
+        data = stats_service.fetch_multi_project_timeseries(
+            projects, force_refresh=force_refresh, since=since, until=until, interval=interval
+        )
+        
+        # 5. 写入缓存 (5 分钟)，有项目未完成时不缓存部分结果
+        _cache_response(cache_key, data)
+        
+        return success_response(data)
         
     except ValueError as e:
         logger.warning(f"参数错误: {str(e)}")
@@ -183,5 +584,20 @@ def get_contributors():
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
-    return success_response({"status": "ok", "message": "服务运行正常"})
+    return success_response({
+        "status": "ok",
+        "message": "服务运行正常",
+        "fetch_queue": stats_service.scheduler.stats() if stats_service else None,
+        "ready": dashboard_warmup.ready,
+        "warmup": dashboard_warmup.status(),
+    })
+
+
+@api_bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查接口（开启预热时，预热完成前返回 503）"""
+    warmup = dashboard_warmup.status()
+    if not warmup["ready"]:
+        return error_response(503, "默认项目预热中", warmup)
+    return success_response(warmup)
 
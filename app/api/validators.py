@@ -2,7 +2,13 @@
 请求参数验证器
 """
 
-from typing import List
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from app.utils.stats_calculator import check_timeseries_span
+
+# 单次请求允许的 max_count 上限
+MAX_COMMIT_COUNT = 100000
 
 
 def validate_projects_param(projects_param: str) -> List[str]:
@@ -32,3 +38,154 @@ def validate_projects_param(projects_param: str) -> List[str]:
     
     return projects
 
+
+
+def validate_date_param(value: Optional[str], name: str) -> Optional[str]:
+    """
+    验证日期参数
+    
+    Args:
+        value: 日期字符串 (YYYY-MM-DD)，为空表示不限制
+        name: 参数名称（用于错误信息）
+    
+    Returns:
+        Optional[str]: 规范化后的日期字符串
+    
+    Raises:
+        ValueError: 格式不正确
+    """
+    if value is None or not value.strip():
+        return None
+
+    value = value.strip()
+    try:
+        parsed = datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"{name} 参数格式应为 YYYY-MM-DD")
+    # 统一补零（2024-1-5 -> 2024-01-05）：后续按字符串比较日期并用 date.fromisoformat 解析
+    return parsed.date().isoformat()
+
+
+def validate_date_range(since: Optional[str], until: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    验证 since/until 日期区间
+    
+    Returns:
+        (since, until): 规范化后的日期字符串
+    
+    Raises:
+        ValueError: 格式不正确或 since 晚于 until
+    """
+    since = validate_date_param(since, 'since')
+    until = validate_date_param(until, 'until')
+    if since and until and since > until:
+        raise ValueError("since 不能晚于 until")
+    return since, until
+
+
+def validate_timeseries_range(since: Optional[str], until: Optional[str], interval: str) -> None:
+    """
+    验证趋势接口的时间跨度（since/until 都给出时在拉取数据之前检查）
+    
+    Raises:
+        ValueError: 展开后的时间点数超过上限
+    """
+    if since and until:
+        check_timeseries_span(date.fromisoformat(since).toordinal(), date.fromisoformat(until).toordinal(), interval)
+
+
+def validate_max_count(value: Optional[str]) -> Optional[int]:
+    """
+    验证 max_count 参数
+    
+    Returns:
+        Optional[int]: 每个项目最多读取的 commit 数，为空表示使用默认值
+    
+    Raises:
+        ValueError: 不是正整数或超过上限
+    """
+    if value is None or not value.strip():
+        return None
+
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError("max_count 参数必须是正整数")
+
+    if count <= 0:
+        raise ValueError("max_count 参数必须是正整数")
+    if count > MAX_COMMIT_COUNT:
+        raise ValueError(f"max_count 不能超过 {MAX_COMMIT_COUNT}")
+    return count
+
+
+def validate_interval_param(value: Optional[str]) -> str:
+    """
+    验证趋势接口的 interval 参数
+    
+    Returns:
+        str: 'day' 或 'week'，为空时默认 'day'
+    
+    Raises:
+        ValueError: 不支持的取值
+    """
+    if value is None or not value.strip():
+        return 'day'
+
+    value = value.strip().lower()
+    if value not in ('day', 'week'):
+        raise ValueError("interval 参数只支持 day 或 week")
+    return value
+
+
+def validate_pagination(limit: Optional[str], offset: Optional[str], max_limit: int = 1000) -> Tuple[Optional[int], int]:
+    """
+    验证分页参数
+    
+    Returns:
+        (limit, offset): limit 为空表示不限制
+    
+    Raises:
+        ValueError: 不是合法的非负整数或超过上限
+    """
+    parsed_limit: Optional[int] = None
+    if limit is not None and limit.strip():
+        try:
+            parsed_limit = int(limit)
+        except ValueError:
+            raise ValueError("limit 参数必须是正整数")
+        if parsed_limit <= 0:
+            raise ValueError("limit 参数必须是正整数")
+        if parsed_limit > max_limit:
+            raise ValueError(f"limit 不能超过 {max_limit}")
+
+    parsed_offset = 0
+    if offset is not None and offset.strip():
+        try:
+            parsed_offset = int(offset)
+        except ValueError:
+            raise ValueError("offset 参数必须是非负整数")
+        if parsed_offset < 0:
+            raise ValueError("offset 参数必须是非负整数")
+
+    return parsed_limit, parsed_offset
+
+
+def validate_sort_param(sort: Optional[str], order: Optional[str], allowed: Tuple[str, ...]) -> Tuple[str, Optional[str]]:
+    """
+    验证排序参数
+    
+    Returns:
+        (sort, order): sort 为空时取 allowed[0]，order 为空表示使用字段的默认方向
+    
+    Raises:
+        ValueError: 不支持的排序字段或方向
+    """
+    sort = (sort or '').strip() or allowed[0]
+    if sort not in allowed:
+        raise ValueError(f"sort 参数只支持: {', '.join(allowed)}")
+
+    order = (order or '').strip().lower() or None
+    if order not in (None, 'asc', 'desc'):
+        raise ValueError("order 参数只支持 asc 或 desc")
+    return sort, order
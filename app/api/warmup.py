@@ -0,0 +1,144 @@
+"""
+默认看板缓存预热
+
+服务启动后在后台为默认项目拉取仓库、构建时间索引，并预先计算汇总和贡献者数据写入缓存，
+让部署 / 重启后的第一批访问者不必等待克隆和解析。预热完成之前 /ready 返回 503。
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardWarmup:
+    """
+    每个进程各自执行一次的预热任务
+
+    gunicorn preload_app 时 create_app 运行在主进程中，后台线程不会被 fork 到 worker，
+    因此预热线程在 worker 内按 pid 懒启动（post_fork 钩子或第一个请求）。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.timeout = 600
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._state: Dict[str, Any] = self._initial_state()
+
+    def configure(self, enabled: bool, timeout: int = 600) -> None:
+        self.enabled = enabled
+        self.timeout = timeout
+        self._state = self._initial_state()
+
+    def ensure_started(self) -> None:
+        """在当前进程中启动预热（已启动或未开启时直接返回）"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._state = self._initial_state()
+            self._state['status'] = 'running'
+            self._state['started_at'] = time.time()
+
+        threading.Thread(target=self._run, name='dashboard-warmup', daemon=True).start()
+
+    @property
+    def ready(self) -> bool:
+        """未开启预热，或本进程的预热已经结束"""
+        return not self.enabled or self._state['status'] in ('done', 'failed')
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            state = dict(self._state)
+        state['failed_projects'] = dict(state['failed_projects'])
+        state['pending_projects'] = list(state['pending_projects'])
+        state['ready'] = self.ready
+        return state
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+    def _initial_state(self) -> Dict[str, Any]:
+        return {
+            'status': 'pending' if self.enabled else 'disabled',
+            'total': 0,
+            'completed': 0,
+            'failed_projects': {},
+            'pending_projects': [],
+            'started_at': None,
+            'finished_at': None,
+        }
+
+    def _update(self, **changes) -> None:
+        with self._lock:
+            self._state.update(changes)
+
+    def _run(self) -> None:
+        try:
+            projects = self._warm_projects()
+            if projects:
+                self._warm_responses(projects)
+            self._update(status='done', finished_at=time.time())
+            logger.info("默认看板预热完成，耗时 %.1fs", time.time() - self._state['started_at'])
+        except Exception as exc:
+            logger.error(f"默认看板预热失败: {exc}", exc_info=True)
+            self._update(status='failed', finished_at=time.time())
+
+    def _warm_projects(self) -> List[str]:
+        """以后台优先级拉取默认项目并构建各项目的时间索引"""
+        from app.api import routes
+
+        projects = routes._resolve_default_projects()
+        self._update(total=len(projects))
+        if not projects:
+            logger.info("未配置默认项目，跳过预热")
+            return projects
+
+        logger.info(f"开始预热默认项目: {projects}")
+        futures = routes.stats_service.prefetch_projects(projects)
+        finished = set()
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                finished.add(future)
+                project_name = futures[future]
+                try:
+                    future.result()
+                except Exception as exc:
+                    with self._lock:
+                        self._state['failed_projects'][project_name] = str(exc)
+                    logger.warning(f"预热项目 {project_name} 失败: {exc}")
+                self._update(completed=len(finished))
+        except FutureTimeoutError:
+            pending = sorted(futures[f] for f in futures if f not in finished)
+            self._update(pending_projects=pending)
+            logger.warning(f"以下项目预热超过 {self.timeout}s 仍未完成: {', '.join(pending)}")
+        return projects
+
+    def _warm_responses(self, projects: List[str]) -> None:
+        """预先计算默认看板的汇总和贡献者数据（缓存键与接口一致）"""
+        from app.api import routes
+
+        window = {"since": None, "until": None, "max_count": None}
+
+        summary_key = routes._build_cache_key('summary', projects, window)
+        if not routes.cache_service.get(summary_key):
+            data = routes._summary_data(routes.stats_service.fetch_multi_project_stats(projects))
+            routes._cache_response(summary_key, data)
+
+        contributors_key = routes._build_cache_key('contributors', projects, window)
+        if not routes.cache_service.get(contributors_key):
+            contributors, outcome = routes.stats_service.fetch_multi_project_contributors(projects)
+            if outcome.complete:
+                routes.cache_service.set(contributors_key, contributors, ttl=routes.CACHE_TTL)
+
+
+# 全局实例（在 create_app 中配置）
+dashboard_warmup = DashboardWarmup()
@@ -11,10 +11,19 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from flask import Flask
 from app.api.routes import api_bp, init_services
 from app.api.ai_routes import ai_bp, init_ai_services
+from app.api.metrics_routes import metrics_bp
+from app.api.admin_routes import admin_bp
+from app.api.warmup import dashboard_warmup
 from app.middleware.cors import setup_cors
+from app.middleware.profiling import setup_profiling
+from app.middleware.request_timing import setup_request_timing
 from app.utils.logger import setup_logger
 from app.services import GitService, StatsService, CacheService, build_analyzer_from_env
+from app.services.repo_lock import RepoLockManager
+from app.services.fetch_scheduler import FetchScheduler, FetchSlots
 from app.settings import Config
+from app.utils.metrics import metrics
+from app.utils.profiler import request_profiler
 import logging
 
 # 设置日志
@@ -32,14 +41,45 @@ def create_app():
     # 设置 CORS
     setup_cors(app)
     
+    # 请求耗时拆分（Server-Timing 响应头 + 慢请求日志）
+    setup_request_timing(app, Config.SLOW_REQUEST_THRESHOLD_MS)
+    
+    # 按需剖析（管理接口或 SIGUSR2 开启）
+    request_profiler.configure(Config.PROFILE_DIR)
+    setup_profiling(app)
+    
+    # 多 worker 指标汇总
+    metrics.configure_multiprocess(Config.METRICS_MULTIPROC_DIR)
+    
     # 初始化服务
-    git_service = GitService(workspace_dir=Config.GIT_WORKSPACE)
-    stats_service = StatsService(git_service, project_timeout=Config.PROJECT_FETCH_TIMEOUT)
     cache_service = CacheService(
         host=Config.REDIS_HOST,
         port=Config.REDIS_PORT,
         db=Config.REDIS_DB
     )
+    lock_manager = RepoLockManager(
+        os.path.join(Config.GIT_WORKSPACE, '_locks'),
+        redis_client=cache_service.redis_client,
+        lock_timeout=Config.REPO_LOCK_TIMEOUT,
+        backend=Config.REPO_LOCK_BACKEND,
+    )
+    git_service = GitService(workspace_dir=Config.GIT_WORKSPACE, lock_manager=lock_manager)
+    fetch_scheduler = FetchScheduler(
+        max_concurrency=Config.MAX_WORKERS,
+        slots=(
+            FetchSlots(os.path.join(Config.GIT_WORKSPACE, '_locks'), Config.FETCH_GLOBAL_SLOTS)
+            if Config.FETCH_GLOBAL_SLOTS > 0 else None
+        ),
+    )
+    stats_service = StatsService(
+        git_service,
+        project_timeout=Config.PROJECT_FETCH_TIMEOUT,
+        index_cache_size=Config.COMMIT_INDEX_CACHE_SIZE,
+        execution_mode=Config.STATS_EXECUTION_MODE,
+        process_workers=Config.STATS_PROCESS_WORKERS,
+        scheduler=fetch_scheduler,
+        async_concurrency=Config.ASYNC_INGEST_CONCURRENCY,
+    )
     ai_analyzer = build_analyzer_from_env()
     
     # 注入服务到路由
@@ -49,6 +89,15 @@ def create_app():
     # 注册 Blueprint
     app.register_blueprint(api_bp)
     app.register_blueprint(ai_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(admin_bp)
+    
+    # 默认项目预热：gunicorn 在 post_fork 中启动，其他方式在第一个请求时兜底启动
+    dashboard_warmup.configure(Config.WARMUP_ON_STARTUP, Config.WARMUP_TIMEOUT)
+    
+    @app.before_request
+    def start_warmup():
+        dashboard_warmup.ensure_started()
     
     # 错误处理
     @app.errorhandler(404)
@@ -63,9 +112,16 @@ def create_app():
     logger.info("Flask应用初始化完成")
     logger.info("已注册路由:")
     logger.info("  • /api/dashboard/summary")
+    logger.info("  • /api/dashboard/summary/stream")
     logger.info("  • /api/dashboard/contributors")
+    logger.info("  • /api/dashboard/contributors/<email>")
+    logger.info("  • /api/dashboard/timeseries")
+    logger.info("  • /api/dashboard/heatmap")
     logger.info("  • /api/dashboard/health")
+    logger.info("  • /api/dashboard/ready")
     logger.info("  • /api/ai-ratio (新增)")
+    logger.info("  • /api/dashboard/admin/profile")
+    logger.info("  • /metrics")
     
     return app
 
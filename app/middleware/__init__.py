@@ -3,6 +3,8 @@
 """
 
 from .cors import setup_cors
+from .profiling import setup_profiling
+from .request_timing import setup_request_timing
 
-__all__ = ['setup_cors']
+__all__ = ['setup_cors', 'setup_profiling', 'setup_request_timing']
 
@@ -0,0 +1,52 @@
+"""
+按需请求剖析中间件
+"""
+
+import time
+
+from flask import g, request
+
+from app.utils.profiler import request_profiler
+
+
+def setup_profiling(app):
+    """
+    剖析开启时为请求开启 cProfile，请求结束后写出剖析文件（附带路径和项目列表）
+
+    Args:
+        app: Flask应用实例
+    """
+
+    @app.before_request
+    def _begin_profile():
+        g.profile_session = request_profiler.begin()
+
+    @app.after_request
+    def _finish_profile(response):
+        session = g.pop('profile_session', None)
+        if session is None:
+            return response
+
+        projects = request.args.get('projects', '')
+        request_profiler.finish(session, {
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('utf-8', errors='replace'),
+            'projects': [name.strip() for name in projects.split(',') if name.strip()],
+            'status': response.status_code,
+            'duration_ms': round((time.time() - session.started_at) * 1000, 2),
+        })
+        return response
+
+    @app.teardown_request
+    def _abort_profile(exc):
+        # 请求异常结束时 after_request 可能没有执行：仍然写出剖析文件并释放剖析名额
+        session = g.pop('profile_session', None)
+        if session is None:
+            return
+        request_profiler.finish(session, {
+            'method': request.method,
+            'path': request.path,
+            'error': repr(exc) if exc is not None else None,
+            'duration_ms': round((time.time() - session.started_at) * 1000, 2),
+        })
@@ -0,0 +1,46 @@
+"""
+请求耗时拆分中间件
+"""
+
+import json
+import logging
+
+from flask import request
+
+from app.utils.request_timing import current_timer, start_request
+
+slow_logger = logging.getLogger('code996.slow_request')
+
+
+def setup_request_timing(app, slow_threshold_ms: int = 2000):
+    """
+    为每个请求输出 Server-Timing 响应头，超过阈值的请求写一条结构化的慢请求日志
+
+    Args:
+        app: Flask应用实例
+        slow_threshold_ms: 慢请求阈值（毫秒），小于 0 时不记录慢请求日志
+    """
+
+    @app.before_request
+    def _start_request_timer():
+        start_request()
+
+    @app.after_request
+    def _emit_request_timing(response):
+        timer = current_timer()
+        if timer is None:
+            return response
+
+        response.headers['Server-Timing'] = timer.server_timing()
+        duration_ms = round(timer.elapsed * 1000, 2)
+        if 0 <= slow_threshold_ms <= duration_ms:
+            slow_logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'query': request.query_string.decode('utf-8', errors='replace'),
+                'status': response.status_code,
+                'duration_ms': duration_ms,
+                'spans': timer.breakdown(),
+            }, ensure_ascii=False))
+        return response
@@ -21,6 +21,8 @@ class Commit:
     files_changed: int = 0       # 修改文件数
     project_id: Optional[str] = None  # 所属项目 ID
     project_name: Optional[str] = None  # 所属项目名
+    author_id: Optional[int] = None  # 规范作者 id（见 app.utils.author_identity）
+    author_alias: Optional[str] = None  # .mailmap 映射前的原始邮箱（与规范邮箱不同时）
     
     @property
     def hour(self) -> int:
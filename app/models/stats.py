@@ -2,9 +2,9 @@
 统计数据模型
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from .commit import Commit
 
 
@@ -23,18 +23,13 @@ class DashboardStats:
     index_996: float                     # 996 指数
     overtime_ratio: float                # 加班比例
     is_standard: bool                    # 是否标准工作时间
+    failed_projects: List[Dict[str, Any]] = field(default_factory=list)  # 获取失败的项目
+    pending_projects: List[str] = field(default_factory=list)            # 超时仍在后台执行的项目
     
     @staticmethod
     def from_commits(commits: List[Commit], repo_count: int) -> 'DashboardStats':
         """从 commit 列表生成统计数据"""
-        from app.utils.stats_calculator import (
-            calculate_hour_data,
-            calculate_week_data,
-            calculate_work_hour_ratio,
-            calculate_work_week_ratio,
-            calculate_996_index,
-            calculate_overtime_ratio
-        )
+        from app.utils.stats_calculator import build_hour_weekday_matrix
         
         # 如果没有 commit，返回空数据
         if not commits:
@@ -45,28 +40,43 @@ class DashboardStats:
         start_date = min(timestamps).strftime('%Y-%m-%d')
         end_date = max(timestamps).strftime('%Y-%m-%d')
         
-        # 计算各项统计
-        hour_data = calculate_hour_data(commits)
-        week_data = calculate_week_data(commits)
-        work_hour_pl = calculate_work_hour_ratio(commits)
-        work_week_pl = calculate_work_week_ratio(commits)
-        index_996 = calculate_996_index(commits)
-        overtime_ratio = calculate_overtime_ratio(commits)
+        return DashboardStats.from_matrix(
+            build_hour_weekday_matrix(commits),
+            start_date=start_date,
+            end_date=end_date,
+            repo_count=repo_count,
+        )
+
+    @staticmethod
+    def from_matrix(
+        matrix: List[int],
+        start_date: Optional[str],
+        end_date: Optional[str],
+        repo_count: int
+    ) -> 'DashboardStats':
+        """从星期 × 小时矩阵（168 个单元格）生成统计数据"""
+        from app.utils.stats_calculator import calculate_matrix_stats
+
+        total_count = sum(matrix)
+        if not total_count:
+            return DashboardStats._empty_stats(repo_count)
+
+        stats = calculate_matrix_stats(matrix)
         
         # 判断是否标准工作时间
-        is_standard = overtime_ratio < 0.2 and index_996 < 0.3
+        is_standard = stats["overtime_ratio"] < 0.2 and stats["index_996"] < 0.3
         
         return DashboardStats(
             start_date=start_date,
             end_date=end_date,
-            total_count=len(commits),
+            total_count=total_count,
             repo_count=repo_count,
-            hour_data=hour_data,
-            week_data=week_data,
-            work_hour_pl=work_hour_pl,
-            work_week_pl=work_week_pl,
-            index_996=index_996,
-            overtime_ratio=overtime_ratio,
+            hour_data=stats["hour_data"],
+            week_data=stats["week_data"],
+            work_hour_pl=stats["work_hour_pl"],
+            work_week_pl=stats["work_week_pl"],
+            index_996=stats["index_996"],
+            overtime_ratio=stats["overtime_ratio"],
             is_standard=is_standard
         )
     
@@ -5,16 +5,20 @@ from __future__ import annotations
 import logging
 import os
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from app.settings import (
     _optional_int,
     DEFAULT_AI_ANALYZER_ENDPOINT,
     DEFAULT_AI_ANALYZER_MODEL,
 )
+from app.utils.metrics import metrics
 
 
 logger = logging.getLogger('code996.services.ai_analyzer')
@@ -29,16 +33,37 @@ class AnalyzerConfig:
     max_files: Optional[int] = None
     max_file_size: Optional[int] = None
     max_characters: Optional[int] = None
+    concurrency: int = 5
 
 
 class AIAnalyzer:
+    """
+    LLM 调用在进程内所有请求之间共享一个有界线程池和按线程复用的 HTTP 连接：
+    并发请求多时不会各自再开一批线程，LLM 调用总数受 concurrency 限制。
+    """
+
     def __init__(self, config: Optional[AnalyzerConfig]) -> None:
         self.config = config
         self.enabled = config is not None and all([config.endpoint, config.model])
+        self.concurrency = max(1, config.concurrency) if config is not None else 1
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._queued = 0
 
         if not self.enabled:
             logger.warning("AIAnalyzer 未启用，缺少必要配置")
 
+    def submit(self, file_path: str, content: str) -> Future:
+        """在共享线程池中分析单个文件，返回 Future（结果同 analyze_content）"""
+        executor = self._get_executor()
+        self._track_queue(1)
+        future = executor.submit(self.analyze_content, file_path, content)
+        future.add_done_callback(lambda _: self._track_queue(-1))
+        return future
+
     def analyze_content(self, file_path: str, content: str) -> Optional[float]:
         if not self.enabled or not content.strip():
             return None
@@ -63,15 +88,17 @@ class AIAnalyzer:
         }
 
         try:
-            response = requests.post(
-                self.config.endpoint,
-                json=payload,
-                headers=headers,
-                timeout=self.config.timeout,
-            )
-            response.raise_for_status()
-            data = response.json()
+            with metrics.timer('ai_analyzer_request_seconds'):
+                response = self._session().post(
+                    self.config.endpoint,
+                    json=payload,
+                    headers=headers,
+                    timeout=self.config.timeout,
+                )
+                response.raise_for_status()
+                data = response.json()
         except requests.HTTPError as exc:
+            metrics.inc('ai_analyzer_errors_total', labels={'reason': 'http'})
             response_text = exc.response.text if exc.response is not None else ""
             logger.error(
                 "调用 AI 分析接口失败 (%s): %s | %s",
@@ -81,14 +108,47 @@ class AIAnalyzer:
             )
             return None
         except Exception as exc:
+            metrics.inc('ai_analyzer_errors_total', labels={
+                'reason': 'timeout' if isinstance(exc, requests.Timeout) else 'exception',
+            })
             logger.error("调用 AI 分析接口失败 (%s): %s", file_path, exc)
             return None
 
         percentage = self._extract_percentage(data)
         if percentage is None:
+            metrics.inc('ai_analyzer_errors_total', labels={'reason': 'invalid_response'})
             logger.warning("AI 分析接口未返回有效百分比 (%s): %s", file_path, data)
         return percentage
 
+    def _session(self) -> requests.Session:
+        # requests.Session 不保证线程安全，每个线程各自持有一个（复用 keep-alive 连接）
+        session = getattr(self._local, 'session', None)
+        if session is None or getattr(self._local, 'pid', None) != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            self._local.pid = os.getpid()
+        return session
+
+    def _track_queue(self, delta: int) -> None:
+        # 已提交但尚未完成的 LLM 调用数（排队 + 执行中）
+        with self._lock:
+            self._queued += delta
+            metrics.set_gauge('ai_analyzer_queue_depth', self._queued)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            # fork 之后父进程的线程不可用，重新创建
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix='ai-analyzer'
+                )
+                self._pid = os.getpid()
+                self._queued = 0
+            return self._executor
+
     @staticmethod
     def _extract_percentage(response_json: dict) -> Optional[float]:
         try:
@@ -139,6 +199,7 @@ def build_analyzer_from_env() -> AIAnalyzer:
         max_files=_optional_int(os.getenv('AI_ANALYZER_MAX_FILES')),
         max_file_size=_optional_int(os.getenv('AI_ANALYZER_MAX_FILE_SIZE')),
         max_characters=_optional_int(os.getenv('AI_ANALYZER_MAX_CHARACTERS')),
+        concurrency=int(os.getenv('AI_ANALYZER_CONCURRENCY', 5)),
     )
     return AIAnalyzer(config)
 
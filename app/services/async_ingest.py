@@ -0,0 +1,325 @@
+"""
+asyncio 版本的仓库读取
+
+git fetch / git log 本质上都是子进程 I/O。async 模式下这些命令在一个后台事件循环中通过
+asyncio.create_subprocess_exec 执行：stdout 按块读取、边读边解析并直接累加到
+星期 × 小时直方图和日汇总，不保留 commit 列表；并发只受信号量限制，
+单个节点可以同时处理数百个项目，而不需要等量的线程。
+解析和汇总是纯 Python 计算，交给默认线程池执行，不阻塞事件循环上其它项目的读取。
+StatsService 仍通过全局拉取调度器提交每个项目的任务，并发上限、优先级和全局槽位与 thread 模式一致。
+"""
+
+import asyncio
+import codecs
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from git import GitCommandError
+
+from app.models.commit import Commit
+from app.services.commit_index import DailyRollup, WindowAggregate
+from app.services.git_service import DEFAULT_MAX_COUNT, build_git_log_args, filter_commits_by_day, parse_git_log
+from app.services.repo_lock import RepoLockManager
+from app.utils.metrics import metrics
+from app.utils.request_timing import bind_timer, current_timer, record_span
+
+logger = logging.getLogger(__name__)
+
+# 每次从 git log 的 stdout 读取的字节数
+READ_CHUNK_SIZE = 256 * 1024
+
+
+# ----------------------------------------------------------------------
+# 解析 / 汇总（在线程池中执行）
+# ----------------------------------------------------------------------
+def _parse_records(text: str, since: Optional[str], until: Optional[str]) -> Tuple[List[Commit], float]:
+    """解析一段完整的 git log 记录，返回 (commit 列表, 解析耗时)"""
+    started = time.perf_counter()
+    commits = filter_commits_by_day(parse_git_log(text), since, until)
+    return commits, time.perf_counter() - started
+
+
+def _summarize(commits: List[Commit]) -> Tuple[WindowAggregate, List[DailyRollup]]:
+    return WindowAggregate.from_commits(commits), DailyRollup.from_commits(commits)
+
+
+# ----------------------------------------------------------------------
+# git 命令
+# ----------------------------------------------------------------------
+async def run_git(repo_path: str, *args: str) -> str:
+    """执行一条 git 命令并返回 stdout（失败抛出 GitCommandError）"""
+    process = await asyncio.create_subprocess_exec(
+        'git', '-C', repo_path, *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise GitCommandError(['git', *args], process.returncode, stderr.decode('utf-8', errors='replace'))
+    return stdout.decode('utf-8', errors='replace').strip()
+
+
+async def rev_parse(repo_path: str, ref: str) -> Optional[str]:
+    """引用指向的 commit 哈希，不存在时返回 None"""
+    try:
+        return await run_git(repo_path, 'rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}") or None
+    except GitCommandError:
+        return None
+
+
+async def is_ancestor(repo_path: str, ancestor: str, descendant: str) -> bool:
+    try:
+        await run_git(repo_path, 'merge-base', '--is-ancestor', ancestor, descendant)
+        return True
+    except GitCommandError:
+        return False
+
+
+async def resolve_commit_ref(repo_path: str) -> str:
+    """与 GitService.resolve_commit_ref 相同的规则：远程分支领先于 HEAD 时读取远程分支"""
+    remote_ref = await _remote_tracking_ref(repo_path)
+    if not remote_ref:
+        return 'HEAD'
+
+    head_sha = await rev_parse(repo_path, 'HEAD')
+    remote_sha = await rev_parse(repo_path, remote_ref)
+    if not remote_sha or remote_sha == head_sha:
+        return 'HEAD'
+    if head_sha and not await is_ancestor(repo_path, head_sha, remote_sha):
+        return 'HEAD'
+    return remote_ref
+
+
+async def refresh_repo(repo_path: str) -> bool:
+    """与 GitService.refresh_repo 相同：只 fetch 跟踪分支，不触碰工作区"""
+    remotes = (await run_git(repo_path, 'remote')).split()
+    if not remotes:
+        logger.debug(f"仓库 {repo_path} 没有远程配置，跳过刷新")
+        return False
+
+    remote = 'origin' if 'origin' in remotes else remotes[0]
+    branch = await _tracked_branch(repo_path)
+    if not branch:
+        logger.debug(f"仓库 {repo_path} 处于分离 HEAD 状态，跳过刷新")
+        return False
+
+    remote_ref = f"refs/remotes/{remote}/{branch}"
+    before = await rev_parse(repo_path, remote_ref)
+    logger.info(f"刷新仓库 {repo_path}: fetch {remote}/{branch}")
+    with metrics.timer('git_fetch_seconds', span='git_fetch'):
+        await run_git(repo_path, 'fetch', remote, f"+refs/heads/{branch}:{remote_ref}", '--no-tags')
+    return before != await rev_parse(repo_path, remote_ref)
+
+
+async def iter_git_log(
+    repo_path: str,
+    ref: str = 'HEAD',
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    max_count: Optional[int] = DEFAULT_MAX_COUNT,
+) -> AsyncIterator[List[Commit]]:
+    """
+    流式读取 git log --numstat，按块产出解析好的 commit（解析在线程池中进行）
+
+    日期窗口被放宽时 max_count 不交给 git（见 build_git_log_args），在这里按过滤后的条数截取，
+    数量够了就提前结束 git 进程。
+    """
+    remaining = max_count or None
+    process = await asyncio.create_subprocess_exec(
+        'git', '-C', repo_path, 'log', *build_git_log_args(ref, since=since, until=until, max_count=max_count),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    started = time.perf_counter()
+    parse_seconds = 0.0
+    try:
+        while remaining != 0:
+            chunk = await process.stdout.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += decoder.decode(chunk)
+            # 每条记录以 \x1e 开头：最后一个 \x1e 之前的记录都已经完整
+            cut = buffer.rfind('\x1e')
+            if cut > 0:
+                commits, seconds = await asyncio.to_thread(_parse_records, buffer[:cut], since, until)
+                parse_seconds += seconds
+                buffer = buffer[cut:]
+                if remaining is not None:
+                    commits = commits[:remaining]
+                    remaining -= len(commits)
+                if commits:
+                    yield commits
+
+        if remaining != 0:
+            buffer += decoder.decode(b'', final=True)
+            commits, seconds = await asyncio.to_thread(_parse_records, buffer, since, until)
+            parse_seconds += seconds
+            if remaining is not None:
+                commits = commits[:remaining]
+            if commits:
+                yield commits
+
+            stderr = await process.stderr.read()
+            if await process.wait() != 0:
+                raise GitCommandError(['git', 'log', ref], process.returncode, stderr.decode('utf-8', errors='replace'))
+
+        # 与同步路径的指标口径一致：git 本身耗时与解析耗时分开统计
+        git_seconds = max(0.0, time.perf_counter() - started - parse_seconds)
+        metrics.observe('git_log_parse_seconds', parse_seconds)
+        metrics.observe('git_log_seconds', git_seconds)
+        record_span('git_parse', parse_seconds)
+        record_span('git_log', git_seconds)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def aggregate_project_window(
+    repo_path: str,
+    ref: str = 'HEAD',
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    max_count: Optional[int] = DEFAULT_MAX_COUNT,
+) -> Tuple[WindowAggregate, List[DailyRollup]]:
+    """边读边汇总单个项目窗口内的 commit（结果与 parallel_ingest.aggregate_project_window 相同）"""
+    aggregate = WindowAggregate()
+    rollups: Dict[int, DailyRollup] = {}
+
+    async for commits in iter_git_log(repo_path, ref, since=since, until=until, max_count=max_count):
+        partial, partial_rollups = await asyncio.to_thread(_summarize, commits)
+        aggregate.merge(partial)
+        for rollup in partial_rollups:
+            merged = rollups.get(rollup.day)
+            if merged is None:
+                rollups[rollup.day] = rollup
+                continue
+            merged.commits += rollup.commits
+            merged.additions += rollup.additions
+            merged.deletions += rollup.deletions
+            merged.overtime += rollup.overtime
+
+    return aggregate, [rollups[day] for day in sorted(rollups)]
+
+
+async def _tracked_branch(repo_path: str) -> Optional[str]:
+    try:
+        branch = await run_git(repo_path, 'symbolic-ref', '--quiet', '--short', 'HEAD')
+    except GitCommandError:
+        return None
+    upstream = await _upstream(repo_path, branch)
+    if upstream:
+        # <remote>/<branch> 中远程端的分支名
+        return upstream.split('/', 1)[1] if '/' in upstream else upstream
+    return branch
+
+
+async def _remote_tracking_ref(repo_path: str) -> Optional[str]:
+    try:
+        branch = await run_git(repo_path, 'symbolic-ref', '--quiet', '--short', 'HEAD')
+    except GitCommandError:
+        return None
+    upstream = await _upstream(repo_path, branch)
+    if upstream:
+        return upstream
+
+    remotes = (await run_git(repo_path, 'remote')).split()
+    if not remotes:
+        return None
+    remote = 'origin' if 'origin' in remotes else remotes[0]
+    return f"{remote}/{branch}"
+
+
+async def _upstream(repo_path: str, branch: str) -> Optional[str]:
+    try:
+        return await run_git(repo_path, 'rev-parse', '--abbrev-ref', '--symbolic-full-name', f"{branch}@{{upstream}}") or None
+    except GitCommandError:
+        return None
+
+
+# ----------------------------------------------------------------------
+# 后台事件循环
+# ----------------------------------------------------------------------
+class AsyncIngestLoop:
+    """
+    每个进程一个后台事件循环
+
+    submit() 把协程交给事件循环执行并返回 concurrent.futures.Future，可以和调度器的任务
+    一起用 wait / as_completed 等待；相同 key 的任务在执行期间只保留一份。
+    事件循环在第一次提交时才启动，fork 之后（pid 变化）会重新创建。
+    """
+
+    def __init__(self, concurrency: int = 64, lock_manager: Optional[RepoLockManager] = None):
+        self.concurrency = max(1, concurrency)
+        self.lock_manager = lock_manager
+        self._lock = threading.RLock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pid: Optional[int] = None
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def submit(self, key: Hashable, coro_factory: Callable[[], Awaitable]) -> Future:
+        """提交协程（coro_factory 在拿到并发名额后才调用）"""
+        with self._lock:
+            loop = self._ensure_loop()
+            future = self._inflight.get(key)
+            if future is not None and not future.done():
+                metrics.inc('async_ingest_deduplicated_total')
+                return future
+
+            future = asyncio.run_coroutine_threadsafe(self._limited(coro_factory, current_timer()), loop)
+            self._inflight[key] = future
+            metrics.inc('async_ingest_tasks_total')
+            metrics.set_gauge('async_ingest_inflight', len(self._inflight))
+            future.add_done_callback(lambda done, key=key: self._forget(key, done))
+            return future
+
+    @asynccontextmanager
+    async def repo_lock(self, key: str) -> AsyncIterator[Optional[object]]:
+        """在线程中获取 / 释放仓库锁（等待锁期间不阻塞事件循环）"""
+        if self.lock_manager is None:
+            yield None
+            return
+
+        context = self.lock_manager.acquire(key)
+        handle = await asyncio.to_thread(context.__enter__)
+        try:
+            yield handle
+        finally:
+            await asyncio.to_thread(context.__exit__, None, None, None)
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name='async-ingest', daemon=True)
+        thread.start()
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._pid = os.getpid()
+        self._inflight = {}
+        logger.info("异步读取事件循环已启动: 并发上限 %s", self.concurrency)
+        return loop
+
+    async def _limited(self, coro_factory: Callable[[], Awaitable], timer=None):
+        # 每个 asyncio 任务有独立的上下文：把提交方请求的计时器带进来
+        bind_timer(timer)
+        async with self._semaphore:
+            return await coro_factory()
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            metrics.set_gauge('async_ingest_inflight', len(self._inflight))
@@ -2,17 +2,27 @@
 缓存服务
 """
 
+import re
 import redis
 import json
 import logging
+import threading
 import time
 from typing import Any, Optional, Dict, Tuple
 
+from app.utils.metrics import metrics
+from app.utils.request_timing import span
+
 logger = logging.getLogger(__name__)
 
 
 class CacheService:
-    """Redis 缓存服务（支持降级到内存缓存）"""
+    """
+    Redis 缓存服务（支持降级到内存缓存）
+
+    可在多线程 worker（gunicorn gthread）中共享：redis 客户端自带连接池，
+    内存缓存的读写由一把锁保护。
+    """
     
     def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0):
         """
@@ -24,6 +34,7 @@ class CacheService:
             db: Redis数据库
         """
         self.memory_cache: Dict[str, Tuple[Any, float]] = {}
+        self._memory_lock = threading.Lock()
 
         try:
             self.redis_client = redis.Redis(
@@ -31,7 +42,8 @@ class CacheService:
                 port=port,
                 db=db,
                 decode_responses=True,
-                socket_connect_timeout=5
+                socket_connect_timeout=5,
+                socket_timeout=5,  # Redis 卡住时不要一直占用请求线程
             )
             self.redis_client.ping()
             self.use_redis = True
@@ -51,6 +63,16 @@ class CacheService:
         Returns:
             缓存值，不存在返回None
         """
+        with span('cache_get'):
+            value = self._get(key)
+        # 按键前缀（summary / contributors / ai_ratio ...）统计命中率
+        metrics.inc('cache_requests_total', labels={
+            'family': key.split(':', 1)[0],
+            'result': 'miss' if value is None else 'hit',
+        })
+        return value
+
+    def _get(self, key: str) -> Optional[Any]:
         try:
             if self.use_redis and self.redis_client:
                 value = self.redis_client.get(key)
@@ -59,14 +81,15 @@ class CacheService:
                     return json.loads(value)
                 return None
             else:
-                record = self.memory_cache.get(key)
-                if not record:
-                    return None
-                value, expire_at = record
-                if expire_at and expire_at < time.time():
-                    logger.debug(f"内存缓存过期: {key}")
-                    self.memory_cache.pop(key, None)
-                    return None
+                with self._memory_lock:
+                    record = self.memory_cache.get(key)
+                    if not record:
+                        return None
+                    value, expire_at = record
+                    if expire_at and expire_at < time.time():
+                        logger.debug(f"内存缓存过期: {key}")
+                        self.memory_cache.pop(key, None)
+                        return None
                 logger.debug(f"内存缓存命中: {key}")
                 return value
         except Exception as e:
@@ -83,13 +106,15 @@ class CacheService:
             ttl: 过期时间（秒）
         """
         try:
-            if self.use_redis and self.redis_client:
-                self.redis_client.setex(key, ttl, json.dumps(value, ensure_ascii=False))
-                logger.debug(f"Redis缓存设置: {key}")
-            else:
-                expire_at = time.time() + ttl if ttl else 0
-                self.memory_cache[key] = (value, expire_at)
-                logger.debug(f"内存缓存设置: {key} (ttl={ttl}s)")
+            with span('cache_set'):
+                if self.use_redis and self.redis_client:
+                    self.redis_client.setex(key, ttl, json.dumps(value, ensure_ascii=False))
+                    logger.debug(f"Redis缓存设置: {key}")
+                else:
+                    expire_at = time.time() + ttl if ttl else 0
+                    with self._memory_lock:
+                        self.memory_cache[key] = (value, expire_at)
+                    logger.debug(f"内存缓存设置: {key} (ttl={ttl}s)")
         except Exception as e:
             logger.error(f"缓存写入失败: {str(e)}")
     
@@ -104,7 +129,28 @@ class CacheService:
             if self.use_redis and self.redis_client:
                 self.redis_client.delete(key)
             else:
-                self.memory_cache.pop(key, None)
+                with self._memory_lock:
+                    self.memory_cache.pop(key, None)
+        except Exception as e:
+            logger.error(f"缓存删除失败: {str(e)}")
+
+    def delete_prefix(self, prefix: str):
+        """
+        删除所有以 prefix 开头的缓存（同一结果按参数派生出的多个键，例如 top-K 分页）
+
+        Args:
+            prefix: 缓存键前缀
+        """
+        try:
+            if self.use_redis and self.redis_client:
+                pattern = re.sub(r'([*?\[\]\\])', r'\\\1', prefix) + '*'
+                keys = list(self.redis_client.scan_iter(match=pattern, count=500))
+                if keys:
+                    self.redis_client.delete(*keys)
+            else:
+                with self._memory_lock:
+                    for key in [key for key in self.memory_cache if key.startswith(prefix)]:
+                        self.memory_cache.pop(key, None)
         except Exception as e:
             logger.error(f"缓存删除失败: {str(e)}")
     
@@ -115,7 +161,8 @@ class CacheService:
                 self.redis_client.flushdb()
                 logger.info("Redis缓存已清空")
             else:
-                self.memory_cache.clear()
+                with self._memory_lock:
+                    self.memory_cache.clear()
                 logger.info("内存缓存已清空")
         except Exception as e:
             logger.error(f"清空缓存失败: {str(e)}")
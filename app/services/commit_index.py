@@ -0,0 +1,396 @@
+"""按时间索引的项目 commit 查询引擎"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.models.commit import Commit
+from app.utils.author_identity import author_id_of, author_table
+
+
+# 星期 × 小时 = 7 × 24 个单元格，下标为 weekday * 24 + hour
+MATRIX_CELLS = 7 * 24
+
+
+def cell_of(commit: Commit) -> int:
+    """commit 在星期 × 小时矩阵中的下标"""
+    return commit.weekday * 24 + commit.hour
+
+
+def day_of(commit: Commit) -> int:
+    """commit 所在日期（提交者本地时区）的序数"""
+    return commit.timestamp.date().toordinal()
+
+
+def _commit_sort_key(commit: Commit) -> Tuple[int, float]:
+    return day_of(commit), commit.timestamp.timestamp()
+
+
+def _date_to_ordinal(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    return date.fromisoformat(value).toordinal()
+
+
+@dataclass
+class WindowAggregate:
+    """某个时间窗口内的汇总直方图"""
+
+    cells: List[int] = field(default_factory=lambda: [0] * MATRIX_CELLS)
+    total: int = 0
+    first_day: Optional[int] = None
+    last_day: Optional[int] = None
+
+    @staticmethod
+    def from_commits(commits: List[Commit]) -> 'WindowAggregate':
+        aggregate = WindowAggregate()
+        for commit in commits:
+            aggregate.cells[cell_of(commit)] += 1
+            day = day_of(commit)
+            if aggregate.first_day is None or day < aggregate.first_day:
+                aggregate.first_day = day
+            if aggregate.last_day is None or day > aggregate.last_day:
+                aggregate.last_day = day
+        aggregate.total = len(commits)
+        return aggregate
+
+    def merge(self, other: 'WindowAggregate') -> 'WindowAggregate':
+        """原地合并另一个窗口的数据"""
+        if not other.total:
+            return self
+        for index, count in enumerate(other.cells):
+            if count:
+                self.cells[index] += count
+        self.total += other.total
+        if self.first_day is None or (other.first_day is not None and other.first_day < self.first_day):
+            self.first_day = other.first_day
+        if self.last_day is None or (other.last_day is not None and other.last_day > self.last_day):
+            self.last_day = other.last_day
+        return self
+
+    @property
+    def start_date(self) -> Optional[str]:
+        return date.fromordinal(self.first_day).isoformat() if self.first_day is not None else None
+
+    @property
+    def end_date(self) -> Optional[str]:
+        return date.fromordinal(self.last_day).isoformat() if self.last_day is not None else None
+
+
+@dataclass
+class DailyRollup:
+    """单日汇总"""
+
+    day: int
+    commits: int = 0
+    additions: int = 0
+    deletions: int = 0
+    overtime: int = 0
+
+    @staticmethod
+    def from_commits(commits: List[Commit]) -> List['DailyRollup']:
+        rollups: Dict[int, DailyRollup] = {}
+        for commit in commits:
+            day = day_of(commit)
+            rollup = rollups.get(day)
+            if rollup is None:
+                rollup = rollups[day] = DailyRollup(day)
+            rollup.commits += 1
+            rollup.additions += commit.additions
+            rollup.deletions += commit.deletions
+            if commit.is_overtime:
+                rollup.overtime += 1
+        return [rollups[day] for day in sorted(rollups)]
+
+
+class ProjectCommitIndex:
+    """
+    单个项目的时间索引
+
+    commit 按日期排序保存，并为每个有提交的日期维护星期 × 小时单元格的前缀和，
+    任意日期窗口的直方图只需两次二分查找和一次 168 个单元格的相减。
+    同时按天维护提交数 / 增删行数 / 加班提交数的日汇总，新 commit 入库时只重算受影响的日期。
+    另外维护 作者 id -> commit 下标 的倒排表，单个贡献者的查询不需要扫描全部 commit。
+
+    构建时 git log 达到 max_count 上限（truncated）的索引只包含最近的一段历史：
+    covered_from 记录 git 返回的最后一个（最旧的）commit 所在日期，只有晚于该日期的窗口是完整的，
+    其余窗口由调用方通过 covers() 判断后改为下推给 git log。
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        head_sha: Optional[str],
+        commits: List[Commit],
+        truncated: bool = False,
+    ):
+        """commits 为 git log 的输出顺序（新 -> 旧）"""
+        self.project_id = project_id
+        self.head_sha = head_sha
+        self.covered_from: Optional[int] = day_of(commits[-1]) if truncated and commits else None
+
+        self.commits: List[Commit] = []
+        # 与 self.commits 一一对应的日期序数，用于按窗口切片 commit
+        self.commit_days = array('i')
+
+        self.days: List[int] = []
+        # prefix[i * 168 + k] 为前 i 个日期在单元格 k 上的累计提交数
+        self.prefix = array('I', bytes(4 * MATRIX_CELLS))
+        # 与 self.days 一一对应的日汇总
+        self.day_commits = array('I')
+        self.day_additions = array('Q')
+        self.day_deletions = array('Q')
+        self.day_overtime = array('I')
+        # 作者 id -> 该作者 commit 在 self.commits 中的下标（升序）
+        self.author_offsets: Dict[int, array] = {}
+        # 构建时作者驻留表的起始 id，驻留表重置后倒排表中的 id 全部过期
+        self.author_base = author_table.base
+
+        self._ingest(commits)
+
+    def extended(self, commits: List[Commit], head_sha: Optional[str]) -> 'ProjectCommitIndex':
+        """返回追加了新 commit 的索引副本（原索引不变，供并发读取）"""
+        clone = ProjectCommitIndex.__new__(ProjectCommitIndex)
+        clone.project_id = self.project_id
+        clone.head_sha = head_sha
+        clone.covered_from = self.covered_from
+        clone.commits = list(self.commits)
+        clone.commit_days = array('i', self.commit_days)
+        clone.days = list(self.days)
+        clone.prefix = array('I', self.prefix)
+        clone.day_commits = array('I', self.day_commits)
+        clone.day_additions = array('Q', self.day_additions)
+        clone.day_deletions = array('Q', self.day_deletions)
+        clone.day_overtime = array('I', self.day_overtime)
+        # 倒排表只替换新 commit 涉及的作者，其余数组与原索引共享
+        clone.author_offsets = dict(self.author_offsets)
+        clone.author_base = self.author_base
+        clone._ingest(commits)
+        return clone
+
+    def _ingest(self, commits: List[Commit]) -> None:
+        if not commits:
+            return
+
+        new_commits = sorted(commits, key=_commit_sort_key)
+        first_new_day = day_of(new_commits[0])
+
+        if not self.commits or first_new_day >= self.commit_days[-1]:
+            self._index_authors(new_commits, len(self.commits))
+            self.commits.extend(new_commits)
+            self.commit_days.extend(day_of(c) for c in new_commits)
+        else:
+            self.commits = sorted(self.commits + new_commits, key=_commit_sort_key)
+            self.commit_days = array('i', (day_of(c) for c in self.commits))
+            self.author_offsets = {}
+            self._index_authors(self.commits, 0)
+
+        # 只重算 first_new_day 及之后的日期
+        lo = bisect_left(self.days, first_new_day)
+        tail: Dict[int, List[int]] = {}
+        for i in range(lo, len(self.days)):
+            base = i * MATRIX_CELLS
+            cells = [self.prefix[base + MATRIX_CELLS + k] - self.prefix[base + k] for k in range(MATRIX_CELLS)]
+            cells += [self.day_commits[i], self.day_additions[i], self.day_deletions[i], self.day_overtime[i]]
+            tail[self.days[i]] = cells
+
+        for commit in new_commits:
+            day = day_of(commit)
+            cells = tail.get(day)
+            if cells is None:
+                cells = tail[day] = [0] * (MATRIX_CELLS + 4)
+            cells[cell_of(commit)] += 1
+            cells[MATRIX_CELLS] += 1
+            cells[MATRIX_CELLS + 1] += commit.additions
+            cells[MATRIX_CELLS + 2] += commit.deletions
+            if commit.is_overtime:
+                cells[MATRIX_CELLS + 3] += 1
+
+        del self.days[lo:]
+        del self.prefix[(lo + 1) * MATRIX_CELLS:]
+        del self.day_commits[lo:]
+        del self.day_additions[lo:]
+        del self.day_deletions[lo:]
+        del self.day_overtime[lo:]
+
+        for day in sorted(tail):
+            cells = tail[day]
+            base = len(self.days) * MATRIX_CELLS
+            self.prefix.extend(self.prefix[base + k] + cells[k] for k in range(MATRIX_CELLS))
+            self.days.append(day)
+            self.day_commits.append(cells[MATRIX_CELLS])
+            self.day_additions.append(cells[MATRIX_CELLS + 1])
+            self.day_deletions.append(cells[MATRIX_CELLS + 2])
+            self.day_overtime.append(cells[MATRIX_CELLS + 3])
+
+    def _index_authors(self, commits: List[Commit], base: int) -> None:
+        positions: Dict[int, List[int]] = {}
+        for offset, commit in enumerate(commits, start=base):
+            positions.setdefault(author_id_of(commit), []).append(offset)
+        for author_id, offsets in positions.items():
+            # 拼接生成新数组，不修改可能与其它索引共享的旧数组
+            self.author_offsets[author_id] = self.author_offsets.get(author_id, array('i')) + array('i', offsets)
+
+    def __len__(self) -> int:
+        return len(self.commits)
+
+    def authors_current(self) -> bool:
+        """倒排表中的作者 id 是否仍属于当前的作者驻留表"""
+        return self.author_base == author_table.base
+
+    def covers(self, since: Optional[str] = None, until: Optional[str] = None) -> bool:
+        """
+        [since, until] 窗口是否可以直接由索引回答
+
+        截断的索引只对晚于 covered_from 的窗口完整；不带任何日期的全量请求与下推时
+        同样受 max_count 上限约束，结果一致，也由索引回答。
+        """
+        if self.covered_from is None:
+            return True
+        if since is None:
+            return until is None
+        return _date_to_ordinal(since) > self.covered_from
+
+    def query(self, since: Optional[str] = None, until: Optional[str] = None) -> WindowAggregate:
+        """返回 [since, until] 日期窗口（含两端）的汇总直方图"""
+        lo, hi = self._day_bounds(since, until)
+        if lo >= hi:
+            return WindowAggregate()
+
+        lo_base = lo * MATRIX_CELLS
+        hi_base = hi * MATRIX_CELLS
+        cells = [self.prefix[hi_base + k] - self.prefix[lo_base + k] for k in range(MATRIX_CELLS)]
+        return WindowAggregate(
+            cells=cells,
+            total=sum(cells),
+            first_day=self.days[lo],
+            last_day=self.days[hi - 1],
+        )
+
+    def commits_between(self, since: Optional[str] = None, until: Optional[str] = None) -> List[Commit]:
+        """返回日期窗口内的 commit（按时间升序）"""
+        lo, hi = self._commit_bounds(since, until)
+        return self.commits[lo:hi]
+
+    def author_commits(
+        self,
+        author_id: int,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Commit]:
+        """返回某个作者在日期窗口内的 commit（按时间升序）"""
+        offsets = self.author_offsets.get(author_id)
+        if not offsets:
+            return []
+        lo, hi = self._commit_bounds(since, until)
+        start = bisect_left(offsets, lo)
+        end = bisect_left(offsets, hi)
+        return [self.commits[offset] for offset in offsets[start:end]]
+
+    def daily_rollups(self, since: Optional[str] = None, until: Optional[str] = None) -> List[DailyRollup]:
+        """返回日期窗口内每个有提交的日期的日汇总"""
+        lo, hi = self._day_bounds(since, until)
+        return [
+            DailyRollup(
+                day=self.days[i],
+                commits=self.day_commits[i],
+                additions=self.day_additions[i],
+                deletions=self.day_deletions[i],
+                overtime=self.day_overtime[i],
+            )
+            for i in range(lo, hi)
+        ]
+
+    def _commit_bounds(self, since: Optional[str], until: Optional[str]) -> Tuple[int, int]:
+        since_day = _date_to_ordinal(since)
+        until_day = _date_to_ordinal(until)
+        lo = bisect_left(self.commit_days, since_day) if since_day is not None else 0
+        hi = bisect_right(self.commit_days, until_day) if until_day is not None else len(self.commits)
+        return lo, hi
+
+    def _day_bounds(self, since: Optional[str], until: Optional[str]) -> Tuple[int, int]:
+        since_day = _date_to_ordinal(since)
+        until_day = _date_to_ordinal(until)
+        lo = bisect_left(self.days, since_day) if since_day is not None else 0
+        hi = bisect_right(self.days, until_day) if until_day is not None else len(self.days)
+        return lo, hi
+
+
+@dataclass
+class ProjectWindow:
+    """
+    单个项目在某个时间窗口内的数据：优先来自时间索引，否则来自下推过滤后的 commit 列表，
+    进程模式下则是子进程回传的部分汇总（不含 commit）
+    """
+
+    project_id: str
+    index: Optional[ProjectCommitIndex] = None
+    window_commits: Optional[List[Commit]] = None
+    since: Optional[str] = None
+    until: Optional[str] = None
+    partial_aggregate: Optional[WindowAggregate] = None
+    partial_rollups: Optional[List[DailyRollup]] = None
+
+    def aggregate(self) -> WindowAggregate:
+        if self.index is not None:
+            return self.index.query(self.since, self.until)
+        if self.partial_aggregate is not None:
+            return self.partial_aggregate
+        return WindowAggregate.from_commits(self.window_commits or [])
+
+    def commits(self) -> List[Commit]:
+        if self.index is not None:
+            return self.index.commits_between(self.since, self.until)
+        return self.window_commits or []
+
+    def author_commits(self, author_id: int) -> List[Commit]:
+        if self.index is not None:
+            return self.index.author_commits(author_id, self.since, self.until)
+        return [commit for commit in self.window_commits or [] if author_id_of(commit) == author_id]
+
+    def daily_rollups(self) -> List[DailyRollup]:
+        if self.index is not None:
+            return self.index.daily_rollups(self.since, self.until)
+        if self.partial_rollups is not None:
+            return self.partial_rollups
+        return DailyRollup.from_commits(self.window_commits or [])
+
+
+class CommitIndexCache:
+    """按 project_id 缓存时间索引（LRU），以远程分支 HEAD 和作者驻留表是否重置过判断是否过期"""
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._items: 'OrderedDict[str, ProjectCommitIndex]' = OrderedDict()
+
+    def peek(self, project_id: str) -> Optional[ProjectCommitIndex]:
+        """返回缓存中的索引（不校验 HEAD 是否最新；作者 id 已过期的索引不能用于增量更新，返回 None）"""
+        with self._lock:
+            index = self._items.get(project_id)
+        return index if index is not None and index.authors_current() else None
+
+    def get(self, project_id: str, head_sha: Optional[str]) -> Optional[ProjectCommitIndex]:
+        with self._lock:
+            index = self._items.get(project_id)
+            if index is None or head_sha is None or index.head_sha != head_sha or not index.authors_current():
+                return None
+            self._items.move_to_end(project_id)
+            return index
+
+    def put(self, index: ProjectCommitIndex) -> None:
+        with self._lock:
+            self._items[index.project_id] = index
+            self._items.move_to_end(index.project_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
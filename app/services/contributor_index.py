@@ -0,0 +1,143 @@
+"""预排序的贡献者索引（分页 / 排序 / 邮箱前缀过滤）"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# 支持的排序字段
+SORT_FIELDS = (
+    'contribution_score', 'commits', 'additions', 'deletions', 'net_additions',
+    'average_change', 'name', 'email',
+)
+DEFAULT_SORT = 'contribution_score'
+
+
+class ContributorIndex:
+    """
+    基于完整贡献者列表（calculate_contributors 的结果，已按排名排序）构建的索引
+
+    每种排序方式只在第一次使用时排序一次，之后的分页都是切片；
+    邮箱前缀过滤使用按邮箱排序的数组二分查找。
+    """
+
+    def __init__(self, contributors: List[Dict[str, Any]]):
+        self.contributors = contributors
+        self._lock = threading.Lock()
+        # 排序方式 -> 按该字段默认方向排好序的贡献者下标
+        self._orderings: Dict[str, List[int]] = {DEFAULT_SORT: list(range(len(contributors)))}
+        # 排序方式 -> 下标在该排序中的位置
+        self._positions: Dict[str, List[int]] = {}
+        self._emails = sorted(
+            ((str(c.get('email') or '').lower(), i) for i, c in enumerate(contributors)),
+        )
+        self._email_keys = [email for email, _ in self._emails]
+
+    def __len__(self) -> int:
+        return len(self.contributors)
+
+    def page(
+        self,
+        sort: str = DEFAULT_SORT,
+        order: Optional[str] = None,
+        email_prefix: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        返回 (符合条件的总数, 当前页)
+
+        order 为空时数值字段默认降序，name/email 默认升序
+        """
+        ordering = self._ordering(sort)
+
+        if email_prefix:
+            matched = self._match_prefix(email_prefix.lower())
+            positions = self._position_map(sort)
+            ordering = sorted(matched, key=positions.__getitem__)
+
+        total = len(ordering)
+        if order and order != self._default_order(sort):
+            ordering = ordering[::-1]
+
+        end = total if limit is None else offset + limit
+        return total, [self.contributors[i] for i in ordering[offset:end]]
+
+    def _ordering(self, sort: str) -> List[int]:
+        with self._lock:
+            ordering = self._orderings.get(sort)
+            if ordering is None:
+                ordering = sorted(
+                    range(len(self.contributors)),
+                    key=lambda i: self._sort_value(self.contributors[i], sort),
+                    reverse=self._default_order(sort) == 'desc',
+                )
+                self._orderings[sort] = ordering
+            return ordering
+
+    def _position_map(self, sort: str) -> List[int]:
+        ordering = self._ordering(sort)
+        with self._lock:
+            positions = self._positions.get(sort)
+            if positions is None:
+                positions = [0] * len(ordering)
+                for position, index in enumerate(ordering):
+                    positions[index] = position
+                self._positions[sort] = positions
+            return positions
+
+    def _match_prefix(self, prefix: str) -> List[int]:
+        matched = []
+        position = bisect_left(self._email_keys, prefix)
+        while position < len(self._emails) and self._email_keys[position].startswith(prefix):
+            matched.append(self._emails[position][1])
+            position += 1
+        return matched
+
+    @staticmethod
+    def _default_order(sort: str) -> str:
+        return 'asc' if sort in ('name', 'email') else 'desc'
+
+    @staticmethod
+    def _sort_value(contributor: Dict[str, Any], sort: str):
+        if sort in ('name', 'email'):
+            return (str(contributor.get(sort) or '').lower(), contributor.get('rank', 0))
+        # 同值时保持原有排名顺序
+        return (contributor.get(sort) or 0, -contributor.get('rank', 0))
+
+
+class ContributorIndexCache:
+    """按缓存键保存贡献者索引（进程内 LRU + TTL）"""
+
+    def __init__(self, max_size: int = 32, ttl: int = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items: 'OrderedDict[str, Tuple[ContributorIndex, float]]' = OrderedDict()
+
+    def get(self, key: str) -> Optional[ContributorIndex]:
+        with self._lock:
+            record = self._items.get(key)
+            if record is None:
+                return None
+            index, expire_at = record
+            if expire_at < time.time():
+                self._items.pop(key, None)
+                return None
+            self._items.move_to_end(key)
+            return index
+
+    def set(self, key: str, index: ContributorIndex) -> None:
+        with self._lock:
+            self._items[key] = (index, time.time() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
@@ -0,0 +1,254 @@
+"""
+全局仓库拉取调度器
+
+所有请求共享一个有界的工作队列：全局并发上限、交互请求优先于后台预热、
+相同的单项目任务只执行一次，并导出队列深度与排队等待时间指标。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from app.utils.metrics import metrics
+from app.utils.profiler import run_profiled
+
+try:  # pragma: no cover - Windows 没有 fcntl
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+# 数值越小优先级越高
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BACKGROUND: 'background'}
+
+SLOT_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class _Task:
+    key: Hashable
+    func: Callable[..., Any]
+    args: tuple
+    kwargs: Dict[str, Any]
+    priority: int
+    enqueued_at: float
+    future: Future = field(default_factory=Future)
+    started: bool = False
+    # 提交方的上下文（请求耗时拆分等），在工作线程中执行任务时沿用
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class FetchSlots:
+    """
+    跨 worker 的全局并发槽位（fcntl 文件锁）
+
+    lock_dir 下有 slots 个槽位文件，拿到任意一个槽位的文件锁即可执行；
+    所有 gunicorn worker 共享同一组槽位。
+    """
+
+    def __init__(self, lock_dir: str, slots: int):
+        self.lock_dir = os.path.abspath(lock_dir)
+        self.slots = slots
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        requested_at = time.time()
+        while True:
+            for slot in range(self.slots):
+                fd = os.open(os.path.join(self.lock_dir, f"fetch-slot-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+
+                metrics.observe('fetch_slot_wait_seconds', time.time() - requested_at)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                return
+            time.sleep(SLOT_POLL_INTERVAL)
+
+
+class FetchScheduler:
+    """
+    进程内共享的有界任务队列
+
+    submit() 返回 concurrent.futures.Future，可以直接配合 as_completed / wait 使用。
+    相同 key 的任务在排队或执行期间只保留一份，后来的请求共享同一个 Future；
+    交互请求提交的任务如果已经以后台优先级排队，会被提升为交互优先级。
+    工作线程在第一次提交任务时才启动，fork 之后（pid 变化）会重新创建。
+    """
+
+    def __init__(self, max_concurrency: int = 5, slots: Optional[FetchSlots] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.slots = slots if slots is not None and fcntl is not None else None
+        if slots is not None and self.slots is None:
+            logger.warning("当前平台不支持 fcntl，跨 worker 拉取并发限制不生效")
+
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+        self._queue: List[tuple] = []
+        self._tasks: Dict[Hashable, _Task] = {}
+        self._running = 0
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+
+    # ------------------------------------------------------------------
+    # 公共 API
+    # ------------------------------------------------------------------
+    def submit(
+        self,
+        key: Hashable,
+        func: Callable[..., Any],
+        *args,
+        priority: int = PRIORITY_INTERACTIVE,
+        **kwargs,
+    ) -> Future:
+        """提交任务；key 相同且尚未完成的任务直接复用"""
+        with self._condition:
+            self._ensure_workers()
+
+            task = self._tasks.get(key)
+            if task is not None and not task.future.cancelled():
+                metrics.inc('fetch_tasks_deduplicated_total')
+                if not task.started and priority < task.priority:
+                    # 重新入队一份更高优先级的记录，旧记录出队时会被跳过
+                    task.priority = priority
+                    heapq.heappush(self._queue, (priority, next(self._counter), task))
+                    self._condition.notify()
+                return task.future
+
+            task = _Task(key, func, args, kwargs, priority, time.time())
+            self._tasks[key] = task
+            heapq.heappush(self._queue, (priority, next(self._counter), task))
+            metrics.inc('fetch_tasks_total', labels={'priority': _priority_name(priority)})
+            self._publish_gauges()
+            self._condition.notify()
+            return task.future
+
+    def ensure_concurrency(self, concurrency: int) -> None:
+        """把并发上限提高到至少 concurrency（工作线程已启动时补齐新增的线程）"""
+        with self._condition:
+            if concurrency <= self.max_concurrency:
+                return
+            if self._pid == os.getpid():
+                threads = [
+                    threading.Thread(target=self._worker, name=f"fetch-worker-{i}", daemon=True)
+                    for i in range(self.max_concurrency, concurrency)
+                ]
+                for thread in threads:
+                    thread.start()
+                self._threads.extend(threads)
+            logger.info("仓库拉取调度器并发上限: %s -> %s", self.max_concurrency, concurrency)
+            self.max_concurrency = concurrency
+
+    def stats(self) -> Dict[str, int]:
+        """当前排队 / 执行中的任务数"""
+        with self._condition:
+            return {
+                'queued': len(self._tasks) - self._running,
+                'running': self._running,
+                'max_concurrency': self.max_concurrency,
+            }
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+    def _ensure_workers(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        if self._pid is not None:
+            # fork 出来的子进程：父进程的线程和队列都不可用
+            self._queue = []
+            self._tasks = {}
+            self._running = 0
+        self._pid = pid
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"fetch-worker-{i}", daemon=True)
+            for i in range(self.max_concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info("仓库拉取调度器已启动: 并发上限 %s", self.max_concurrency)
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                task = self._next_task()
+                while task is None:
+                    self._condition.wait()
+                    task = self._next_task()
+                task.started = True
+                self._running += 1
+                self._publish_gauges()
+
+            metrics.observe(
+                'fetch_queue_wait_seconds',
+                time.time() - task.enqueued_at,
+                labels={'priority': _priority_name(task.priority)},
+            )
+            try:
+                self._run(task)
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self._forget(task)
+                    self._publish_gauges()
+
+    def _next_task(self) -> Optional[_Task]:
+        while self._queue:
+            priority, _, task = heapq.heappop(self._queue)
+            # 跳过已提升优先级（重复入队）或已取消的旧记录
+            if task.started or priority != task.priority:
+                continue
+            if not task.future.set_running_or_notify_cancel():
+                self._forget(task)
+                continue
+            return task
+        return None
+
+    def _forget(self, task: _Task) -> None:
+        # 同一个 key 可能已经被新提交的任务占用
+        if self._tasks.get(task.key) is task:
+            del self._tasks[task.key]
+
+    def _run(self, task: _Task) -> None:
+        try:
+            if self.slots is not None:
+                with self.slots.acquire():
+                    result = task.context.run(run_profiled, task.func, *task.args, **task.kwargs)
+            else:
+                result = task.context.run(run_profiled, task.func, *task.args, **task.kwargs)
+        except BaseException as exc:
+            task.future.set_exception(exc)
+        else:
+            task.future.set_result(result)
+
+    def _publish_gauges(self) -> None:
+        metrics.set_gauge('fetch_queue_depth', len(self._tasks) - self._running)
+        metrics.set_gauge('fetch_running', self._running)
+
+
+def _priority_name(priority: int) -> str:
+    return PRIORITY_NAMES.get(priority, str(priority))
@@ -4,28 +4,180 @@ Git 仓库管理服务
 
 import os
 import shutil
+from datetime import date, datetime, timedelta
 from git import Repo, GitCommandError
 from typing import List, Optional
 import logging
 from app.models.commit import Commit
+from app.services.repo_lock import RepoLockManager
+from app.utils.author_identity import author_table
+from app.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# 单个项目默认最多读取的 commit 数
+DEFAULT_MAX_COUNT = 10000
+
+# git log 输出格式：每条记录以 \x1e 开头，字段以 \x1f 分隔，随后是 --numstat 行
+# 作者使用 .mailmap 映射后的姓名 / 邮箱（%aN / %aE），同时保留原始邮箱（%ae）作为别名
+GIT_LOG_FORMAT = '%x1e%H%x1f%aN%x1f%aE%x1f%ae%x1f%cI%x1f%B%x1f'
+
+
+def build_git_log_args(
+    ref: str = 'HEAD',
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    max_count: Optional[int] = None,
+) -> List[str]:
+    """
+    构建 git log 参数（不含 ``git log`` 本身）
+
+    git 按服务器时区解释 --since/--until，而统计和时间索引按提交者本地日期归属 commit，
+    因此日期边界各放宽一天，解析后再用 filter_commits_by_day 按提交者日期精确过滤。
+    放宽了窗口时 max_count 不交给 git（边缘日期的 commit 会占用名额），
+    而是由 filter_commits_by_day 在过滤后截取。
+    """
+    args = [
+        f'--format={GIT_LOG_FORMAT}',
+        '--numstat',
+        '--no-renames',
+        '--diff-merges=first-parent',
+    ]
+    if since:
+        args.append(f'--since={_expand_date(_widen_date(since, -1), end_of_day=False)}')
+    if until:
+        args.append(f'--until={_expand_date(_widen_date(until, 1), end_of_day=True)}')
+    if max_count and not _is_widened(since, until):
+        args.append(f'--max-count={int(max_count)}')
+    args.append(ref)
+    args.append('--')
+    return args
+
+
+def read_commits(
+    repo: Repo,
+    ref: str = 'HEAD',
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    max_count: Optional[int] = DEFAULT_MAX_COUNT,
+) -> List[Commit]:
+    """执行一次 ``git log --numstat`` 并解析为 Commit 列表"""
+    args = build_git_log_args(ref, since=since, until=until, max_count=max_count)
+    with metrics.timer('git_log_seconds', span='git_log'):
+        output = repo.git.log(*args, stdout_as_string=False)
+    with metrics.timer('git_log_parse_seconds', span='git_parse'):
+        commits = parse_git_log(output.decode('utf-8', errors='replace'))
+    return filter_commits_by_day(commits, since, until, max_count)
+
+
+def filter_commits_by_day(
+    commits: List[Commit],
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    max_count: Optional[int] = None,
+) -> List[Commit]:
+    """
+    按提交者本地日期保留 [since, until] 内的 commit（与时间索引的日期归属一致）
+
+    max_count 为过滤后按 git log 输出顺序（新 -> 旧）保留的最大条数。
+    """
+    since = since if since and _is_plain_date(since) else None
+    until = until if until and _is_plain_date(until) else None
+    if since or until:
+        commits = [
+            commit for commit in commits
+            if (not since or commit.timestamp.date().isoformat() >= since)
+            and (not until or commit.timestamp.date().isoformat() <= until)
+        ]
+    return commits[:max_count] if max_count else commits
+
+
+def parse_git_log(output: str) -> List[Commit]:
+    """解析 build_git_log_args 格式的 git log 输出"""
+    commits: List[Commit] = []
+    for record in output.split('\x1e'):
+        if not record.strip():
+            continue
+        try:
+            commits.append(parse_git_log_record(record))
+        except Exception as e:
+            logger.warning(f"解析commit失败: {e}")
+    return commits
+
+
+def parse_git_log_record(record: str) -> Commit:
+    """解析单条 git log 记录（同时把作者驻留为规范 id）"""
+    sha, author_name, author_email, raw_email, committed_at, message, numstat = record.split('\x1f', 6)
+
+    additions = deletions = files_changed = 0
+    for line in numstat.splitlines():
+        if not line:
+            continue
+        added, deleted, _ = line.split('\t', 2)
+        files_changed += 1
+        # 二进制文件显示为 "-"
+        if added != '-':
+            additions += int(added)
+        if deleted != '-':
+            deletions += int(deleted)
+
+    return Commit(
+        hash=sha[:8],  # 短hash
+        author_name=author_name,
+        author_email=author_email,
+        timestamp=datetime.fromisoformat(committed_at),
+        message=message.strip(),
+        additions=additions,
+        deletions=deletions,
+        files_changed=files_changed,
+        author_id=author_table.intern(author_email, author_name),
+        author_alias=raw_email if raw_email.strip().lower() != author_email.strip().lower() else None,
+    )
+
+
+def _is_plain_date(value: str) -> bool:
+    return len(value.strip()) == 10
+
+
+def _is_widened(since: Optional[str], until: Optional[str]) -> bool:
+    """build_git_log_args 是否放宽了日期窗口"""
+    return bool(since and _is_plain_date(since)) or bool(until and _is_plain_date(until))
+
+
+def _widen_date(value: str, days: int) -> str:
+    """YYYY-MM-DD 前后移动若干天（提交者时区与服务器时区相差不超过一天）"""
+    if not _is_plain_date(value):
+        return value
+    try:
+        return (date.fromisoformat(value.strip()) + timedelta(days=days)).isoformat()
+    except (ValueError, OverflowError):
+        return value
+
+
+def _expand_date(value: str, end_of_day: bool) -> str:
+    """YYYY-MM-DD 补全为当天起止时刻，避免 git 用当前时刻补全时间部分"""
+    value = value.strip()
+    if len(value) == 10:
+        return f"{value} {'23:59:59' if end_of_day else '00:00:00'}"
+    return value
+
 
 class GitService:
     """Git 仓库管理服务"""
     
-    def __init__(self, workspace_dir: str = './repos'):
+    def __init__(self, workspace_dir: str = './repos', lock_manager: Optional[RepoLockManager] = None):
         """
         初始化
         
         Args:
             workspace_dir: Git仓库工作目录
+            lock_manager: 仓库锁管理器（默认使用 <workspace>/_locks 下的文件锁）
         """
         self.workspace_dir = workspace_dir
         self.mirror_dir = os.path.join(workspace_dir, '_mirror')
         os.makedirs(workspace_dir, exist_ok=True)
         os.makedirs(self.mirror_dir, exist_ok=True)
+        self.lock_manager = lock_manager or RepoLockManager(os.path.join(workspace_dir, '_locks'))
         logger.info(f"Git工作目录: {workspace_dir}")
         logger.info(f"Git镜像目录: {self.mirror_dir}")
     
@@ -41,33 +193,34 @@ class GitService:
             Repo: GitPython 仓库对象
         
         Note:
-            所有在线项目都存储在 repos/_mirror/<project_id>/ 目录下
+            所有在线项目都存储在 repos/_mirror/<project_id>/ 目录下。
+            同一项目的克隆/刷新在线程和 worker 之间互斥，等待锁期间若已有
+            其它请求完成了克隆或刷新，则直接复用其结果。
         """
         repo_path = os.path.join(self.mirror_dir, project_name)
-        
+
+        with self.lock_manager.acquire(project_name) as handle:
+            if os.path.exists(repo_path) and self.lock_manager.refreshed_since(project_name, handle.requested_at):
+                logger.info(f"复用并发请求刚更新的仓库: {project_name}")
+                return Repo(repo_path)
+
+            repo = self._get_or_clone_repo_locked(repo_url, project_name, repo_path, force_refresh)
+            self.lock_manager.mark_fresh(project_name)
+            return repo
+
+    def _get_or_clone_repo_locked(self, repo_url: str, project_name: str, repo_path: str, force_refresh: bool) -> Repo:
         # 强制刷新：删除已有仓库，重新克隆
         if force_refresh and os.path.exists(repo_path):
             logger.info(f"强制刷新仓库: {project_name} -> 删除 {repo_path}")
             self._remove_repo_dir(repo_path)
 
-        # 如果仓库已存在，尝试更新
+        # 如果仓库已存在，只 fetch 跟踪分支，不合并到工作区
         if os.path.exists(repo_path):
             try:
                 repo = Repo(repo_path)
                 logger.info(f"本地仓库已存在: {project_name}，正在更新...")
-                
-                # 获取远程更新
-                origin = repo.remote('origin')
-                origin.fetch()
-                
-                # 更新当前分支
-                try:
-                    origin.pull()
-                    logger.info(f"仓库更新成功: {project_name}")
-                except GitCommandError as pull_error:
-                    logger.warning(f"Pull 失败，尝试 fetch: {pull_error}")
-                    # 即使 pull 失败，fetch 的数据也已经拉取
-                
+                changed = self.refresh_repo(repo)
+                logger.info(f"仓库更新成功: {project_name} ({'有新提交' if changed else '无变化'})")
                 return repo
             except Exception as e:
                 logger.warning(f"更新仓库失败: {e}，将重新克隆")
@@ -86,15 +239,16 @@ class GitService:
                 'no_checkout': False,  # 需要检出文件以便分析
             }
             
-            repo = Repo.clone_from(
-                repo_url, 
-                repo_path,
-                **clone_options
-            )
+            with metrics.timer('git_clone_seconds', span='git_clone'):
+                repo = Repo.clone_from(
+                    repo_url, 
+                    repo_path,
+                    **clone_options
+                )
             
             logger.info(f"✅ 仓库克隆成功: {project_name}")
             logger.info(f"   - 仓库大小: {self._get_repo_size(repo_path)} MB")
-            logger.info(f"   - Commit 数量: {sum(1 for _ in repo.iter_commits())}")
+            logger.info(f"   - Commit 数量: {repo.git.rev_list('--count', 'HEAD')}")
             
             return repo
             
@@ -128,23 +282,31 @@ class GitService:
         except Exception:
             return 0.0
     
-    def get_repo_from_path(self, repo_path: str, force_refresh: bool = False) -> Repo:
+    def get_repo_from_path(self, repo_path: str, force_refresh: bool = False, lock_key: Optional[str] = None) -> Repo:
         """
         从现有路径获取仓库
         
         Args:
             repo_path: 仓库路径
+            lock_key: 刷新时使用的仓库锁键（默认取目录名，已登记的项目应传入 project_id）
         
         Returns:
             Repo对象
         """
         try:
             repo = Repo(repo_path)
-            if force_refresh:
-                self._refresh_existing_repo(repo, repo_path)
-            return repo
         except Exception as e:
             raise ValueError(f"打开仓库失败: {str(e)}")
+
+        if force_refresh:
+            key = lock_key or os.path.basename(os.path.abspath(repo_path))
+            with self.lock_manager.acquire(key) as handle:
+                if self.lock_manager.refreshed_since(key, handle.requested_at):
+                    logger.info(f"复用并发请求刚刷新的仓库: {repo_path}")
+                else:
+                    self._refresh_existing_repo(repo, repo_path)
+                    self.lock_manager.mark_fresh(key)
+        return repo
     
     def get_commits(
         self, 
@@ -152,59 +314,33 @@ class GitService:
         branch: str = 'HEAD',
         since: Optional[str] = None,
         until: Optional[str] = None,
-        max_count: int = 10000
+        max_count: Optional[int] = DEFAULT_MAX_COUNT
     ) -> List[Commit]:
         """
         获取仓库的 commit 列表
+
+        通过一次 ``git log --numstat`` 获取提交及增删行数，since/until/max_count
+        直接下推给 git，只解析需要的时间窗口。
         
         Args:
             repo: 仓库对象
             branch: 分支名称
-            since: 开始日期 (YYYY-MM-DD)
-            until: 结束日期 (YYYY-MM-DD)
+            since: 开始日期 (YYYY-MM-DD，包含当天)
+            until: 结束日期 (YYYY-MM-DD，包含当天)
             max_count: 最大commit数量
         
         Returns:
             List[Commit]: Commit 对象列表
         """
-        commits = []
-        
-        # 构建 git log 参数
-        kwargs = {}
-        if since:
-            kwargs['since'] = since
-        if until:
-            kwargs['until'] = until
-        
-        # 遍历 commit
         try:
-            for i, git_commit in enumerate(repo.iter_commits(branch, **kwargs)):
-                if i >= max_count:
-                    break
-                
-                try:
-                    commit = Commit(
-                        hash=git_commit.hexsha[:8],  # 短hash
-                        author_name=git_commit.author.name,
-                        author_email=git_commit.author.email,
-                        timestamp=git_commit.committed_datetime,
-                        message=git_commit.message.strip(),
-                        additions=git_commit.stats.total['insertions'],
-                        deletions=git_commit.stats.total['deletions'],
-                        files_changed=git_commit.stats.total['files']
-                    )
-                    commits.append(commit)
-                except Exception as e:
-                    logger.warning(f"解析commit失败: {e}")
-                    continue
-            
-            logger.info(f"获取commits成功: {len(commits)}条")
-            return commits
-            
-        except Exception as e:
+            commits = read_commits(repo, branch, since=since, until=until, max_count=max_count)
+        except GitCommandError as e:
             logger.error(f"获取commits失败: {e}")
             raise
 
+        logger.info(f"获取commits成功: {len(commits)}条")
+        return commits
+
     def _remove_repo_dir(self, path: str):
         if not os.path.exists(path):
             return
@@ -215,19 +351,134 @@ class GitService:
             logger.error(f"删除仓库目录失败 ({path}): {e}")
             raise
 
-    def _refresh_existing_repo(self, repo: Repo, repo_path: str):
+    def _refresh_existing_repo(self, repo: Repo, repo_path: str) -> bool:
         try:
-            remotes = list(repo.remotes)
-            if not remotes:
-                logger.debug(f"仓库 {repo_path} 没有远程配置，跳过刷新")
-                return
-            origin = remotes[0]
-            logger.info(f"刷新仓库 {repo_path}: fetch & pull")
-            origin.fetch()
-            try:
-                origin.pull()
-            except GitCommandError as pull_error:
-                logger.warning(f"pull 失败，将忽略: {pull_error}")
+            return self.refresh_repo(repo)
         except Exception as e:
             logger.warning(f"刷新仓库失败 ({repo_path}): {e}")
+            return False
+
+    def refresh_repo(self, repo: Repo) -> bool:
+        """
+        只 fetch 跟踪分支并更新 refs/remotes/<remote>/<branch>，不触碰工作区
+
+        Args:
+            repo: 仓库对象
+
+        Returns:
+            bool: 远程分支是否有新的提交
+
+        Raises:
+            GitCommandError: fetch 失败
+        """
+        remotes = list(repo.remotes)
+        if not remotes:
+            logger.debug(f"仓库 {repo.working_tree_dir} 没有远程配置，跳过刷新")
+            return False
+
+        remote = next((r for r in remotes if r.name == 'origin'), remotes[0])
+        branch = self._tracked_branch(repo)
+        if not branch:
+            logger.debug(f"仓库 {repo.working_tree_dir} 处于分离 HEAD 状态，跳过刷新")
+            return False
+
+        remote_ref = f"refs/remotes/{remote.name}/{branch}"
+        before = self._rev_parse(repo, remote_ref)
+        logger.info(f"刷新仓库 {repo.working_tree_dir}: fetch {remote.name}/{branch}")
+        with metrics.timer('git_fetch_seconds', span='git_fetch'):
+            repo.git.fetch(remote.name, f"+refs/heads/{branch}:{remote_ref}", '--no-tags')
+        after = self._rev_parse(repo, remote_ref)
+
+        return before != after
+
+    def resolve_commit_ref(self, repo: Repo) -> str:
+        """
+        返回用于读取 commit 的引用
+
+        远程分支领先于本地 HEAD 时直接读取 <remote>/<branch>，无需先合并到工作区；
+        本地存在未推送的提交或没有远程分支时读取 HEAD。
+        """
+        remote_ref = self._remote_tracking_ref(repo)
+        if not remote_ref:
+            return 'HEAD'
+
+        head_sha = self._rev_parse(repo, 'HEAD')
+        remote_sha = self._rev_parse(repo, remote_ref)
+        if not remote_sha or remote_sha == head_sha:
+            return 'HEAD'
+        if head_sha and not self.is_ancestor(repo, head_sha, remote_sha):
+            return 'HEAD'
+        return remote_ref
+
+    def get_head_sha(self, repo: Repo, ref: str = 'HEAD') -> Optional[str]:
+        """获取引用指向的 commit 哈希，不存在时返回 None"""
+        return self._rev_parse(repo, ref)
+
+    def sync_working_tree(self, repo_path: str, lock_key: Optional[str] = None) -> bool:
+        """
+        将工作区快进到远程跟踪分支（仅文件采集等需要读取文件内容的场景调用）
 
+        Args:
+            repo_path: 仓库路径
+            lock_key: 仓库锁键（默认取目录名，已登记的项目应传入 project_id，与刷新使用同一把锁）
+
+        Returns:
+            bool: 工作区是否发生更新
+        """
+        try:
+            repo = Repo(repo_path)
+        except Exception as e:
+            logger.debug(f"非 Git 目录，跳过工作区同步 ({repo_path}): {e}")
+            return False
+
+        key = lock_key or os.path.basename(os.path.abspath(repo_path))
+        with self.lock_manager.acquire(key):
+            ref = self.resolve_commit_ref(repo)
+            if ref == 'HEAD':
+                return False
+
+            try:
+                repo.git.merge('--ff-only', ref)
+                logger.info(f"工作区已快进到 {ref}: {repo_path}")
+                return True
+            except GitCommandError as e:
+                logger.warning(f"工作区快进失败 ({repo_path}): {e}")
+                return False
+
+    def _tracked_branch(self, repo: Repo) -> Optional[str]:
+        try:
+            head = repo.active_branch
+        except TypeError:
+            return None
+        tracking = head.tracking_branch()
+        if tracking is not None:
+            return tracking.remote_head
+        return head.name
+
+    def _remote_tracking_ref(self, repo: Repo) -> Optional[str]:
+        try:
+            tracking = repo.active_branch.tracking_branch()
+        except TypeError:
+            return None
+        if tracking is None:
+            remotes = list(repo.remotes)
+            if not remotes:
+                return None
+            branch = self._tracked_branch(repo)
+            remote = next((r for r in remotes if r.name == 'origin'), remotes[0])
+            return f"{remote.name}/{branch}" if branch else None
+        return tracking.name
+
+    def _rev_parse(self, repo: Repo, ref: str) -> Optional[str]:
+        try:
+            return repo.git.rev_parse('--verify', '--quiet', f"{ref}^{{commit}}")
+        except GitCommandError:
+            return None
+
+    def is_ancestor(self, repo: Repo, ancestor: str, descendant: str) -> bool:
+        """ancestor 是否为 descendant 的祖先（或同一提交）"""
+        try:
+            repo.git.merge_base('--is-ancestor', ancestor, descendant)
+            return True
+        except GitCommandError:
+            return False
@@ -0,0 +1,87 @@
+"""
+多进程 commit 解析
+
+git 命令返回后，解析输出和构造 Commit 都是纯 Python 计算，线程之间受 GIL 限制只能串行。
+进程模式下把单个项目的 git log 解析与汇总放到子进程中执行，子进程只回传
+星期 × 小时直方图和日汇总这类紧凑的部分结果，而不是 commit 列表，进程间通信开销很小。
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from git import Repo
+
+from app.services.commit_index import DailyRollup, WindowAggregate
+from app.services.git_service import read_commits
+
+logger = logging.getLogger(__name__)
+
+
+def aggregate_project_window(
+    repo_path: str,
+    ref: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    max_count: Optional[int] = None,
+) -> Tuple[WindowAggregate, List[DailyRollup]]:
+    """（在子进程中）读取并汇总单个项目窗口内的 commit"""
+    commits = read_commits(Repo(repo_path), ref, since=since, until=until, max_count=max_count)
+    return WindowAggregate.from_commits(commits), DailyRollup.from_commits(commits)
+
+
+class ProcessIngestPool:
+    """
+    按需创建的进程池
+
+    进程池在第一次使用时才创建，并记录创建时的 pid：gunicorn preload_app 在 fork
+    之后，每个 worker 都会重新创建自己的进程池，而不是复用父进程中已失效的池。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    def aggregate(
+        self,
+        repo_path: str,
+        ref: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[WindowAggregate, List[DailyRollup]]:
+        """在子进程中汇总单个项目，等待结果（超时抛出 TimeoutError）"""
+        future = self._get_executor().submit(
+            aggregate_project_window, repo_path, ref, since, until, max_count
+        )
+        return future.result(timeout=timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._pid = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(_start_method()),
+                )
+                self._pid = os.getpid()
+                logger.info("解析进程池已创建: %s 个进程 (%s)", self.max_workers, _start_method())
+            return self._executor
+
+
+def _start_method() -> str:
+    # 服务进程内有多个线程，避免直接 fork
+    methods = multiprocessing.get_all_start_methods()
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
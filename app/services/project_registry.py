@@ -1,4 +1,13 @@
-"""项目存储与映射管理"""
+"""
+项目存储与映射管理
+
+映射默认保存在工作目录下的 SQLite 数据库（WAL 模式）中：每次注册只写入变化的行，
+写入是原子的，多个 gunicorn worker 可以同时读写，并通过 PRAGMA data_version
+感知其它进程的修改。旧版的 _registry.json 在第一次打开时自动导入。
+
+本地路径项目在 _mirror 下保存一份副本：Git 仓库用 git clone --local（对象硬链接）创建，
+origin 指向源路径，之后的刷新就是一次从本地路径的 git fetch；非 Git 目录按 mtime/size 增量同步。
+"""
 
 from __future__ import annotations
 
@@ -8,13 +17,41 @@ import logging
 import os
 import re
 import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
 from dataclasses import dataclass
 from threading import RLock
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from git import GitCommandError, InvalidGitRepositoryError, NoSuchPathError, Repo
+
+from app.services.repo_lock import RepoLockManager
+from app.utils.metrics import metrics
 
 
 logger = logging.getLogger(__name__)
 
+# sqlite：SQLite WAL 数据库（默认）；json：旧版 _registry.json（每次变更整体重写）
+REGISTRY_BACKENDS = ('sqlite', 'json')
+
+# incremental：Git 仓库 clone --local / fetch，其它目录按 mtime/size 同步（默认）；copy：旧版整目录复制
+MIRROR_MODES = ('incremental', 'copy')
+
+MIRROR_IGNORE_NAMES = ('__pycache__', '.DS_Store')
+MIRROR_IGNORE_SUFFIXES = ('.pyc',)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS project_registry (
+    identifier TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
 
 @dataclass(frozen=True)
 class ProjectEntry:
@@ -26,18 +63,41 @@ class ProjectEntry:
 
 
 class ProjectRegistry:
-    """负责记录项目标识与本地存储路径的映射, 并在需要时创建本地副本"""
+    """
+    负责记录项目标识与本地存储路径的映射, 并在需要时创建本地副本
 
-    def __init__(self, workspace_dir: str = './repos') -> None:
+    内存中保留一份映射用于读取和判断注册是否为空操作，并维护两个二级索引
+    （路径 → 标识、项目ID → 别名），在注册和重新加载时同步更新；SQLite 连接按 pid 懒创建
+    （gunicorn preload 时全局实例在主进程中创建，连接不能跨 fork 复用）。
+    """
+
+    def __init__(self, workspace_dir: str = './repos', backend: str = 'sqlite', mirror_mode: str = 'incremental') -> None:
         self.workspace_dir = os.path.abspath(workspace_dir)
         self.mirror_dir = os.path.join(self.workspace_dir, '_mirror')
         self.registry_path = os.path.join(self.workspace_dir, '_registry.json')
+        self.db_path = os.path.join(self.workspace_dir, '_registry.db')
 
         os.makedirs(self.workspace_dir, exist_ok=True)
         os.makedirs(self.mirror_dir, exist_ok=True)
 
+        backend = (backend or 'sqlite').lower()
+        if backend not in REGISTRY_BACKENDS:
+            raise ValueError(f"未知的项目注册表后端: {backend}")
+        self.backend = backend
+
+        mirror_mode = (mirror_mode or 'incremental').lower()
+        if mirror_mode not in MIRROR_MODES:
+            raise ValueError(f"未知的本地项目镜像模式: {mirror_mode}")
+        self.mirror_mode = mirror_mode
+
         self._lock = RLock()
-        self._registry: Dict[str, Dict[str, str]] = self._load_registry()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._data_version: Optional[int] = None
+        # 二级索引：值为按注册顺序排列的标识集合（dict 充当有序集合）
+        self._by_path: Dict[str, Dict[str, None]] = {}
+        self._by_id: Dict[str, Dict[str, None]] = {}
+        self._set_registry(self._load_registry())
 
     # ------------------------------------------------------------------
     # 公共 API
@@ -51,6 +111,7 @@ class ProjectRegistry:
             return None
         normalized = self._normalize(identifier)
         with self._lock:
+            self._sync()
             data = self._registry.get(normalized)
             if not data:
                 return None
@@ -60,6 +121,26 @@ class ProjectRegistry:
                 return None
             return ProjectEntry(normalized, project_id, path)
 
+    def get_entries(self, identifiers: Iterable[str]) -> Dict[str, Optional[ProjectEntry]]:
+        """批量查询（一次加锁、一次同步），用于解析整个 projects= 列表；未注册的标识对应 None"""
+        with self._lock:
+            self._sync()
+            entries: Dict[str, Optional[ProjectEntry]] = {}
+            for identifier in identifiers:
+                normalized = self._normalize(identifier) if identifier else ''
+                data = self._registry.get(normalized) if normalized else None
+                if data and data.get('path') and data.get('id'):
+                    entries[identifier] = ProjectEntry(normalized, data['id'], data['path'])
+                else:
+                    entries[identifier] = None
+            return entries
+
+    def get_aliases(self, project_id: str) -> List[str]:
+        """指向同一个项目ID的所有标识（URL、名称、路径、ID 本身）"""
+        with self._lock:
+            self._sync()
+            return list(self._by_id.get(project_id, ()))
+
     def generate_project_id(self, seed: str) -> str:
         """
         生成项目唯一ID（12位哈希值）
@@ -86,23 +167,25 @@ class ProjectRegistry:
         project_id = project_id or self._find_project_id_by_path(local_path) or self.generate_project_id(normalized)
 
         with self._lock:
-            need_save = False
+            self._sync()
+            changes: Dict[str, Dict[str, str]] = {}
 
             current = self._registry.get(normalized)
             if not (current and current.get('path') == local_path and current.get('id') == project_id):
-                self._registry[normalized] = {'path': local_path, 'id': project_id}
-                need_save = True
+                changes[normalized] = {'path': local_path, 'id': project_id}
                 logger.debug("项目映射: %s -> %s (%s)", normalized, local_path, project_id)
 
             if project_id and project_id != normalized:
                 alias_current = self._registry.get(project_id)
                 if not (alias_current and alias_current.get('path') == local_path and alias_current.get('id') == project_id):
-                    self._registry[project_id] = {'path': local_path, 'id': project_id}
-                    need_save = True
+                    changes[project_id] = {'path': local_path, 'id': project_id}
                     logger.debug("项目别名映射: %s -> %s", project_id, local_path)
 
-            if need_save:
-                self._save_registry()
+            # 映射未变化（绝大多数调用）时不触碰磁盘
+            if changes:
+                self._apply(changes)
+                self._save_registry(changes)
+            metrics.inc('project_registry_registrations_total', labels={'result': 'updated' if changes else 'noop'})
 
     def ensure_local_copy(
         self,
@@ -111,8 +194,14 @@ class ProjectRegistry:
         force_refresh: bool = False,
         project_id: Optional[str] = None,
         aliases: Optional[list[str]] = None,
+        lock_manager: Optional[RepoLockManager] = None,
     ) -> ProjectEntry:
-        """确保项目在工作目录内有一份完整副本, 返回本地路径及唯一标识"""
+        """
+        确保项目在工作目录内有一份完整副本, 返回本地路径及唯一标识
+
+        传入 lock_manager 时镜像的创建和刷新在以 project_id 为键的仓库锁内进行（与 GitService 刷新同一项目互斥），
+        刷新后写入新鲜度标记；等锁期间已被其它请求刷新过的镜像不再重复 fetch。
+        """
 
         source_abs = os.path.abspath(source_path)
         project_id = project_id or self._find_project_id_by_path(source_abs) or self.generate_project_id(identifier or source_abs)
@@ -123,17 +212,34 @@ class ProjectRegistry:
             target_name = project_id
             target_path = os.path.join(self.mirror_dir, target_name)
 
-            if force_refresh and os.path.exists(target_path):
-                shutil.rmtree(target_path, ignore_errors=True)
-
-            if not os.path.exists(target_path):
-                logger.info("复制项目到本地缓存: %s -> %s", source_abs, target_path)
-                shutil.copytree(
-                    source_abs,
-                    target_path,
-                    dirs_exist_ok=False,
-                    ignore=shutil.ignore_patterns('__pycache__', '*.pyc', '.DS_Store')
-                )
+            with lock_manager.acquire(project_id) if lock_manager is not None else nullcontext() as handle:
+                if (
+                    force_refresh
+                    and handle is not None
+                    and os.path.exists(target_path)
+                    and lock_manager.refreshed_since(project_id, handle.requested_at)
+                ):
+                    logger.info("复用并发请求刚刷新的本地缓存: %s", target_path)
+                    force_refresh = False
+
+                if self.mirror_mode == 'incremental':
+                    self._sync_mirror(source_abs, target_path, force_refresh)
+                else:
+                    if force_refresh and os.path.exists(target_path):
+                        shutil.rmtree(target_path, ignore_errors=True)
+
+                    if not os.path.exists(target_path):
+                        logger.info("复制项目到本地缓存: %s -> %s", source_abs, target_path)
+                        with metrics.timer('local_mirror_seconds', labels={'method': 'copy'}):
+                            shutil.copytree(
+                                source_abs,
+                                target_path,
+                                dirs_exist_ok=False,
+                                ignore=shutil.ignore_patterns('__pycache__', '*.pyc', '.DS_Store')
+                            )
+
+                if force_refresh and lock_manager is not None:
+                    lock_manager.mark_fresh(project_id)
 
         self.register_identifier(identifier, target_path, project_id)
 
@@ -149,6 +255,7 @@ class ProjectRegistry:
         normalized = self._normalize(identifier)
 
         with self._lock:
+            self._sync()
             data = self._registry.get(normalized)
             if data and data.get('path') and os.path.exists(data['path']):
                 return ProjectEntry(identifier=normalized, project_id=data['id'], path=data['path'])
@@ -157,6 +264,108 @@ class ProjectRegistry:
         repo_path = os.path.abspath(os.path.join(self.workspace_dir, project_id))
         return ProjectEntry(identifier=normalized, project_id=project_id, path=repo_path)
 
+    # ------------------------------------------------------------------
+    # 本地项目镜像
+    # ------------------------------------------------------------------
+    def _sync_mirror(self, source_path: str, target_path: str, force_refresh: bool) -> None:
+        """创建或增量刷新本地项目的镜像，耗时与变化量成正比"""
+        try:
+            Repo(source_path)
+            is_git = True
+        except (InvalidGitRepositoryError, NoSuchPathError):
+            is_git = False
+
+        if not is_git:
+            if force_refresh or not os.path.exists(target_path):
+                with metrics.timer('local_mirror_seconds', labels={'method': 'sync'}):
+                    copied, removed = self._sync_tree(source_path, target_path)
+                logger.info("同步项目文件到本地缓存: %s -> %s (更新 %s, 删除 %s)", source_path, target_path, copied, removed)
+            return
+
+        if not os.path.exists(target_path):
+            self._clone_local(source_path, target_path)
+            return
+
+        if force_refresh:
+            self._fetch_local(source_path, target_path)
+
+    def _clone_local(self, source_path: str, target_path: str) -> None:
+        """git clone --local：对象目录硬链接（跨文件系统时 git 自动改为复制）"""
+        # 先克隆到临时目录再改名，并发请求同时创建同一个镜像时只有一个生效
+        tmp_path = f"{target_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        logger.info("克隆本地项目到缓存: %s -> %s", source_path, target_path)
+        with metrics.timer('local_mirror_seconds', labels={'method': 'clone'}):
+            Repo.clone_from(source_path, tmp_path, local=True)
+        try:
+            os.rename(tmp_path, target_path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.exists(target_path):
+                raise
+
+    def _fetch_local(self, source_path: str, target_path: str) -> None:
+        """从源路径 fetch 新增的对象（旧版整目录复制的镜像会先把 origin 指向源路径）"""
+        try:
+            repo = Repo(target_path)
+        except (InvalidGitRepositoryError, NoSuchPathError):
+            logger.warning("本地缓存不是 Git 仓库，重新克隆: %s", target_path)
+            shutil.rmtree(target_path, ignore_errors=True)
+            self._clone_local(source_path, target_path)
+            return
+
+        if 'origin' not in [remote.name for remote in repo.remotes]:
+            repo.create_remote('origin', source_path)
+        elif os.path.abspath(repo.remotes.origin.url) != source_path:
+            logger.info("本地缓存 %s 的 origin 改为源路径 %s", target_path, source_path)
+            repo.remotes.origin.set_url(source_path)
+
+        try:
+            with metrics.timer('local_mirror_seconds', labels={'method': 'fetch'}):
+                repo.git.fetch('origin', '--prune', '--no-tags')
+        except GitCommandError as exc:
+            logger.warning("从本地路径刷新缓存失败 (%s): %s", source_path, exc)
+
+    def _sync_tree(self, source_path: str, target_path: str) -> Tuple[int, int]:
+        """按 mtime/size 同步目录：只复制新增或变化的文件，删除源中已不存在的文件"""
+        copied = removed = 0
+        for root, dirs, files in os.walk(source_path):
+            dirs[:] = [name for name in dirs if name not in MIRROR_IGNORE_NAMES]
+            relative = os.path.relpath(root, source_path)
+            target_root = os.path.normpath(os.path.join(target_path, relative))
+            os.makedirs(target_root, exist_ok=True)
+
+            wanted = set(dirs)
+            for name in files:
+                if name in MIRROR_IGNORE_NAMES or name.endswith(MIRROR_IGNORE_SUFFIXES):
+                    continue
+                wanted.add(name)
+                source_file = os.path.join(root, name)
+                target_file = os.path.join(target_root, name)
+                source_stat = os.stat(source_file)
+                try:
+                    target_stat = os.stat(target_file)
+                    unchanged = (
+                        target_stat.st_size == source_stat.st_size
+                        and target_stat.st_mtime_ns == source_stat.st_mtime_ns
+                    )
+                except FileNotFoundError:
+                    unchanged = False
+                if not unchanged:
+                    shutil.copy2(source_file, target_file)
+                    copied += 1
+
+            for name in os.listdir(target_root):
+                if name in wanted:
+                    continue
+                stale = os.path.join(target_root, name)
+                if os.path.isdir(stale) and not os.path.islink(stale):
+                    shutil.rmtree(stale, ignore_errors=True)
+                else:
+                    os.remove(stale)
+                removed += 1
+        return copied, removed
+
     # ------------------------------------------------------------------
     # 内部工具
     # ------------------------------------------------------------------
@@ -164,6 +373,15 @@ class ProjectRegistry:
         return identifier.strip()
 
     def _load_registry(self) -> Dict[str, Dict[str, str]]:
+        if self.backend == 'sqlite':
+            try:
+                return self._load_db_registry()
+            except sqlite3.Error as exc:
+                logger.warning("项目注册表数据库不可用，降级为 JSON 文件: %s", exc)
+                self.backend = 'json'
+        return self._load_json_registry()
+
+    def _load_json_registry(self) -> Dict[str, Dict[str, str]]:
         if not os.path.exists(self.registry_path):
             return {}
         try:
@@ -202,23 +420,158 @@ class ProjectRegistry:
 
         return registry
 
-    def _save_registry(self) -> None:
+    def _save_registry(self, changes: Dict[str, Dict[str, str]]) -> None:
+        if self.backend == 'sqlite':
+            try:
+                self._upsert(changes)
+                return
+            except sqlite3.Error as exc:
+                metrics.inc('project_registry_write_errors_total')
+                logger.error("保存项目映射失败: %s", exc)
+                return
+
+        # JSON 后端：先写临时文件再替换，避免并发读取到写了一半的文件
         try:
-            with open(self.registry_path, 'w', encoding='utf-8') as fp:
-                json.dump(self._registry, fp, ensure_ascii=False, indent=2)
+            fd, tmp_path = tempfile.mkstemp(prefix='_registry.', suffix='.tmp', dir=self.workspace_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+                json.dump(self._registry, fp, ensure_ascii=False)
+            os.replace(tmp_path, self.registry_path)
         except Exception as exc:
             logger.error("保存项目映射文件失败: %s", exc)
 
+    # ------------------------------------------------------------------
+    # SQLite 后端
+    # ------------------------------------------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if self._conn is not None and self._conn_pid == pid:
+            return self._conn
+
+        # fork 之后父进程的连接不可用：直接丢弃并重新打开
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(_SCHEMA)
+        self._conn = conn
+        self._conn_pid = pid
+        self._data_version = None
+        return conn
+
+    def _load_db_registry(self) -> Dict[str, Dict[str, str]]:
+        conn = self._connection()
+        self._migrate_json(conn)
+        self._data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        rows = conn.execute('SELECT identifier, project_id, path FROM project_registry').fetchall()
+        return {identifier: {'path': path, 'id': project_id} for identifier, project_id, path in rows}
+
+    def _migrate_json(self, conn: sqlite3.Connection) -> None:
+        """数据库为空且存在旧版 _registry.json 时一次性导入"""
+        if not os.path.exists(self.registry_path):
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM project_registry LIMIT 1').fetchone() is None:
+                legacy = self._load_json_registry()
+                now = time.time()
+                conn.executemany(
+                    'INSERT OR IGNORE INTO project_registry (identifier, project_id, path, updated_at) VALUES (?, ?, ?, ?)',
+                    [(identifier, data['id'], data['path'], now) for identifier, data in legacy.items()],
+                )
+                logger.info("已将 %s 条项目映射从 %s 导入 %s", len(legacy), self.registry_path, self.db_path)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        # 保留旧文件以便回滚，但改名避免被误认为仍在使用
+        try:
+            os.replace(self.registry_path, f"{self.registry_path}.migrated")
+        except OSError:
+            pass  # 其它 worker 已经改名
+
+    def _sync(self) -> None:
+        """其它进程（或连接）写入过数据库时重新加载内存映射"""
+        if self.backend != 'sqlite':
+            return
+        try:
+            conn = self._connection()
+            version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if version == self._data_version:
+                return
+            rows = conn.execute('SELECT identifier, project_id, path FROM project_registry').fetchall()
+        except sqlite3.Error as exc:
+            logger.warning("读取项目注册表失败，使用内存中的映射: %s", exc)
+            return
+
+        self._set_registry({identifier: {'path': path, 'id': project_id} for identifier, project_id, path in rows})
+        self._data_version = version
+        metrics.inc('project_registry_reloads_total')
+
+    def _upsert(self, changes: Dict[str, Dict[str, str]]) -> None:
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO project_registry (identifier, project_id, path, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(identifier) DO UPDATE SET project_id = excluded.project_id, '
+                'path = excluded.path, updated_at = excluded.updated_at',
+                [(identifier, data['id'], data['path'], now) for identifier, data in changes.items()],
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    # ------------------------------------------------------------------
+    # 二级索引
+    # ------------------------------------------------------------------
+    def _set_registry(self, registry: Dict[str, Dict[str, str]]) -> None:
+        """整体替换映射并重建索引（加载 / 重新加载时）"""
+        self._registry = {}
+        self._by_path = {}
+        self._by_id = {}
+        self._apply(registry)
+
+    def _apply(self, changes: Dict[str, Dict[str, str]]) -> None:
+        """写入变更的映射并增量维护索引"""
+        for identifier, data in changes.items():
+            previous = self._registry.get(identifier)
+            if previous is not None:
+                self._unindex(self._by_path, os.path.abspath(previous.get('path', '')), identifier)
+                self._unindex(self._by_id, previous.get('id', ''), identifier)
+
+            self._registry[identifier] = data
+            self._by_path.setdefault(os.path.abspath(data.get('path', '')), {})[identifier] = None
+            if data.get('id'):
+                self._by_id.setdefault(data['id'], {})[identifier] = None
+
+    @staticmethod
+    def _unindex(index: Dict[str, Dict[str, None]], key: str, identifier: str) -> None:
+        identifiers = index.get(key)
+        if identifiers is None:
+            return
+        identifiers.pop(identifier, None)
+        if not identifiers:
+            del index[key]
+
     def _find_project_id_by_path(self, local_path: str) -> Optional[str]:
         local_path = os.path.abspath(local_path)
         with self._lock:
-            for data in self._registry.values():
-                if os.path.abspath(data.get('path', '')) == local_path and data.get('id'):
-                    return data['id']
+            self._sync()
+            for identifier in self._by_path.get(local_path, ()):
+                project_id = self._registry[identifier].get('id')
+                if project_id:
+                    return project_id
         return None
 
 
 # 全局实例, 供其它模块直接使用
-project_registry = ProjectRegistry()
+project_registry = ProjectRegistry(
+    workspace_dir=os.getenv('GIT_WORKSPACE', './repos'),
+    backend=os.getenv('PROJECT_REGISTRY_BACKEND', 'sqlite'),
+    mirror_mode=os.getenv('LOCAL_MIRROR_MODE', 'incremental'),
+)
 
 
@@ -0,0 +1,189 @@
+"""仓库级互斥锁管理（线程 + 进程）"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List
+
+from app.utils.metrics import metrics
+
+try:  # pragma: no cover - Windows 没有 fcntl
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class LockHandle:
+    """一次加锁的结果"""
+
+    key: str
+    requested_at: float
+    waited: float
+
+
+class RepoLockManager:
+    """
+    以 project_id 为键的仓库锁
+
+    同一进程内的线程先竞争 threading.Lock，再通过 fcntl 文件锁（或 Redis 锁）
+    与其它 gunicorn worker 互斥。每次完成克隆/刷新后写入新鲜度标记，
+    等待锁的请求拿到锁后可据此判断是否直接复用刚更新好的仓库。
+    """
+
+    def __init__(
+        self,
+        lock_dir: str,
+        redis_client=None,
+        lock_timeout: int = 600,
+        backend: str = 'auto',
+    ) -> None:
+        self.lock_dir = os.path.abspath(lock_dir)
+        self.lock_timeout = lock_timeout
+        self.redis_client = redis_client
+        self.backend = self._select_backend(backend)
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+        self._guard = threading.Lock()
+        # key -> [锁, 持有或等待该锁的线程数]；计数归零时删除，避免按项目无限增长
+        self._thread_locks: Dict[str, List] = {}
+        logger.info("仓库锁后端: %s (%s)", self.backend, self.lock_dir)
+
+    # ------------------------------------------------------------------
+    # 公共 API
+    # ------------------------------------------------------------------
+    @contextmanager
+    def acquire(self, key: str) -> Iterator[LockHandle]:
+        """获取仓库锁，超时抛出 TimeoutError"""
+
+        requested_at = time.time()
+        deadline = requested_at + self.lock_timeout
+        thread_lock = self._retain_thread_lock(key)
+        try:
+            if not thread_lock.acquire(timeout=self.lock_timeout):
+                metrics.inc('repo_lock_timeouts_total', labels={'backend': 'thread'})
+                raise TimeoutError(f"等待仓库锁超时: {key}")
+
+            try:
+                with self._acquire_process_lock(key, deadline):
+                    waited = time.time() - requested_at
+                    metrics.observe('repo_lock_wait_seconds', waited, labels={'backend': self.backend})
+                    if waited > 1:
+                        logger.info("仓库锁等待 %.2fs: %s", waited, key)
+                    yield LockHandle(key=key, requested_at=requested_at, waited=waited)
+            finally:
+                thread_lock.release()
+        finally:
+            self._release_thread_lock(key)
+
+    def mark_fresh(self, key: str) -> None:
+        """记录仓库刚完成克隆或刷新"""
+        marker = self._marker_path(key)
+        try:
+            with open(marker, 'a', encoding='utf-8'):
+                pass
+            os.utime(marker, None)
+        except OSError as exc:
+            logger.debug("写入仓库新鲜度标记失败 (%s): %s", key, exc)
+
+    def refreshed_since(self, key: str, timestamp: float) -> bool:
+        """仓库是否在给定时间点之后被其它请求更新过"""
+        try:
+            return os.path.getmtime(self._marker_path(key)) >= timestamp
+        except OSError:
+            return False
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+    def _select_backend(self, backend: str) -> str:
+        backend = (backend or 'auto').lower()
+        if backend == 'redis' and self.redis_client is None:
+            logger.warning("未配置 Redis，仓库锁降级为文件锁")
+            backend = 'auto'
+        if backend == 'auto':
+            backend = 'file'
+        if backend == 'file' and fcntl is None:
+            logger.warning("当前平台不支持 fcntl，仓库锁仅在进程内生效")
+            backend = 'thread'
+        return backend
+
+    def _retain_thread_lock(self, key: str) -> threading.Lock:
+        with self._guard:
+            record = self._thread_locks.get(key)
+            if record is None:
+                record = [threading.Lock(), 0]
+                self._thread_locks[key] = record
+            record[1] += 1
+            return record[0]
+
+    def _release_thread_lock(self, key: str) -> None:
+        with self._guard:
+            record = self._thread_locks[key]
+            record[1] -= 1
+            if record[1] == 0:
+                del self._thread_locks[key]
+
+    @contextmanager
+    def _acquire_process_lock(self, key: str, deadline: float) -> Iterator[None]:
+        if self.backend == 'redis':
+            with self._acquire_redis_lock(key, deadline):
+                yield
+        elif self.backend == 'file':
+            with self._acquire_file_lock(key, deadline):
+                yield
+        else:
+            yield
+
+    @contextmanager
+    def _acquire_file_lock(self, key: str, deadline: float) -> Iterator[None]:
+        fd = os.open(os.path.join(self.lock_dir, f"{key}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.time() >= deadline:
+                        metrics.inc('repo_lock_timeouts_total', labels={'backend': 'file'})
+                        raise TimeoutError(f"等待仓库文件锁超时: {key}")
+                    time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def _acquire_redis_lock(self, key: str, deadline: float) -> Iterator[None]:
+        lock = self.redis_client.lock(
+            f"repo-lock:{key}",
+            timeout=self.lock_timeout,
+            blocking_timeout=max(0.0, deadline - time.time()),
+            thread_local=False,  # async 模式下获取与释放可能发生在不同线程
+        )
+        if not lock.acquire():
+            metrics.inc('repo_lock_timeouts_total', labels={'backend': 'redis'})
+            raise TimeoutError(f"等待仓库 Redis 锁超时: {key}")
+        try:
+            yield
+        finally:
+            try:
+                lock.release()
+            except Exception as exc:
+                logger.warning("释放仓库 Redis 锁失败 (%s): %s", key, exc)
+
+    def _marker_path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, f"{key}.fresh")
@@ -2,139 +2,678 @@
 统计服务
 """
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Any
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, as_completed, wait
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import logging
 import os
-from app.services.git_service import GitService
+import time
+from git import Repo
+from app.services.git_service import GitService, DEFAULT_MAX_COUNT
+from app.services.commit_index import CommitIndexCache, ProjectCommitIndex, ProjectWindow, WindowAggregate
+from app.services.parallel_ingest import ProcessIngestPool
+from app.services import async_ingest
+from app.services.async_ingest import AsyncIngestLoop
+from app.services.fetch_scheduler import FetchScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
 from app.services.project_registry import project_registry, ProjectEntry
 from app.models.commit import Commit
 from app.models.stats import DashboardStats
-from app.utils.stats_calculator import calculate_contributors
+from app.utils.author_identity import author_table
+from app.utils.metrics import metrics
+from app.utils.request_timing import span
+from app.utils.stats_calculator import (
+    calculate_contributors,
+    calculate_top_contributors,
+    calculate_contributor_detail,
+    build_timeseries,
+    build_heatmap,
+)
 from app.config.projects import projects_config
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class FetchOutcome:
+    """多项目请求中未能按时拿到数据的项目（失败 / 超过截止时间仍在后台执行）"""
+
+    failed: Dict[str, str] = field(default_factory=dict)
+    pending: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed and not self.pending
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "failed_projects": [{"project": name, "error": reason} for name, reason in self.failed.items()],
+            "pending_projects": list(self.pending),
+        }
+
+
 class StatsService:
     """统计服务"""
     
-    def __init__(self, git_service: GitService, project_timeout: int = 120):
+    def __init__(
+        self,
+        git_service: GitService,
+        project_timeout: int = 120,
+        index_cache_size: int = 64,
+        execution_mode: str = 'thread',
+        process_workers: Optional[int] = None,
+        scheduler: Optional[FetchScheduler] = None,
+        async_concurrency: int = 64,
+    ):
         """
         初始化
         
         Args:
             git_service: Git服务实例
+            index_cache_size: 最多缓存多少个项目的时间索引
+            execution_mode: 'thread'（默认）、'process' 或 'async'：process 模式下只需要汇总结果的请求
+                            在子进程中解析 git log，只回传部分汇总；async 模式下这类请求在后台事件循环中
+                            用 asyncio 子进程执行 git 并流式汇总
+            process_workers: process 模式的进程数（默认 CPU 核数）
+            scheduler: 全局拉取调度器（默认并发上限 5；process 模式下至少为进程数）
+            async_concurrency: async 模式下同时处理的项目数上限
         """
         self.git_service = git_service
         self.project_timeout = project_timeout
+        self.index_cache = CommitIndexCache(max_size=index_cache_size)
+
+        execution_mode = (execution_mode or 'thread').lower()
+        if execution_mode not in ('thread', 'process', 'async'):
+            logger.warning(f"未知的执行模式 {execution_mode}，使用 thread 模式")
+            execution_mode = 'thread'
+        self.execution_mode = execution_mode
+        self.process_pool = ProcessIngestPool(process_workers) if execution_mode == 'process' else None
+        self.async_ingest = (
+            AsyncIngestLoop(async_concurrency, lock_manager=git_service.lock_manager)
+            if execution_mode == 'async' else None
+        )
+        self.scheduler = scheduler or FetchScheduler(max_concurrency=5)
+        if self.process_pool is not None:
+            # 每个子进程解析任务都会占用一个调度器线程等待结果，线程数不足时多出的进程只会空闲
+            self.scheduler.ensure_concurrency(self.process_pool.max_workers)
     
     def fetch_multi_project_stats(
         self, 
         project_names: List[str],
         max_workers: int = 5,
-        force_refresh: bool = False
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None
     ) -> DashboardStats:
         """
         并发获取多个项目的统计数据
         
         Args:
             project_names: 项目名称列表
-            max_workers: 最大并发数
+            max_workers: 兼容参数，并发由全局拉取调度器控制
+            since: 开始日期 (YYYY-MM-DD)
+            until: 结束日期 (YYYY-MM-DD)
+            max_count: 每个项目最多读取的 commit 数
         
         Returns:
-            DashboardStats: 汇总的统计数据
+            DashboardStats: 汇总的统计数据（failed_projects / pending_projects 列出未计入的项目）
+        """
+        aggregate, repo_count, outcome = self._fetch_merged_aggregate(
+            project_names, max_workers, force_refresh, since, until, max_count
+        )
+        return self._build_stats(aggregate, repo_count, outcome)
+
+    def stream_multi_project_stats(
+        self,
+        project_names: List[str],
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None
+    ) -> Iterator[Tuple[Dict[str, Any], DashboardStats]]:
         """
-        all_commits = []
-        successful_projects = []
-        failed_projects = {}
+        逐个项目产出合并后的统计数据
         
-        # 并发处理各个项目
-        revealed_commits: List[Commit] = []
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(self._fetch_single_project_with_meta, name, force_refresh): name
-                for name in project_names
-            }
-            
-            for future in as_completed(futures):
+        每当一个项目完成（或失败）就产出一次 (进度, 当前已完成项目的汇总统计)；
+        最后一次产出的进度中 finished 为 True，统计中带有 failed_projects / pending_projects。
+        截止时间与 fetch_multi_project_stats 相同，超时的项目在后台继续执行。
+        """
+        futures = self._submit_project_windows(
+            project_names, force_refresh, since, until, max_count, aggregate_only=True
+        )
+        repo_count = len(set(project_names))
+        aggregate = WindowAggregate()
+        outcome = FetchOutcome()
+        finished: List[Future] = []
+
+        try:
+            for future in as_completed(futures, timeout=self.project_timeout):
                 project_name = futures[future]
+                finished.append(future)
                 try:
-                    commits, project_id = future.result(timeout=self.project_timeout)
-                    annotated = self._attach_project_info(commits, project_id, project_name)
-                    all_commits.extend(annotated)
-                    revealed_commits.extend(annotated)
-                    successful_projects.append(project_name)
-                    logger.info(f"项目 {project_name} 数据获取成功: {len(commits)} commits")
+                    aggregate.merge(future.result().aggregate())
+                    status = 'ok'
                 except Exception as e:
-                    failed_projects[project_name] = str(e)
+                    outcome.failed[project_name] = str(e)
+                    status = 'failed'
                     logger.error(f"项目 {project_name} 数据获取失败: {str(e)}")
-        
-        # 生成统计数据
-        repo_count = len(successful_projects) if successful_projects else len(project_names)
-        repo_count = max(repo_count, len(set(project_names)))
 
-        if failed_projects:
+                progress = {
+                    "project": project_name,
+                    "status": status,
+                    "completed": len(finished),
+                    "total": len(futures),
+                    "finished": False,
+                }
+                yield progress, self._build_stats(aggregate, repo_count, outcome)
+        except FutureTimeoutError:
+            outcome.pending = sorted(futures[f] for f in futures if f not in finished)
             logger.warning(
-                "以下项目获取失败，将不会计入统计: %s",
-                ", ".join(f"{name} ({reason})" for name, reason in failed_projects.items())
+                "以下项目超过 %ss 仍未完成，转入后台继续执行: %s",
+                self.project_timeout, ", ".join(outcome.pending)
             )
 
-        return DashboardStats.from_commits(all_commits, repo_count)
+        progress = {
+            "project": None,
+            "status": 'complete' if outcome.complete else 'partial',
+            "completed": len(finished),
+            "total": len(futures),
+            "finished": True,
+        }
+        yield progress, self._build_stats(aggregate, repo_count, outcome)
+
+    @staticmethod
+    def _build_stats(aggregate: WindowAggregate, repo_count: int, outcome: 'FetchOutcome') -> DashboardStats:
+        stats = DashboardStats.from_matrix(
+            aggregate.cells,
+            start_date=aggregate.start_date,
+            end_date=aggregate.end_date,
+            repo_count=repo_count,
+        )
+        stats.failed_projects = outcome.to_dict()["failed_projects"]
+        stats.pending_projects = list(outcome.pending)
+        return stats
     
+    def fetch_multi_project_heatmap(
+        self,
+        project_names: List[str],
+        max_workers: int = 5,
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        获取多个项目的星期 × 小时提交热力图
+        
+        Args:
+            project_names: 项目名称列表
+            max_workers: 兼容参数，并发由全局拉取调度器控制
+            since: 开始日期 (YYYY-MM-DD)
+            until: 结束日期 (YYYY-MM-DD)
+            max_count: 每个项目最多读取的 commit 数
+        
+        Returns:
+            包含 7 × 24 矩阵的热力图数据（以及 failed_projects / pending_projects）
+        """
+        aggregate, repo_count, outcome = self._fetch_merged_aggregate(
+            project_names, max_workers, force_refresh, since, until, max_count
+        )
+        heatmap = build_heatmap(aggregate.cells)
+        heatmap.update({
+            "start_date": aggregate.start_date,
+            "end_date": aggregate.end_date,
+            "repo_count": repo_count,
+        })
+        heatmap.update(outcome.to_dict())
+        return heatmap
+
     def fetch_multi_project_contributors(
         self,
         project_names: List[str],
         max_workers: int = 5,
-        force_refresh: bool = False
-    ) -> List[Dict[str, Any]]:
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], FetchOutcome]:
         """
         并发获取多个项目的贡献者数据
         
         Args:
             project_names: 项目名称列表
-            max_workers: 最大并发数
+            max_workers: 兼容参数，并发由全局拉取调度器控制
+            since: 开始日期 (YYYY-MM-DD)
+            until: 结束日期 (YYYY-MM-DD)
+            max_count: 每个项目最多读取的 commit 数
         
         Returns:
-            贡献者列表（按commits降序）
+            (贡献者列表（按贡献度降序）, 未计入的项目)
         """
-        all_commits: List[Commit] = []
-        successful_projects = []
-        failed_projects = {}
+        all_commits, outcome = self._collect_window_commits(
+            project_names, max_workers, force_refresh, since, until, max_count
+        )
+
+        # 计算贡献者统计
+        with metrics.timer('aggregate_compute_seconds', labels={'kind': 'contributors'}, span='aggregate'):
+            contributors = calculate_contributors(all_commits)
+        return contributors, outcome
+
+    def fetch_multi_project_top_contributors(
+        self,
+        project_names: List[str],
+        top_k: int,
+        max_workers: int = 5,
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int, FetchOutcome]:
+        """
+        并发获取多个项目贡献度最高的 top_k 位贡献者
         
-        # 并发处理各个项目
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(self._fetch_single_project_with_meta, name, force_refresh): name
-                for name in project_names
-            }
-            
-            for future in as_completed(futures):
-                project_name = futures[future]
-                try:
-                    commits, project_id = future.result(timeout=self.project_timeout)
-                    annotated = self._attach_project_info(commits, project_id, project_name)
-                    all_commits.extend(annotated)
-                    successful_projects.append(project_name)
-                except Exception as e:
-                    failed_projects[project_name] = str(e)
-                    logger.error(f"项目 {project_name} 数据获取失败: {str(e)}")
+        Returns:
+            (贡献者列表, 贡献者总数, 未计入的项目)
+        """
+        all_commits, outcome = self._collect_window_commits(
+            project_names, max_workers, force_refresh, since, until, max_count
+        )
+        with metrics.timer('aggregate_compute_seconds', labels={'kind': 'top_contributors'}, span='aggregate'):
+            items, total = calculate_top_contributors(all_commits, top_k)
+        return items, total, outcome
+
+    def fetch_contributor_detail(
+        self,
+        project_names: List[str],
+        email: str,
+        max_workers: int = 5,
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None,
+        recent_limit: int = 20,
+    ) -> Tuple[Optional[Dict[str, Any]], FetchOutcome]:
+        """
+        获取单个贡献者在多个项目中的详细数据
+        
+        email 可以是规范邮箱或 .mailmap 中映射前的旧邮箱；通过各项目时间索引的
+        作者 id -> commit 下标 倒排表直接取出该作者的提交，不需要扫描全部 commit。
         
-        if failed_projects:
+        Returns:
+            (贡献者详情（没有该作者的提交时为 None）, 未计入的项目)
+        """
+        windows, outcome = self._collect_project_windows(
+            project_names, max_workers, force_refresh, since, until, max_count, build_index=True
+        )
+
+        # 作者 id 和各项目的 .mailmap 别名在解析 git log 时登记，因此要在取到各项目数据之后再查询
+        commits: List[Commit] = []
+        for window in windows.values():
+            author_id = author_table.lookup(email, window.project_id)
+            if author_id is not None:
+                commits.extend(window.author_commits(author_id))
+
+        with metrics.timer('aggregate_compute_seconds', labels={'kind': 'contributor_detail'}, span='aggregate'):
+            detail = calculate_contributor_detail(commits, recent_limit=recent_limit)
+        if detail is not None:
+            detail.update(outcome.to_dict())
+        return detail, outcome
+
+    def fetch_multi_project_timeseries(
+        self,
+        project_names: List[str],
+        max_workers: int = 5,
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        interval: str = 'day'
+    ) -> Dict[str, Any]:
+        """
+        获取多个项目按天 / 按周的提交趋势（来自各项目的日汇总）
+        
+        Args:
+            project_names: 项目名称列表
+            max_workers: 兼容参数，并发由全局拉取调度器控制
+            since: 开始日期 (YYYY-MM-DD)
+            until: 结束日期 (YYYY-MM-DD)
+            interval: 'day' 或 'week'
+        
+        Returns:
+            包含 series 列表的趋势数据（以及 failed_projects / pending_projects）
+        """
+        windows, outcome = self._collect_project_windows(
+            project_names, max_workers, force_refresh, since, until, None, aggregate_only=True
+        )
+
+        repo_count = max(len(windows), len(set(project_names)))
+        with metrics.timer('aggregate_compute_seconds', labels={'kind': 'timeseries'}, span='aggregate'):
+            merged: Dict[int, List[int]] = {}
+            for window in windows.values():
+                for rollup in window.daily_rollups():
+                    totals = merged.setdefault(rollup.day, [0, 0, 0, 0])
+                    totals[0] += rollup.commits
+                    totals[1] += rollup.additions
+                    totals[2] += rollup.deletions
+                    totals[3] += rollup.overtime
+
+            timeseries = build_timeseries(merged, since=since, until=until, interval=interval, repo_count=repo_count)
+        timeseries.update(outcome.to_dict())
+        return timeseries
+
+    def _fetch_merged_aggregate(
+        self,
+        project_names: List[str],
+        max_workers: int,
+        force_refresh: bool,
+        since: Optional[str],
+        until: Optional[str],
+        max_count: Optional[int],
+    ) -> Tuple[WindowAggregate, int, FetchOutcome]:
+        """合并各项目的星期 × 小时直方图，返回 (汇总, 项目数, 未计入的项目)"""
+        windows, outcome = self._collect_project_windows(
+            project_names, max_workers, force_refresh, since, until, max_count, aggregate_only=True
+        )
+
+        aggregate = WindowAggregate()
+        with metrics.timer('aggregate_compute_seconds', labels={'kind': 'matrix'}, span='aggregate'):
+            for window in windows.values():
+                aggregate.merge(window.aggregate())
+
+        repo_count = len(windows) if windows else len(project_names)
+        repo_count = max(repo_count, len(set(project_names)))
+        return aggregate, repo_count, outcome
+
+    def _collect_window_commits(
+        self,
+        project_names: List[str],
+        max_workers: int,
+        force_refresh: bool,
+        since: Optional[str],
+        until: Optional[str],
+        max_count: Optional[int],
+    ) -> Tuple[List[Commit], FetchOutcome]:
+        windows, outcome = self._collect_project_windows(
+            project_names, max_workers, force_refresh, since, until, max_count
+        )
+
+        all_commits: List[Commit] = []
+        for window in windows.values():
+            all_commits.extend(window.commits())
+        return all_commits, outcome
+
+    def prefetch_projects(
+        self,
+        project_names: List[str],
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> Dict[Future, str]:
+        """
+        以后台优先级预先拉取项目并构建全量数据（与 /summary 的单项目任务共用同一个任务键，
+        交互请求到来时会直接复用并提升优先级）
+
+        Returns:
+            Future -> 项目名
+        """
+        return self._submit_project_windows(
+            project_names, False, None, None, None, aggregate_only=True, priority=priority
+        )
+
+    def get_project_index(self, project_name: str, force_refresh: bool = False) -> ProjectCommitIndex:
+        """获取（必要时构建）单个项目的时间索引"""
+        entry, repo = self._open_project_repo(project_name, force_refresh=force_refresh)
+        return self._load_project_index(project_name, entry, repo, build=True)
+
+    def _collect_project_windows(
+        self,
+        project_names: List[str],
+        max_workers: int,
+        force_refresh: bool,
+        since: Optional[str],
+        until: Optional[str],
+        max_count: Optional[int],
+        build_index: bool = False,
+        aggregate_only: bool = False,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Tuple[Dict[str, ProjectWindow], FetchOutcome]:
+        """
+        通过全局拉取调度器并发获取各项目的时间窗口数据，返回 (成功项目, 未计入的项目)
+
+        整个请求共用一个截止时间（project_timeout）：到点仍未完成的项目记为 pending 直接返回，
+        任务留在调度器中继续执行（可能被其它请求共享，因此不取消），完成后会写入时间索引缓存，
+        下一次请求即可命中。并发数由调度器的全局上限决定，max_workers 仅为兼容旧接口保留。
+        """
+        windows: Dict[str, ProjectWindow] = {}
+        outcome = FetchOutcome()
+
+        futures = self._submit_project_windows(
+            project_names, force_refresh, since, until, max_count, build_index, aggregate_only, priority
+        )
+        with span('fetch_wait'):
+            done, not_done = wait(futures, timeout=self.project_timeout)
+
+        for future in done:
+            project_name = futures[future]
+            try:
+                windows[project_name] = future.result()
+                logger.info(f"项目 {project_name} 数据获取成功")
+            except Exception as e:
+                outcome.failed[project_name] = str(e)
+                logger.error(f"项目 {project_name} 数据获取失败: {str(e)}")
+
+        outcome.pending = sorted(futures[future] for future in not_done)
+        if outcome.pending:
             logger.warning(
-                "以下项目贡献者数据获取失败: %s",
-                ", ".join(f"{name} ({reason})" for name, reason in failed_projects.items())
+                "以下项目超过 %ss 仍未完成，转入后台继续执行: %s",
+                self.project_timeout, ", ".join(outcome.pending)
+            )
+        if outcome.failed:
+            logger.warning(
+                "以下项目获取失败，将不会计入统计: %s",
+                ", ".join(f"{name} ({reason})" for name, reason in outcome.failed.items())
             )
 
-        # 计算贡献者统计
-        contributors = calculate_contributors(all_commits)
+        return windows, outcome
+
+    def _submit_project_windows(
+        self,
+        project_names: List[str],
+        force_refresh: bool,
+        since: Optional[str],
+        until: Optional[str],
+        max_count: Optional[int],
+        build_index: bool = False,
+        aggregate_only: bool = False,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Dict[Future, str]:
+        futures: Dict[Future, str] = {}
+        known = self._known_project_entries(project_names) if self.async_ingest is not None and aggregate_only else {}
+        for name in project_names:
+            args = (name, force_refresh, since, until, max_count, build_index, aggregate_only)
+            entry = known.get(name)
+            # 参数完全相同的单项目任务在并发请求之间共享；async 模式下已在本地就绪的项目同样经过调度器
+            # （并发上限、优先级、全局槽位），只是 git 子进程交给事件循环执行
+            if entry is not None:
+                future = self.scheduler.submit(
+                    ('project_window',) + args, self._fetch_project_window_async, entry, *args[:6], priority=priority
+                )
+            else:
+                future = self.scheduler.submit(
+                    ('project_window',) + args, self._fetch_project_window, *args, priority=priority
+                )
+            futures[future] = name
+        return futures
+
+    def _fetch_project_window(
+        self,
+        project_name: str,
+        force_refresh: bool = False,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_count: Optional[int] = None,
+        build_index: bool = False,
+        aggregate_only: bool = False,
+    ) -> ProjectWindow:
+        """
+        获取单个项目在时间窗口内的数据
+
+        索引命中（远程分支 HEAD 未变化）时直接按日期查询索引；全量请求（或 build_index）会顺带构建索引；
+        索引缺失或不覆盖该窗口（截断的索引早于 covered_from 的部分）的时间窗口请求和 max_count 请求
+        则把过滤条件下推给 git log，只解析窗口内的提交。
+        process 模式下只需要汇总的请求（aggregate_only）不在本进程构建索引，而是交给子进程解析。
+        """
+        in_process_pool = self.process_pool is not None and aggregate_only
+        with metrics.timer(
+            'project_fetch_seconds', labels={'mode': 'process' if in_process_pool else 'thread'}, span='project_fetch'
+        ):
+            entry, repo = self._open_project_repo(project_name, force_refresh=force_refresh)
+
+            if not max_count:
+                build = (build_index or not (since or until)) and not in_process_pool
+                index = self._load_project_index(project_name, entry, repo, build=build)
+                if index is not None and index.covers(since, until):
+                    return ProjectWindow(entry.project_id, index=index, since=since, until=until)
+
+            ref = self.git_service.resolve_commit_ref(repo)
+            if in_process_pool:
+                aggregate, rollups = self.process_pool.aggregate(
+                    repo.git_dir, ref, since=since, until=until,
+                    max_count=max_count or DEFAULT_MAX_COUNT, timeout=self.project_timeout,
+                )
+                return ProjectWindow(entry.project_id, partial_aggregate=aggregate, partial_rollups=rollups)
+
+            commits = self.git_service.get_commits(
+                repo,
+                branch=ref,
+                since=since,
+                until=until,
+                max_count=max_count or DEFAULT_MAX_COUNT,
+            )
+            self._attach_project_info(commits, entry.project_id, project_name)
+            return ProjectWindow(entry.project_id, window_commits=commits)
+
+    def _fetch_project_window_async(
+        self,
+        entry: ProjectEntry,
+        project_name: str,
+        force_refresh: bool,
+        since: Optional[str],
+        until: Optional[str],
+        max_count: Optional[int],
+        build_index: bool = False,
+    ) -> ProjectWindow:
+        """
+        async 模式下获取单个项目窗口的汇总（在调度器线程中执行）
+
+        git fetch 和下推窗口的 git log 在事件循环中以子进程执行、流式汇总；
+        时间索引与 thread 模式共用 _load_project_index：全量请求构建或增量更新索引，之后的窗口直接查询索引。
+        """
+        with metrics.timer('project_fetch_seconds', labels={'mode': 'async'}, span='project_fetch'):
+            path = entry.path
+            if force_refresh:
+                self._run_async(('refresh', entry.project_id), lambda: self._refresh_repo_async(entry))
+
+            if not max_count:
+                build = build_index or not (since or until)
+                repo = self.git_service.get_repo_from_path(path, lock_key=entry.project_id)
+                index = self._load_project_index(project_name, entry, repo, build=build)
+                if index is not None and index.covers(since, until):
+                    return ProjectWindow(entry.project_id, index=index, since=since, until=until)
 
-        for contributor in contributors:
-            contributor.setdefault('projects', [])
-            contributor.setdefault('project_names', [])
+            aggregate, rollups = self._run_async(
+                ('aggregate', entry.project_id, since, until, max_count),
+                lambda: self._aggregate_window_async(path, since, until, max_count or DEFAULT_MAX_COUNT),
+            )
+            return ProjectWindow(entry.project_id, partial_aggregate=aggregate, partial_rollups=rollups)
+
+    def _run_async(self, key: Tuple, coro_factory) -> Any:
+        """把协程交给事件循环执行，并在当前（调度器）线程中等待结果"""
+        return self.async_ingest.submit(key, coro_factory).result(timeout=self.project_timeout)
+
+    async def _refresh_repo_async(self, entry: ProjectEntry) -> None:
+        key = entry.project_id
+        async with self.async_ingest.repo_lock(key) as handle:
+            lock_manager = self.git_service.lock_manager
+            if handle is not None and lock_manager.refreshed_since(key, handle.requested_at):
+                logger.info(f"复用并发请求刚刷新的仓库: {entry.path}")
+                return
+            try:
+                await async_ingest.refresh_repo(entry.path)
+            except Exception as e:
+                logger.warning(f"刷新仓库失败 ({entry.path}): {e}")
+            lock_manager.mark_fresh(key)
 
-        return contributors
+    @staticmethod
+    async def _aggregate_window_async(
+        path: str,
+        since: Optional[str],
+        until: Optional[str],
+        max_count: int,
+    ) -> Tuple[WindowAggregate, List]:
+        ref = await async_ingest.resolve_commit_ref(path)
+        return await async_ingest.aggregate_project_window(path, ref, since=since, until=until, max_count=max_count)
+
+    def _known_project_entries(self, project_names: List[str]) -> Dict[str, ProjectEntry]:
+        """已经同步到本地的项目（首次出现的项目仍需走克隆 / 复制流程）"""
+        return {
+            name: entry
+            for name, entry in project_registry.get_entries(project_names).items()
+            if entry is not None and os.path.exists(entry.path)
+        }
+
+    def _open_project_repo(self, project_name: str, force_refresh: bool = False) -> Tuple[ProjectEntry, Repo]:
+        requested_at = time.time()
+        entry = self._resolve_project_entry(project_name, force_refresh=force_refresh)
+        # 解析项目时已经刷新过（本地镜像 fetch、远程仓库克隆 / 刷新，或并发请求刚刷新）则不再 fetch 第二次
+        if force_refresh and self.git_service.lock_manager.refreshed_since(entry.project_id, requested_at):
+            force_refresh = False
+        repo = self.git_service.get_repo_from_path(
+            entry.path, force_refresh=force_refresh, lock_key=entry.project_id
+        )
+        project_registry.register_identifier(project_name, entry.path, entry.project_id)
+        return entry, repo
+
+    def _load_project_index(
+        self,
+        project_name: str,
+        entry: ProjectEntry,
+        repo: Repo,
+        build: bool = True,
+    ) -> Optional[ProjectCommitIndex]:
+        ref = self.git_service.resolve_commit_ref(repo)
+        head_sha = self.git_service.get_head_sha(repo, ref)
+
+        index = self.index_cache.get(entry.project_id, head_sha)
+        if index is not None or not build:
+            return index
+
+        # 远程分支只是前进了：只解析新增的 commit，增量更新索引和日汇总
+        # （新增部分与全量构建使用同一个 max_count 上限，达到上限时改为重新构建）
+        previous = self.index_cache.peek(entry.project_id)
+        if (
+            previous is not None
+            and previous.head_sha
+            and head_sha
+            and self.git_service.is_ancestor(repo, previous.head_sha, head_sha)
+        ):
+            new_commits = self.git_service.get_commits(
+                repo, branch=f"{previous.head_sha}..{head_sha}", max_count=DEFAULT_MAX_COUNT
+            )
+            if len(new_commits) < DEFAULT_MAX_COUNT:
+                self._attach_project_info(new_commits, entry.project_id, project_name)
+                index = previous.extended(new_commits, head_sha)
+                self.index_cache.put(index)
+                logger.info(f"项目 {project_name} 时间索引增量更新: +{len(new_commits)} commits")
+                return index
+
+        commits = self.git_service.get_commits(repo, branch=head_sha or ref, max_count=DEFAULT_MAX_COUNT)
+        self._attach_project_info(commits, entry.project_id, project_name)
+        truncated = len(commits) >= DEFAULT_MAX_COUNT
+        index = ProjectCommitIndex(entry.project_id, head_sha, commits, truncated=truncated)
+        self.index_cache.put(index)
+        logger.info(
+            f"项目 {project_name} 时间索引已构建: {len(index)} commits, {len(index.days)} 天"
+            + (f"（已达到 {DEFAULT_MAX_COUNT} 条上限，只覆盖最近的历史）" if truncated else "")
+        )
+        return index
 
     def _extract_project_display_name(self, project_name: str) -> str:
         """
@@ -171,25 +710,14 @@ class StatsService:
         for commit in commits:
             commit.project_id = project_id
             commit.project_name = display_name
+        author_table.register_aliases(project_id, commits)
         return commits
 
-    def _fetch_single_project_with_meta(self, project_name: str, force_refresh: bool = False) -> tuple[List[Commit], str]:
-        entry = self._resolve_project_entry(project_name, force_refresh=force_refresh)
-        repo = self.git_service.get_repo_from_path(entry.path, force_refresh=force_refresh)
-        commits = self.git_service.get_commits(repo)
-        project_registry.register_identifier(project_name, entry.path, entry.project_id)
-        return commits, entry.project_id
-
     def _fetch_single_project(self, project_name: str, force_refresh: bool = False) -> List[Commit]:
         """获取单个项目的 commit 数据并同步项目到本地缓存"""
 
-        entry = self._resolve_project_entry(project_name, force_refresh=force_refresh)
-
-        repo = self.git_service.get_repo_from_path(entry.path, force_refresh=force_refresh)
-        commits = self.git_service.get_commits(repo)
-
-        project_registry.register_identifier(project_name, entry.path, entry.project_id)
-        return commits
+        entry, repo = self._open_project_repo(project_name, force_refresh=force_refresh)
+        return self.git_service.get_commits(repo, branch=self.git_service.resolve_commit_ref(repo))
 
     def _resolve_project_entry(self, identifier: str, force_refresh: bool = False) -> ProjectEntry:
         """根据项目标识解析并返回本地仓库信息"""
@@ -242,6 +770,7 @@ class StatsService:
                     source_path=abs_candidate,
                     force_refresh=force_refresh,
                     project_id=project_id,
+                    lock_manager=self.git_service.lock_manager,
                 )
 
                 project_registry.register_identifier(identifier, canonical_entry.path, canonical_entry.project_id)
@@ -258,6 +787,10 @@ class StatsService:
     def get_commits_for_project(self, project_name: str, force_refresh: bool = False) -> List[Commit]:
         """获取单个项目的 commit 列表（对外暴露的公共方法）"""
         return self._fetch_single_project(project_name, force_refresh=force_refresh)
+
+    def sync_working_tree(self, local_path: str, project_id: Optional[str] = None) -> bool:
+        """在需要读取文件内容前，将项目工作区快进到最新的远程提交（project_id 作为仓库锁键）"""
+        return self.git_service.sync_working_tree(local_path, lock_key=project_id)
     
     def _is_git_url(self, path: str) -> bool:
         """检查字符串是否为 Git URL"""
@@ -70,14 +70,23 @@ class Config:
     # Git 配置
     GIT_WORKSPACE = os.getenv('GIT_WORKSPACE', './repos')
     GIT_MAX_DEPTH = int(os.getenv('GIT_MAX_DEPTH', 1000))
+    REPO_LOCK_BACKEND = os.getenv('REPO_LOCK_BACKEND', 'auto')  # auto / file / redis
+    REPO_LOCK_TIMEOUT = int(os.getenv('REPO_LOCK_TIMEOUT', 600))
     
     # 缓存配置
     CACHE_TTL = int(os.getenv('CACHE_TTL', 300))  # 5 分钟
     
     # 性能配置
-    MAX_WORKERS = int(os.getenv('MAX_WORKERS', 5))
+    MAX_WORKERS = int(os.getenv('MAX_WORKERS', 5))  # 每个 worker 同时拉取 / 解析的项目数上限（所有请求共享）
+    FETCH_GLOBAL_SLOTS = int(os.getenv('FETCH_GLOBAL_SLOTS', 0))  # 所有 worker 合计的并发上限，0 表示不限制
     MAX_PROJECTS = int(os.getenv('MAX_PROJECTS', 50))
     PROJECT_FETCH_TIMEOUT = int(os.getenv('PROJECT_FETCH_TIMEOUT', 180))
+    COMMIT_INDEX_CACHE_SIZE = int(os.getenv('COMMIT_INDEX_CACHE_SIZE', 64))  # 缓存时间索引的项目数
+    STATS_EXECUTION_MODE = os.getenv('STATS_EXECUTION_MODE', 'thread')  # thread / process / async
+    STATS_PROCESS_WORKERS = _optional_int(os.getenv('STATS_PROCESS_WORKERS'))  # 默认 CPU 核数
+    ASYNC_INGEST_CONCURRENCY = int(os.getenv('ASYNC_INGEST_CONCURRENCY', 64))  # async 模式同时处理的项目数
+    WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'False').lower() == 'true'  # 启动后预热默认项目
+    WARMUP_TIMEOUT = int(os.getenv('WARMUP_TIMEOUT', 600))
     AI_RATIO_CACHE_TTL = int(os.getenv('AI_RATIO_CACHE_TTL', 300))
 
     # AI 分析服务配置
@@ -91,7 +100,18 @@ class Config:
     AI_ANALYZER_MAX_CHARACTERS = _optional_int(os.getenv('AI_ANALYZER_MAX_CHARACTERS'))
     AI_ANALYZER_CONCURRENCY = int(os.getenv('AI_ANALYZER_CONCURRENCY', 5))
     
+    # 指标配置：多 worker 部署时各 worker 把指标写入该目录，/metrics 合并导出（gunicorn.conf.py 默认开启）
+    METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+    # 慢请求阈值（毫秒）：超过后把各阶段耗时写入日志，-1 关闭
+    SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 2000))
+    
     # 日志配置
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_DIR = os.getenv('LOG_DIR', './logs')
+    
+    # 按需剖析：管理接口令牌（为空时管理接口关闭），剖析文件写入 LOG_DIR/profiles
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(LOG_DIR, 'profiles'))
+    # 未指定请求数 / 时长（或通过 SIGUSR2 开启）时剖析的请求数
+    PROFILE_DEFAULT_REQUESTS = int(os.getenv('PROFILE_DEFAULT_REQUESTS', 20))
 
@@ -0,0 +1,140 @@
+"""
+作者身份归一化
+
+git log 输出的作者已经按仓库的 .mailmap 映射为规范身份（%aN / %aE），
+这里再把规范邮箱（忽略大小写）驻留为整数 id，统计时按 id 分组，避免每次请求都比较字符串。
+
+.mailmap 是仓库级别的：映射前的旧邮箱只登记在所属项目的别名表中，只用于 lookup()，
+不会影响其它仓库中同一邮箱的驻留结果。
+
+驻留表有容量上限：超过 max_authors 时整表重置，id 继续递增、不会复用，
+重置前分配的 id 视为过期（author_id_of() 重新驻留，时间索引缓存按未命中处理并重新构建）。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from app.models.commit import Commit
+
+logger = logging.getLogger(__name__)
+
+
+def _identity_key(email: str, name: str = '') -> str:
+    email = (email or '').strip().lower()
+    if email:
+        return email
+    # 没有邮箱时退化为按姓名区分
+    return 'name:' + (name or '').strip().lower()
+
+
+class AuthorTable:
+    """规范作者身份 -> 整数 id 的驻留表（进程内，线程安全），以及按项目划分的别名表"""
+
+    def __init__(self, max_authors: int = 100000, max_alias_projects: int = 256):
+        self.max_authors = max_authors
+        self.max_alias_projects = max_alias_projects
+        self._lock = threading.Lock()
+        # 当前驻留表的起始 id，小于它的 id 来自重置前的驻留表
+        self.base = 0
+        self._ids: Dict[str, int] = {}
+        self._emails: List[str] = []
+        self._names: List[str] = []
+        # project_id -> {旧邮箱: 规范作者 id}，按最近登记的顺序淘汰
+        self._aliases: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+
+    def intern(self, email: str, name: str = '') -> int:
+        """
+        返回规范身份对应的 id，首次出现时分配新 id
+
+        Args:
+            email: 规范邮箱（已经过 .mailmap 映射）
+            name: 规范姓名
+        """
+        key = _identity_key(email, name)
+        author_id = self._ids.get(key)
+        if author_id is None:
+            with self._lock:
+                author_id = self._ids.get(key)
+                if author_id is None:
+                    if len(self._emails) >= self.max_authors:
+                        self._reset_locked()
+                    author_id = self.base + len(self._emails)
+                    self._emails.append(email)
+                    self._names.append(name)
+                    self._ids[key] = author_id
+        return author_id
+
+    def register_aliases(self, project_id: str, commits: Iterable[Commit]) -> None:
+        """登记项目中 .mailmap 映射前的旧邮箱（只在该项目内有效）"""
+        found = {
+            _identity_key(commit.author_alias): author_id_of(commit)
+            for commit in commits
+            if commit.author_alias
+        }
+        with self._lock:
+            # 计算别名期间驻留表被重置时丢弃过期的 id
+            found = {alias: author_id for alias, author_id in found.items() if author_id >= self.base}
+            aliases = self._aliases.get(project_id)
+            if aliases is None:
+                if not found:
+                    return
+                aliases = self._aliases[project_id] = {}
+            aliases.update(found)
+            self._aliases.move_to_end(project_id)
+            while len(self._aliases) > self.max_alias_projects:
+                self._aliases.popitem(last=False)
+
+    def lookup(self, email: str, project_id: Optional[str] = None) -> Optional[int]:
+        """
+        按邮箱查询 id
+
+        指定 project_id 时先查该项目的别名表（.mailmap 中的旧邮箱），再按规范邮箱查询。
+        """
+        key = _identity_key(email)
+        if project_id is not None:
+            with self._lock:
+                author_id = self._aliases.get(project_id, {}).get(key)
+            if author_id is not None:
+                return author_id
+        return self._ids.get(key)
+
+    def is_current(self, author_id: int) -> bool:
+        """id 是否属于当前的驻留表（重置前分配的 id 需要重新驻留）"""
+        return author_id >= self.base
+
+    def email(self, author_id: int) -> str:
+        """id 对应的规范邮箱，过期的 id 返回空字符串"""
+        with self._lock:
+            offset = author_id - self.base
+            return self._emails[offset] if 0 <= offset < len(self._emails) else ''
+
+    def name(self, author_id: int) -> str:
+        """id 对应的规范姓名，过期的 id 返回空字符串"""
+        with self._lock:
+            offset = author_id - self.base
+            return self._names[offset] if 0 <= offset < len(self._names) else ''
+
+    def __len__(self) -> int:
+        return len(self._emails)
+
+    def _reset_locked(self) -> None:
+        # 别名表中的 id 同样来自旧驻留表，一并清空
+        logger.warning(f"作者驻留表达到 {self.max_authors} 条上限，重置（id 从 {self.base + len(self._emails)} 继续分配）")
+        self.base += len(self._emails)
+        self._ids = {}
+        self._emails = []
+        self._names = []
+        self._aliases = OrderedDict()
+
+
+def author_id_of(commit: Commit) -> int:
+    """commit 的作者 id（未经 git log 解析构造的 commit、或 id 已随驻留表重置而过期时在此重新驻留）"""
+    if commit.author_id is None or not author_table.is_current(commit.author_id):
+        commit.author_id = author_table.intern(commit.author_email, commit.author_name)
+    return commit.author_id
+
+
+# 全局实例
+author_table = AuthorTable()
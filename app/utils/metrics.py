@@ -0,0 +1,379 @@
+"""
+进程内指标收集工具
+
+配置了多进程目录（METRICS_MULTIPROC_DIR）时，每个 gunicorn worker 定期把自己的指标
+写入 <dir>/metrics-<pid>.json，/metrics 接口合并目录下所有 worker 的数据：
+计数器和直方图累加（已退出 worker 的计数也保留），瞬时值只累加仍存活的 worker。
+已退出 worker 的文件在导出时折叠进 metrics-archived.json 后删除，目录不会随 worker 重启无限增长；
+pid 被新 worker 复用时，新 worker 第一次写入前同样先把旧文件折叠进归档，计数器不会倒退。
+fork 出的子进程（gunicorn preload 后的 worker）不继承父进程内存中的指标，从零开始计数，
+父进程的计数只由父进程自己的文件导出一次。
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.utils.request_timing import record_span
+
+try:  # pragma: no cover - Windows 没有 fcntl
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Prometheus 导出时的指标名前缀
+METRICS_PREFIX = 'code996_'
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# 已退出 worker 的计数器 / 直方图汇总文件
+ARCHIVE_FILE = 'metrics-archived.json'
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """线程安全的计数器 / 直方图注册表"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Dict[str, object]] = {}
+
+        self.multiprocess_dir: Optional[str] = None
+        self.flush_interval = 5.0
+        self._flusher_pid: Optional[int] = None
+        # 已写入过指标文件的 pid（用于识别 pid 被复用时遗留的旧文件）
+        self._instance_pid: Optional[int] = None
+        # 内存中的指标所属的进程
+        self._owner_pid = os.getpid()
+
+    def configure_multiprocess(self, directory: Optional[str], flush_interval: float = 5.0) -> None:
+        """开启多进程汇总（directory 为空时只导出本进程的数据）"""
+        self.multiprocess_dir = os.path.abspath(directory) if directory else None
+        self.flush_interval = flush_interval
+        if self.multiprocess_dir:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        """计数器累加"""
+        key = (name, _label_key(labels))
+        self._ensure_flusher()
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """设置瞬时值"""
+        key = (name, _label_key(labels))
+        self._ensure_flusher()
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """记录一次直方图观测值"""
+        key = (name, _label_key(labels))
+        index = bisect_left(self.buckets, value)
+        self._ensure_flusher()
+        with self._lock:
+            record = self._histograms.get(key)
+            if record is None:
+                record = {'buckets': [0] * (len(self.buckets) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0}
+                self._histograms[key] = record
+            record['buckets'][index] += 1
+            record['count'] += 1
+            record['sum'] += value
+            record['max'] = max(record['max'], value)
+
+    @contextmanager
+    def timer(
+        self,
+        name: str,
+        labels: Optional[Dict[str, str]] = None,
+        span: Optional[str] = None,
+    ) -> Iterator[None]:
+        """记录代码块的耗时（秒），异常退出同样记录；指定 span 时同时计入当前请求的耗时拆分"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(name, elapsed, labels=labels)
+            if span:
+                record_span(span, elapsed)
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式导出（多进程模式下合并所有 worker）"""
+        self._check_fork()
+        if self.multiprocess_dir:
+            self.flush()
+            states = self._load_states()
+        else:
+            states = [self._export_state()]
+
+        counters, gauges, histograms = self._merge_states(states)
+
+        lines: List[str] = []
+        for kind, items in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in items}):
+                lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+                for (metric, labels), value in sorted(items.items()):
+                    if metric == name:
+                        lines.append(f"{METRICS_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} histogram")
+            for (metric, labels), (buckets, count, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), buckets):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    bucket_labels = labels + (('le', le),)
+                    lines.append(f"{METRICS_PREFIX}{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{METRICS_PREFIX}{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{METRICS_PREFIX}{name}_count{_format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def flush(self) -> None:
+        """把本进程的指标写入多进程目录"""
+        if not self.multiprocess_dir:
+            return
+        path = os.path.join(self.multiprocess_dir, f"metrics-{os.getpid()}.json")
+        self._check_fork()
+        if self._instance_pid != os.getpid():
+            self._instance_pid = os.getpid()
+            # 同 pid 的文件来自已经退出的 worker（pid 被复用）：覆盖前先归档
+            if os.path.exists(path):
+                with self._archive_lock():
+                    self._archive([path])
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._export_state(), f)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning(f"写入指标文件失败 ({path}): {exc}")
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """导出当前所有指标（用于调试和健康检查）"""
+        self._check_fork()
+        with self._lock:
+            return {
+                'counters': {self._format_key(k): v for k, v in self._counters.items()},
+                'gauges': {self._format_key(k): v for k, v in self._gauges.items()},
+                'histograms': {
+                    self._format_key(k): {
+                        'count': v['count'],
+                        'sum': round(v['sum'], 6),
+                        'max': round(v['max'], 6),
+                    }
+                    for k, v in self._histograms.items()
+                },
+            }
+
+    def reset(self):
+        """清空所有指标"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def _export_state(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self._gauges.items()],
+                'histograms': [
+                    [name, list(labels), list(record['buckets']), record['count'], record['sum']]
+                    for (name, labels), record in self._histograms.items()
+                ],
+            }
+
+    def _merge_states(self, states: List[Dict[str, object]]) -> Tuple[Dict, Dict, Dict]:
+        """合并多个进程的指标：计数器和直方图累加，瞬时值只累加存活的进程"""
+        counters: Dict[Tuple[str, LabelKey], float] = {}
+        gauges: Dict[Tuple[str, LabelKey], float] = {}
+        histograms: Dict[Tuple[str, LabelKey], List] = {}
+        for state in states:
+            for name, labels, value in state['counters']:
+                key = (name, _label_key(dict(labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            if state.get('alive', True):
+                for name, labels, value in state['gauges']:
+                    key = (name, _label_key(dict(labels)))
+                    gauges[key] = gauges.get(key, 0.0) + value
+            for name, labels, buckets, count, total in state['histograms']:
+                key = (name, _label_key(dict(labels)))
+                merged = histograms.setdefault(key, [[0] * (len(self.buckets) + 1), 0, 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += count
+                merged[2] += total
+        return counters, gauges, histograms
+
+    def _load_states(self) -> List[Dict[str, object]]:
+        # 持锁读取：避免读到一半时其它 worker 把文件归档，同一份计数被漏算或重复计算
+        with self._archive_lock():
+            states = []
+            dead = []
+            for path in glob.glob(os.path.join(self.multiprocess_dir, 'metrics-*.json')):
+                state = _read_state(path)
+                if state is None:
+                    continue
+                if os.path.basename(path) == ARCHIVE_FILE:
+                    state['alive'] = False
+                else:
+                    state['alive'] = _pid_alive(state.get('pid'))
+                    if not state['alive']:
+                        dead.append((path, state))
+                states.append(state)
+
+            if dead:
+                self._archive([path for path, _ in dead], states=dict(dead))
+        return states
+
+    @contextmanager
+    def _archive_lock(self) -> Iterator[None]:
+        """多进程目录内的互斥锁（读取 / 归档指标文件时持有）"""
+        fd = os.open(os.path.join(self.multiprocess_dir, '.archive.lock'), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _archive(self, paths: List[str], states: Optional[Dict[str, Dict]] = None) -> None:
+        """
+        把已退出 worker 的计数器和直方图折叠进归档文件，并删除原文件（瞬时值丢弃）
+
+        调用方需持有 _archive_lock；states 为已经读取过的文件内容。
+        """
+        archive_path = os.path.join(self.multiprocess_dir, ARCHIVE_FILE)
+        states = states or {}
+        try:
+            folded = [(path, states.get(path) or _read_state(path)) for path in paths]
+            folded = [(path, state) for path, state in folded if state is not None]
+            if not folded:
+                return
+
+            archived = _read_state(archive_path)
+            counters, _, histograms = self._merge_states(
+                ([archived] if archived else []) + [state for _, state in folded]
+            )
+            state = {
+                'pid': None,
+                'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                'gauges': [],
+                'histograms': [
+                    [name, list(labels), buckets, count, total]
+                    for (name, labels), (buckets, count, total) in histograms.items()
+                ],
+            }
+            tmp_path = f"{archive_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, archive_path)
+            for path, _ in folded:
+                os.remove(path)
+            logger.info(f"已归档 {len(folded)} 个已退出 worker 的指标文件")
+        except OSError as exc:
+            logger.warning(f"归档指标文件失败: {exc}")
+
+    def _check_fork(self) -> None:
+        """fork 之后（pid 变化）丢弃从父进程复制来的指标，否则每个 worker 都会把父进程的计数重复导出一遍"""
+        if self._owner_pid == os.getpid():
+            return
+        with self._lock:
+            if self._owner_pid == os.getpid():
+                return
+            self._owner_pid = os.getpid()
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def _ensure_flusher(self) -> None:
+        self._check_fork()
+        if not self.multiprocess_dir or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    @staticmethod
+    def _format_key(key: Tuple[str, LabelKey]) -> str:
+        name, labels = key
+        if not labels:
+            return name
+        return name + '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _read_state(path: str) -> Optional[Dict[str, object]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as exc:
+        logger.debug(f"读取指标文件失败 ({path}): {exc}")
+        return None
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# 全局实例
+metrics = MetricsRegistry()
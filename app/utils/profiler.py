@@ -0,0 +1,196 @@
+"""
+按需请求级性能剖析
+
+在线上 worker 中临时为接下来的 N 个请求（或 T 秒内的请求）开启 cProfile，
+每个请求输出一个 .prof 文件和一个同名 .json（请求路径、项目列表、耗时等），
+无需重启服务即可剖析真实仓库上的热点路径。
+
+cProfile 只跟踪调用它的线程：请求线程之外，在拉取调度器工作线程中执行的任务
+（get_commits、解析、建索引）通过 contextvars 关联到同一个请求并合并进同一个文件。
+process / async 模式下在子进程 / 事件循环中执行的部分不会被剖析。
+
+Python 3.12 起 cProfile 基于 sys.monitoring，同一进程同时只能有一个启用的 profiler：
+同一时刻只剖析一个请求（其它请求照常处理、不占用预算），且只剖析请求线程。
+启用 profiler 失败（例如其它剖析工具已在运行）时只记录日志，不影响请求本身。
+"""
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 3.12+ 进程内同时只能启用一个 cProfile.Profile
+SINGLE_PROFILER = sys.version_info >= (3, 12)
+
+_current_session: ContextVar[Optional['ProfileSession']] = ContextVar('profile_session', default=None)
+
+
+class ProfileSession:
+    """单个被剖析的请求（请求线程的 profile 加上各工作线程的 profile）"""
+
+    def __init__(self, sequence: int):
+        self.sequence = sequence
+        self.started_at = time.time()
+        self.profile = cProfile.Profile()
+        self._lock = threading.Lock()
+        self._thread_profiles: List[cProfile.Profile] = []
+
+    def add(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self._thread_profiles.append(profile)
+
+    def dump(self, path: str) -> None:
+        stats = pstats.Stats(self.profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        stats.dump_stats(path)
+
+
+class RequestProfiler:
+    """
+    每个进程一个的剖析开关
+
+    arm() 设置剖析预算（请求数和 / 或截止时间），begin() 在请求开始时领取一个名额，
+    finish() 在请求结束后写出剖析文件；预算用完后自动关闭。
+    """
+
+    def __init__(self):
+        self.output_dir = './logs/profiles'
+        self._lock = threading.Lock()
+        self._remaining: Optional[int] = None
+        self._deadline: Optional[float] = None
+        self._armed = False
+        self._sequence = 0
+        self._written: List[str] = []
+        # 同一时刻只剖析一个请求
+        self._session_lock = threading.Lock()
+
+    def configure(self, output_dir: str) -> None:
+        self.output_dir = output_dir
+
+    def arm(self, requests: Optional[int] = None, seconds: Optional[float] = None) -> Dict[str, Any]:
+        """为接下来的 requests 个请求 / seconds 秒内的请求开启剖析（两者都给时先到者为准）"""
+        if requests is None and seconds is None:
+            raise ValueError("requests 和 seconds 至少指定一个")
+        if requests is not None and requests <= 0:
+            raise ValueError("requests 必须大于 0")
+        if seconds is not None and seconds <= 0:
+            raise ValueError("seconds 必须大于 0")
+
+        with self._lock:
+            self._remaining = requests
+            self._deadline = time.time() + seconds if seconds is not None else None
+            self._armed = True
+        logger.warning(f"请求剖析已开启: pid={os.getpid()} requests={requests} seconds={seconds}")
+        return self.status()
+
+    def disarm(self) -> Dict[str, Any]:
+        with self._lock:
+            self._armed = False
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            active = self._is_active()
+            return {
+                'pid': os.getpid(),
+                'active': active,
+                'remaining_requests': self._remaining if active else 0,
+                'remaining_seconds': (
+                    round(max(0.0, self._deadline - time.time()), 1) if active and self._deadline else None
+                ),
+                'output_dir': os.path.abspath(self.output_dir),
+                'recent_files': list(self._written[-10:]),
+            }
+
+    def begin(self) -> Optional[ProfileSession]:
+        """当前请求需要剖析时返回已开始计时的 ProfileSession"""
+        if not self._armed:
+            return None
+
+        if not self._session_lock.acquire(blocking=False):
+            return None
+        with self._lock:
+            if not self._is_active():
+                self._armed = False
+                self._session_lock.release()
+                return None
+            session = ProfileSession(self._sequence + 1)
+
+        try:
+            session.profile.enable()
+        except ValueError as exc:
+            self._session_lock.release()
+            logger.warning(f"无法开启请求剖析: {exc}")
+            return None
+
+        with self._lock:
+            if self._remaining is not None:
+                self._remaining -= 1
+            self._sequence += 1
+        _current_session.set(session)
+        return session
+
+    def finish(self, session: ProfileSession, metadata: Dict[str, Any]) -> Optional[str]:
+        """停止剖析并写出 <name>.prof 与 <name>.json，返回 .prof 路径"""
+        session.profile.disable()
+        _current_session.set(None)
+        self._session_lock.release()
+
+        slug = metadata.get('path', '').strip('/').replace('/', '_') or 'root'
+        name = f"profile-{time.strftime('%Y%m%d-%H%M%S', time.localtime(session.started_at))}-{os.getpid()}-{session.sequence}-{slug}"
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{name}.prof")
+            session.dump(path)
+            with open(os.path.join(self.output_dir, f"{name}.json"), 'w', encoding='utf-8') as handle:
+                json.dump(dict(metadata, pid=os.getpid(), started_at=session.started_at), handle, ensure_ascii=False, indent=2)
+        except Exception as exc:
+            logger.error(f"写入剖析文件失败: {exc}", exc_info=True)
+            return None
+
+        with self._lock:
+            self._written.append(path)
+        logger.info(f"请求剖析文件已写入: {path}")
+        return path
+
+    def _is_active(self) -> bool:
+        if not self._armed:
+            return False
+        if self._remaining is not None and self._remaining <= 0:
+            return False
+        if self._deadline is not None and time.time() >= self._deadline:
+            return False
+        return True
+
+
+def run_profiled(func: Callable[..., Any], /, *args, **kwargs) -> Any:
+    """在工作线程中执行任务；提交方的请求正在被剖析时，同时剖析这个线程并合并到该请求"""
+    session = _current_session.get()
+    if session is None or SINGLE_PROFILER:
+        return func(*args, **kwargs)
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError as exc:
+        logger.debug(f"工作线程剖析未开启: {exc}")
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        session.add(profile)
+
+
+# 全局实例（在 create_app 中配置）
+request_profiler = RequestProfiler()
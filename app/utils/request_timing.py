@@ -0,0 +1,86 @@
+"""
+请求级耗时拆分
+
+每个请求持有一个 RequestTimer（通过 contextvars 传递），各阶段（git fetch、git log、解析、
+汇总、缓存读写、序列化）把耗时累加到当前请求上，最终输出为 Server-Timing 响应头
+和慢请求日志。没有当前请求时（后台预热等）span 不做任何事。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+_current_timer: ContextVar[Optional['RequestTimer']] = ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    """单个请求的各阶段耗时（同一阶段多次出现时累加，可被多个线程同时写入）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            record = self._spans.setdefault(name, [0.0, 0])
+            record[0] += seconds
+            record[1] += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """{阶段: {"ms": 累计毫秒, "count": 次数}}"""
+        with self._lock:
+            return {
+                name: {"ms": round(seconds * 1000, 2), "count": count}
+                for name, (seconds, count) in self._spans.items()
+            }
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头（并发执行的阶段累计耗时可能超过 total）"""
+        parts = [
+            f"{name};dur={values['ms']}" + (f';desc="x{values["count"]}"' if values['count'] > 1 else '')
+            for name, values in sorted(self.breakdown().items())
+        ]
+        parts.append(f"total;dur={round(self.elapsed * 1000, 2)}")
+        return ', '.join(parts)
+
+
+def start_request() -> RequestTimer:
+    """为当前请求创建计时器"""
+    timer = RequestTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current_timer.get()
+
+
+def bind_timer(timer: Optional[RequestTimer]) -> None:
+    """在其它执行上下文（如 asyncio 任务）中继续累加到同一个请求"""
+    _current_timer.set(timer)
+
+
+def record_span(name: str, seconds: float) -> None:
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """记录代码块耗时到当前请求"""
+    if _current_timer.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
@@ -2,10 +2,16 @@
 统计计算工具
 """
 
-from typing import List, Dict, Any
+import heapq
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
 from app.models.commit import Commit
 from app.models.contributor import Contributor
-from app.utils.date_utils import is_in_last_week
+from app.utils.author_identity import author_id_of, author_table
+from app.utils.date_utils import get_last_week_range
+
+# 趋势序列最多包含的时间点数（按天约 10 年，按周约 70 年）
+MAX_TIMESERIES_BUCKETS = 3660
 
 
 def calculate_hour_data(commits: List[Commit]) -> List[Dict[str, Any]]:
@@ -128,61 +134,291 @@ def calculate_overtime_ratio(commits: List[Commit]) -> float:
     return round(overtime_count / len(commits), 2)
 
 
+WEEKDAY_NAMES = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+def build_hour_weekday_matrix(commits: List[Commit]) -> List[int]:
+    """
+    构建星期 × 小时矩阵
+    
+    Returns:
+        168 个元素的列表，下标为 weekday * 24 + hour
+    """
+    matrix = [0] * 168
+    for commit in commits:
+        matrix[commit.weekday * 24 + commit.hour] += 1
+    return matrix
+
+
+def calculate_matrix_stats(matrix: List[int]) -> Dict[str, Any]:
+    """
+    从星期 × 小时矩阵一次性推导各项统计，结果与逐 commit 计算的函数一致
+    
+    Returns:
+        包含 hour_data / week_data / work_hour_pl / work_week_pl / index_996 / overtime_ratio 的字典
+    """
+    hour_counts = [sum(matrix[w * 24 + h] for w in range(7)) for h in range(24)]
+    week_counts = [sum(matrix[w * 24:(w + 1) * 24]) for w in range(7)]
+    total = sum(week_counts)
+
+    work_count = sum(matrix[w * 24 + h] for w in range(5) for h in range(9, 18))
+    weekday_count = sum(week_counts[:5])
+    weekend_count = total - weekday_count
+    evening_count = sum(hour_counts[18:21])
+
+    if total:
+        index_996 = round(min(evening_count / total * 0.6 + weekend_count / total * 0.4, 1.0), 2)
+        overtime_ratio = round((total - work_count) / total, 2)
+    else:
+        index_996 = 0.0
+        overtime_ratio = 0.0
+
+    return {
+        "hour_data": [{"time": f"{h:02d}", "count": hour_counts[h]} for h in range(24)],
+        "week_data": [{"time": WEEKDAY_NAMES[w], "count": week_counts[w]} for w in range(7)],
+        "work_hour_pl": [
+            {"time": "工作时间", "count": work_count},
+            {"time": "加班时间", "count": total - work_count},
+        ],
+        "work_week_pl": [
+            {"time": "工作日", "count": weekday_count},
+            {"time": "周末", "count": weekend_count},
+        ],
+        "index_996": index_996,
+        "overtime_ratio": overtime_ratio,
+    }
+
+
+def build_heatmap(matrix: List[int]) -> Dict[str, Any]:
+    """
+    将星期 × 小时矩阵转换为热力图数据
+    
+    Returns:
+        {"weekdays": [...], "hours": [...], "matrix": 7 × 24 二维列表, "max_count": ..., "total_count": ...}
+    """
+    rows = [list(matrix[w * 24:(w + 1) * 24]) for w in range(7)]
+    return {
+        "weekdays": WEEKDAY_NAMES,
+        "hours": [f"{h:02d}" for h in range(24)],
+        "matrix": rows,
+        "max_count": max(matrix) if matrix else 0,
+        "total_count": sum(matrix),
+    }
+
+
+def check_timeseries_span(start: int, end: int, interval: str = 'day') -> None:
+    """
+    检查 [start, end]（日期序数）按 interval 展开后的时间点数
+
+    Raises:
+        ValueError: 超过 MAX_TIMESERIES_BUCKETS
+    """
+    if interval == 'week':
+        start -= date.fromordinal(start).weekday()
+        buckets = (end - start) // 7 + 1
+    else:
+        buckets = end - start + 1
+    if buckets > MAX_TIMESERIES_BUCKETS:
+        hint = "请缩小 since/until 范围" if interval == 'week' else "请缩小 since/until 范围或使用 interval=week"
+        unit = '周' if interval == 'week' else '天'
+        raise ValueError(f"时间范围过大: 按{unit}统计最多 {MAX_TIMESERIES_BUCKETS} 个时间点，{hint}")
+
+
+def build_timeseries(
+    daily_totals: Dict[int, List[int]],
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    interval: str = 'day',
+    repo_count: int = 0,
+) -> Dict[str, Any]:
+    """
+    将日汇总转换为连续的趋势序列（无提交的日期/周补 0）
+    
+    Args:
+        daily_totals: 日期序数 -> [提交数, 新增行数, 删除行数, 加班提交数]
+        since: 开始日期 (YYYY-MM-DD)，为空时取最早有提交的日期
+        until: 结束日期 (YYYY-MM-DD)，为空时取最晚有提交的日期
+        interval: 'day' 按天，'week' 按周（以周一为一周的开始）
+    
+    Returns:
+        {"interval": ..., "start_date": ..., "end_date": ..., "repo_count": ..., "series": [...]}
+
+    Raises:
+        ValueError: 时间点数超过 MAX_TIMESERIES_BUCKETS（例如只给出很早的 since）
+    """
+    if since:
+        start = date.fromisoformat(since).toordinal()
+    else:
+        start = min(daily_totals) if daily_totals else None
+    if until:
+        end = date.fromisoformat(until).toordinal()
+    else:
+        end = max(daily_totals) if daily_totals else None
+
+    series: List[Dict[str, Any]] = []
+    if start is not None and end is not None and start <= end:
+        check_timeseries_span(start, end, interval)
+        step = 7 if interval == 'week' else 1
+        if interval == 'week':
+            start -= date.fromordinal(start).weekday()
+
+        for bucket_start in range(start, end + 1, step):
+            commits = additions = deletions = overtime = 0
+            for day in range(bucket_start, bucket_start + step):
+                totals = daily_totals.get(day)
+                if totals:
+                    commits += totals[0]
+                    additions += totals[1]
+                    deletions += totals[2]
+                    overtime += totals[3]
+            series.append({
+                "date": date.fromordinal(bucket_start).isoformat(),
+                "commits": commits,
+                "additions": additions,
+                "deletions": deletions,
+                "overtime_count": overtime,
+                "overtime_ratio": round(overtime / commits, 2) if commits else 0.0,
+            })
+
+    return {
+        "interval": interval,
+        "start_date": date.fromordinal(start).isoformat() if start is not None else None,
+        "end_date": date.fromordinal(end).isoformat() if end is not None else None,
+        "repo_count": repo_count,
+        "series": series,
+    }
+
+
 def calculate_contributors(commits: List[Commit]) -> List[Dict[str, Any]]:
     """统计贡献者列表，基于代码变更量计算贡献度"""
 
-    contributors_map: Dict[str, Contributor] = {}
+    contributors = _aggregate_contributors(commits)
+    contributors.sort(key=_contributor_sort_key, reverse=True)
+
+    return [_serialize_contributor(contributor, rank) for rank, contributor in enumerate(contributors, start=1)]
+
+
+def calculate_top_contributors(commits: List[Commit], top_k: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    只计算贡献度最高的 top_k 位贡献者
+    
+    使用大小为 top_k 的堆做部分排序，只序列化返回的行；排名与 calculate_contributors 完全一致。
+    
+    Returns:
+        (贡献者列表, 贡献者总数)
+    """
+    contributors = _aggregate_contributors(commits)
+    top = heapq.nlargest(top_k, contributors, key=_contributor_sort_key)
+
+    result = [_serialize_contributor(contributor, rank) for rank, contributor in enumerate(top, start=1)]
+    return result, len(contributors)
+
+
+def _aggregate_contributors(commits: List[Commit]) -> List[Contributor]:
+    # 按规范作者 id 分组（.mailmap 合并后的同一个人只算一个贡献者）
+    contributors_map: Dict[int, Contributor] = {}
+
+    # 上周范围每次调用只计算一次
+    last_week_start, last_week_end = get_last_week_range()
 
     for commit in commits:
-        email = commit.author_email
-        if email not in contributors_map:
-            contributors_map[email] = Contributor(
-                name=commit.author_name,
-                email=email,
+        author_id = author_id_of(commit)
+        contributor = contributors_map.get(author_id)
+        if contributor is None:
+            contributor = contributors_map[author_id] = Contributor(
+                name=author_table.name(author_id) or commit.author_name,
+                email=author_table.email(author_id) or commit.author_email,
             )
         
         # 判断commit是否在上周范围内
-        is_last_week_commit = is_in_last_week(commit.timestamp)
-        contributors_map[email].add_commit(commit, is_last_week=is_last_week_commit)
+        is_last_week_commit = last_week_start <= commit.timestamp <= last_week_end
+        contributor.add_commit(commit, is_last_week=is_last_week_commit)
+
+    return list(contributors_map.values())
 
-        if commit.project_id:
-            contributors_map[email].project_ids.add(commit.project_id)
 
-        if commit.project_name:
-            contributors_map[email].project_names.add(commit.project_name)
+def _contributor_sort_key(contributor: Contributor) -> Tuple[int, int, int]:
+    return contributor.contribution_score, contributor.additions, contributor.commits
 
-    contributors = list(contributors_map.values())
 
-    contributors.sort(
-        key=lambda c: (
-            c.contribution_score,
-            c.additions,
-            c.commits,
-        ),
-        reverse=True,
+def _serialize_contributor(contributor: Contributor, rank: int) -> Dict[str, Any]:
+    contributor.rank = rank
+    return {
+        "rank": contributor.rank,
+        "name": contributor.name,
+        "email": contributor.email,
+        "contribution_score": contributor.contribution_score,
+        "total_changes": contributor.total_changes,
+        "average_change": round(contributor.average_change, 2),
+        "net_additions": contributor.net_additions,
+        "commits": contributor.commits,
+        "additions": contributor.additions,
+        "deletions": contributor.deletions,
+        "projects": sorted(contributor.project_ids),
+        "project_names": sorted(contributor.project_names),
+        "daily_commits": contributor.last_week_distribution,  # 使用上周数据
+    }
+
+
+def calculate_contributor_detail(commits: List[Commit], recent_limit: int = 20) -> Optional[Dict[str, Any]]:
+    """
+    单个贡献者的详细数据：按小时 / 星期分布、按项目汇总以及最近的提交
+    
+    Returns:
+        贡献者详情，commits 为空时返回 None
+    """
+    if not commits:
+        return None
+
+    author_id = author_id_of(commits[0])
+    contributor = Contributor(
+        name=author_table.name(author_id) or commits[0].author_name,
+        email=author_table.email(author_id) or commits[0].author_email,
     )
+    projects: Dict[str, Dict[str, Any]] = {}
 
-    result: List[Dict[str, Any]] = []
+    for commit in commits:
+        contributor.add_commit(commit)
 
-    for rank, contributor in enumerate(contributors, start=1):
-        contributor.rank = rank
-        result.append(
-            {
-                "rank": contributor.rank,
-                "name": contributor.name,
-                "email": contributor.email,
-                "contribution_score": contributor.contribution_score,
-                "total_changes": contributor.total_changes,
-                "average_change": round(contributor.average_change, 2),
-                "net_additions": contributor.net_additions,
-                "commits": contributor.commits,
-                "additions": contributor.additions,
-                "deletions": contributor.deletions,
-                "projects": sorted(contributor.project_ids),
-                "project_names": sorted(contributor.project_names),
-                "daily_commits": contributor.last_week_distribution,  # 使用上周数据
+        project_key = commit.project_id or commit.project_name or ''
+        project = projects.get(project_key)
+        if project is None:
+            project = projects[project_key] = {
+                "project_id": commit.project_id,
+                "project_name": commit.project_name,
+                "commits": 0,
+                "additions": 0,
+                "deletions": 0,
             }
-        )
+        project["commits"] += 1
+        project["additions"] += commit.additions
+        project["deletions"] += commit.deletions
 
-    return result
+    recent = heapq.nlargest(recent_limit, commits, key=lambda c: c.timestamp)
 
+    return {
+        "name": contributor.name,
+        "email": contributor.email,
+        "contribution_score": contributor.contribution_score,
+        "total_changes": contributor.total_changes,
+        "average_change": round(contributor.average_change, 2),
+        "net_additions": contributor.net_additions,
+        "commits": contributor.commits,
+        "additions": contributor.additions,
+        "deletions": contributor.deletions,
+        "hour_data": calculate_hour_data(commits),
+        "week_data": calculate_week_data(commits),
+        "projects": sorted(projects.values(), key=lambda p: (-p["commits"], p["project_name"] or '')),
+        "recent_commits": [
+            {
+                "hash": commit.hash,
+                "message": commit.message.strip().splitlines()[0] if commit.message.strip() else '',
+                "timestamp": commit.timestamp.isoformat(),
+                "additions": commit.additions,
+                "deletions": commit.deletions,
+                "project_id": commit.project_id,
+                "project_name": commit.project_name,
+            }
+            for commit in recent
+        ],
+    }
@@ -2,20 +2,30 @@
 Gunicorn 配置文件 - 生产环境
 """
 
+import glob
 import multiprocessing
 import os
+import tempfile
 
 # 绑定地址和端口
 bind = "0.0.0.0:9970"
 
 # Worker 进程数（推荐：CPU核心数 * 2 + 1）
-workers = multiprocessing.cpu_count() * 2 + 1
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
 
 # Worker 类型
-worker_class = "sync"
+# gthread：每个 worker 用多个线程处理请求，等待 git / LLM 时不占满整个进程，
+# 同一 worker 内的线程共享时间索引缓存和拉取调度器（推荐）
+# sync：每个 worker 同时只处理一个请求
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
 
-# 超时时间（秒）
-timeout = 60
+# gthread 模式下每个 worker 的请求线程数
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# 超时时间（秒）：必须大于单项目拉取超时 PROJECT_FETCH_TIMEOUT，
+# 否则 sync worker 会在等待慢仓库时被 master 杀掉
+timeout = int(os.getenv('GUNICORN_TIMEOUT', int(os.getenv('PROJECT_FETCH_TIMEOUT', 180)) + 30))
+graceful_timeout = 30
 
 # Keep-alive 连接时间
 keepalive = 5
@@ -38,6 +48,9 @@ loglevel = "info"
 # 访问日志格式
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
+# 多 worker 指标汇总目录（各 worker 写入，/metrics 合并导出）
+os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'code996-metrics'))
+
 # 预加载应用（提升性能）
 preload_app = True
 
@@ -53,11 +66,38 @@ def on_starting(server):
     print("=" * 60)
     print("CODE996 数据看板后端服务")
     print("=" * 60)
-    print(f"Workers: {workers}")
+    print(f"Workers: {workers} ({worker_class}, threads={threads if worker_class == 'gthread' else 1})")
     print(f"Bind: {bind}")
     print(f"Timeout: {timeout}s")
     print("=" * 60)
 
+    # 清理上一次运行留下的 worker 指标
+    for path in glob.glob(os.path.join(os.environ['METRICS_MULTIPROC_DIR'], 'metrics-*.json')):
+        os.remove(path)
+
+def post_fork(server, worker):
+    """Worker 启动后开始预热默认项目（WARMUP_ON_STARTUP 未开启时不做任何事）"""
+    from app.api.warmup import dashboard_warmup
+    dashboard_warmup.ensure_started()
+
+def post_worker_init(worker):
+    """kill -USR2 <worker pid>：在该 worker 中剖析接下来的 PROFILE_DEFAULT_REQUESTS 个请求"""
+    import signal
+    import threading
+
+    from app.settings import Config
+    from app.utils.profiler import request_profiler
+
+    def arm_profiler(signum, frame):
+        # 信号处理函数运行在主线程，剖析开关的锁交给单独线程获取
+        threading.Thread(
+            target=request_profiler.arm,
+            kwargs={'requests': Config.PROFILE_DEFAULT_REQUESTS},
+            daemon=True,
+        ).start()
+
+    signal.signal(signal.SIGUSR2, arm_profiler)
+
 def when_ready(server):
     """服务器就绪时"""
     print("✅ 服务器已就绪，等待请求...")
@@ -11,6 +11,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.main import app
+from app.api.warmup import dashboard_warmup
 from app.settings import Config
 
 if __name__ == '__main__':
@@ -25,9 +26,13 @@ if __name__ == '__main__':
     print("  • GET  /api/dashboard/summary?projects=xxx")
     print("  • GET  /api/dashboard/contributors?projects=xxx")
     print("  • GET  /api/dashboard/health")
+    print("  • GET  /api/dashboard/ready")
     print("")
     print("=" * 60)
     print("")
     
+    # debug 模式下 reloader 的父进程只负责监视文件，预热放在实际处理请求的子进程中
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not Config.DEBUG:
+        dashboard_warmup.ensure_started()
     app.run(host='0.0.0.0', port=9970, debug=Config.DEBUG)
 
@@ -0,0 +1,85 @@
+"""Benchmark full contributor sort against the bounded-heap top-K mode."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def _prepare_environment(project_root: str) -> None:
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+
+def _build_commits(authors: int, commits_per_author: int, seed: int):
+    from app.models.commit import Commit
+
+    rng = random.Random(seed)
+    tz = timezone(timedelta(hours=8))
+    start = datetime(2024, 1, 1, tzinfo=tz)
+
+    commits = []
+    for author in range(authors):
+        for _ in range(commits_per_author):
+            timestamp = start + timedelta(minutes=rng.randrange(0, 365 * 24 * 60))
+            commits.append(Commit(
+                hash=f"{author:08x}{len(commits):032x}",
+                author_name=f"author-{author}",
+                author_email=f"author-{author}@example.com",
+                timestamp=timestamp,
+                message="bench",
+                additions=rng.randrange(0, 500),
+                deletions=rng.randrange(0, 200),
+                project_id="bench",
+                project_name="bench",
+            ))
+    rng.shuffle(commits)
+    return commits
+
+
+def _best_of(repeat: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark top-K contributor ranking")
+    parser.add_argument("--authors", type=int, default=50000)
+    parser.add_argument("--commits-per-author", type=int, default=2)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _prepare_environment(project_root)
+
+    from app.utils.stats_calculator import calculate_contributors, calculate_top_contributors
+
+    commits = _build_commits(args.authors, args.commits_per_author, args.seed)
+
+    full = calculate_contributors(commits)
+    top, total = calculate_top_contributors(commits, args.top_k)
+    if total != len(full) or top != full[:args.top_k]:
+        sys.stderr.write("top-K result differs from full sort\n")
+        return 1
+
+    full_time = _best_of(args.repeat, lambda: calculate_contributors(commits))
+    top_time = _best_of(args.repeat, lambda: calculate_top_contributors(commits, args.top_k))
+
+    print(f"authors={args.authors} commits={len(commits)} top_k={args.top_k}")
+    print(f"full sort : {full_time * 1000:.1f} ms")
+    print(f"top-K heap: {top_time * 1000:.1f} ms ({full_time / top_time:.2f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""Benchmark thread-mode vs process-mode vs async-mode ingestion for many projects."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _prepare_environment(project_root: str) -> None:
+    for path in (project_root, os.path.join(project_root, 'scripts')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _thread_mode(paths: list[str], workers: int):
+    from git import Repo
+    from app.services.commit_index import DailyRollup, WindowAggregate
+    from app.services.git_service import read_commits
+
+    def ingest(path: str):
+        commits = read_commits(Repo(path), 'HEAD')
+        return WindowAggregate.from_commits(commits), DailyRollup.from_commits(commits)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(ingest, paths))
+
+
+def _process_mode(paths: list[str], scheduler, pool):
+    # Same path as StatsService in process mode: scheduler threads wait on the pool
+    futures = [scheduler.submit(('bench', path), pool.aggregate, path, 'HEAD') for path in paths]
+    return [future.result() for future in futures]
+
+
+def _async_mode(paths: list[str], loop):
+    from app.services.async_ingest import aggregate_project_window
+
+    futures = [loop.submit(path, lambda path=path: aggregate_project_window(path, 'HEAD')) for path in paths]
+    return [future.result() for future in futures]
+
+
+def _best_of(repeat: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark thread vs process vs async ingestion")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--commits", type=int, default=2000, help="Commits per synthetic project")
+    parser.add_argument("--threads", type=int, default=5, help="Thread-mode workers (StatsService default)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--async-concurrency", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", help="Reuse synthetic repositories in this directory")
+    args = parser.parse_args(argv)
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _prepare_environment(project_root)
+
+    from synthetic_repo import create_synthetic_repo
+    from app.services.async_ingest import AsyncIngestLoop
+    from app.services.fetch_scheduler import FetchScheduler
+    from app.services.parallel_ingest import ProcessIngestPool
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='code996-bench-')
+    paths = [
+        create_synthetic_repo(os.path.join(workdir, f"repo_{i:03d}"), commits=args.commits, seed=i)
+        for i in range(args.projects)
+    ]
+
+    pool = ProcessIngestPool(args.processes)
+    # Sized the way StatsService sizes the shared scheduler in process mode
+    scheduler = FetchScheduler(max_concurrency=args.threads)
+    scheduler.ensure_concurrency(pool.max_workers)
+    loop = AsyncIngestLoop(args.async_concurrency)
+    try:
+        thread_result = _thread_mode(paths, args.threads)
+        for mode, result in (
+            ('process', _process_mode(paths, scheduler, pool)),
+            ('async', _async_mode(paths, loop)),
+        ):
+            if result != thread_result:
+                sys.stderr.write(f"{mode}-mode result differs from thread mode\n")
+                return 1
+
+        thread_time = _best_of(args.repeat, lambda: _thread_mode(paths, args.threads))
+        process_time = _best_of(args.repeat, lambda: _process_mode(paths, scheduler, pool))
+        async_time = _best_of(args.repeat, lambda: _async_mode(paths, loop))
+    finally:
+        pool.shutdown()
+
+    print(f"projects={args.projects} commits/project={args.commits} cpus={os.cpu_count()} workdir={workdir}")
+    print(f"thread  ({args.threads} threads)   : {thread_time:.2f} s")
+    print(f"process ({args.processes} processes) : {process_time:.2f} s ({thread_time / process_time:.2f}x)")
+    print(f"async   ({args.async_concurrency} in flight) : {async_time:.2f} s ({thread_time / async_time:.2f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
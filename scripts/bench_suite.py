@@ -0,0 +1,259 @@
+"""End-to-end benchmark suite on synthetic repositories.
+
+Generates local git repositories of configurable size (commits, authors,
+files, time spread) and times the hot paths individually and through the
+Flask test client:
+
+* ``GitService.get_commits``
+* ``DashboardStats.from_commits`` / ``calculate_contributors``
+* ``CacheService`` get / set (Redis when reachable, otherwise the memory cache)
+* ``collect_project_files``
+* ``/summary`` and ``/contributors`` (response cache miss and hit)
+
+Results are written as JSON. Pass ``--baseline`` with an earlier result file to
+compare runs; the exit code is 1 when any case got slower than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+
+def _prepare_environment(project_root: str) -> None:
+    for path in (project_root, os.path.join(project_root, 'scripts')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _measure(name: str, func: Callable[[int], object], repeat: int, **params) -> dict:
+    """Run ``func(iteration)`` ``repeat`` times and summarise the wall-clock timings."""
+    timings = []
+    for iteration in range(repeat):
+        started = time.perf_counter()
+        func(iteration)
+        timings.append(time.perf_counter() - started)
+    result = {
+        'name': name,
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'max_s': max(timings),
+    }
+    if params:
+        result['params'] = params
+    print(f"{name:<32} min {result['min_s'] * 1000:>10.2f} ms   median {result['median_s'] * 1000:>10.2f} ms")
+    return result
+
+
+def _git_revision(project_root: str) -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _library_cases(paths: list[str], workdir: str, repeat: int, cache_ops: int) -> list[dict]:
+    from git import Repo
+    from app.models.stats import DashboardStats
+    from app.services.cache_service import CacheService
+    from app.services.git_service import GitService
+    from app.services.project_file_collector import collect_project_files
+    from app.utils.stats_calculator import calculate_contributors
+
+    git_service = GitService(workspace_dir=os.path.join(workdir, 'workspace'))
+    repos = [Repo(path) for path in paths]
+    commits = [commit for repo in repos for commit in git_service.get_commits(repo, max_count=None)]
+
+    results = [
+        _measure(
+            'git_service.get_commits',
+            lambda _: [git_service.get_commits(repo, max_count=None) for repo in repos],
+            repeat, repos=len(repos), commits=len(commits),
+        ),
+        _measure(
+            'dashboard_stats.from_commits',
+            lambda _: DashboardStats.from_commits(commits, len(repos)),
+            repeat, commits=len(commits),
+        ),
+        _measure(
+            'calculate_contributors',
+            lambda _: calculate_contributors(commits),
+            repeat, commits=len(commits),
+        ),
+        _measure(
+            'collect_project_files',
+            lambda _: [collect_project_files(path) for path in paths],
+            repeat, repos=len(paths),
+        ),
+    ]
+
+    cache = CacheService(
+        host=os.environ.get('REDIS_HOST', 'localhost'), port=int(os.environ.get('REDIS_PORT', 6379))
+    )
+    backend = 'redis' if cache.use_redis else 'memory'
+    payload = asdict(DashboardStats.from_commits(commits, len(repos)))
+    keys = [f"bench:summary:{i}" for i in range(cache_ops)]
+    results.append(_measure(
+        'cache_service.set',
+        lambda _: [cache.set(key, payload, ttl=60) for key in keys],
+        repeat, backend=backend, operations=cache_ops,
+    ))
+    results.append(_measure(
+        'cache_service.get',
+        lambda _: [cache.get(key) for key in keys],
+        repeat, backend=backend, operations=cache_ops,
+    ))
+    for key in keys:
+        cache.delete(key)
+    return results
+
+
+def _http_cases(paths: list[str], workdir: str, repeat: int, days: int) -> list[dict]:
+    # Config is read at import time and the app creates ./repos in the cwd
+    os.environ.update(
+        GIT_WORKSPACE=os.path.join(workdir, 'http-workspace'),
+        LOG_DIR=os.path.join(workdir, 'logs'),
+        SLOW_REQUEST_THRESHOLD_MS='-1',
+    )
+    os.chdir(workdir)
+    from app.main import app
+    logging.getLogger('code996').setLevel(logging.WARNING)
+
+    client = app.test_client()
+    projects = ','.join(paths)
+
+    def get(endpoint: str, **query) -> None:
+        response = client.get(f"/api/dashboard/{endpoint}", query_string=dict(query, projects=projects))
+        body = response.get_json()
+        if response.status_code != 200 or body.get('code') != 200:
+            raise RuntimeError(f"/{endpoint} failed: {response.status_code} {body}")
+
+    def window(iteration: int) -> dict:
+        # A distinct date window per iteration misses the response cache
+        since = date(2024, 1, 1) + timedelta(days=iteration % max(1, days - 1))
+        return {'since': since.isoformat(), 'until': (since + timedelta(days=30)).isoformat()}
+
+    # The first request copies the repositories and builds the commit indexes
+    cold_started = time.perf_counter()
+    get('summary')
+    results = [{
+        'name': 'http.summary.first_request',
+        'repeat': 1,
+        'min_s': time.perf_counter() - cold_started,
+        'params': {'projects': len(paths)},
+    }]
+    print(f"{'http.summary.first_request':<32} {results[0]['min_s'] * 1000:>14.2f} ms")
+
+    for endpoint in ('summary', 'contributors'):
+        results.append(_measure(
+            f"http.{endpoint}.uncached", lambda i, endpoint=endpoint: get(endpoint, **window(i)),
+            repeat, projects=len(paths),
+        ))
+        get(endpoint)
+        results.append(_measure(
+            f"http.{endpoint}.cached", lambda _, endpoint=endpoint: get(endpoint),
+            repeat, projects=len(paths),
+        ))
+    return results
+
+
+def _compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = {case['name']: case for case in json.load(handle)['results']}
+
+    regressions = []
+    print(f"\n{'case':<32} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for case in results:
+        previous = baseline.get(case['name'])
+        if previous is None:
+            continue
+        change = case['min_s'] / previous['min_s'] - 1 if previous['min_s'] else 0.0
+        flag = '  REGRESSION' if change > tolerance else ''
+        print(f"{case['name']:<32} {previous['min_s'] * 1000:>12.2f} {case['min_s'] * 1000:>12.2f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(case['name'])
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark suite")
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--commits", type=int, default=5000, help="Commits per synthetic project")
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365, help="Time spread of the commits")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cache-ops", type=int, default=1000, help="Keys per cache get/set round")
+    parser.add_argument("--skip-http", action="store_true", help="Only run the library-level cases")
+    parser.add_argument("--workdir", help="Reuse synthetic repositories in this directory")
+    parser.add_argument("--output", help="Result JSON path (default: bench-<timestamp>.json in the workdir)")
+    parser.add_argument("--baseline", help="Earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline before failing (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _prepare_environment(project_root)
+    # The HTTP cases change the working directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    from synthetic_repo import create_synthetic_repo
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='code996-suite-'))
+    paths = [
+        create_synthetic_repo(
+            os.path.join(workdir, f"repo_{i:03d}"),
+            commits=args.commits, authors=args.authors, files=args.files, days=args.days, seed=i,
+        )
+        for i in range(args.projects)
+    ]
+    print(f"projects={args.projects} commits/project={args.commits} authors={args.authors} "
+          f"files={args.files} days={args.days} cpus={os.cpu_count()} workdir={workdir}")
+
+    results = _library_cases(paths, workdir, args.repeat, args.cache_ops)
+    if not args.skip_http:
+        results.extend(_http_cases(paths, workdir, args.repeat, args.days))
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(project_root),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {
+            'projects': args.projects, 'commits': args.commits, 'authors': args.authors,
+            'files': args.files, 'days': args.days, 'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    output = output or os.path.join(workdir, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nresults written to {output}")
+
+    if baseline:
+        regressions = _compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+"""Load-test the dashboard under different gunicorn worker profiles.
+
+Each profile (``worker_class:workers:threads``) is started as a real gunicorn
+server on synthetic repositories and hit by concurrent clients requesting
+``/summary`` and ``/contributors`` with distinct date windows (so responses are
+computed instead of served from the response cache).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+
+def _prepare_environment(project_root: str) -> None:
+    for path in (project_root, os.path.join(project_root, 'scripts')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _parse_profile(value: str) -> tuple[str, int, int]:
+    worker_class, workers, threads = (value.split(':') + ['1', '1'])[:3]
+    return worker_class, int(workers), int(threads)
+
+
+def _start_server(project_root: str, profile: str, port: int, workdir: str) -> subprocess.Popen:
+    worker_class, workers, threads = _parse_profile(profile)
+    env = dict(
+        os.environ,
+        GIT_WORKSPACE=os.path.join(workdir, f"ws-{profile.replace(':', '-')}"),
+        LOG_DIR=os.path.join(workdir, 'logs'),
+        REDIS_HOST=os.environ.get('REDIS_HOST', '127.0.0.1'),
+    )
+    command = [
+        sys.executable, '-m', 'gunicorn', '-c', os.path.join(project_root, 'gunicorn.conf.py'),
+        '--bind', f'127.0.0.1:{port}',
+        '--worker-class', worker_class,
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--access-logfile', os.devnull,
+        '--error-logfile', os.path.join(workdir, f"gunicorn-{profile.replace(':', '-')}.log"),
+        'app.main:app',
+    ]
+    return subprocess.Popen(command, cwd=project_root, env=env, stdout=subprocess.DEVNULL)
+
+
+def _wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/dashboard/health", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become healthy")
+
+
+def _request(url: str, timeout: float) -> tuple[float, bool]:
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            ok = json.load(response).get('code') == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def _workload(base_url: str, projects: list[str], total: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    joined = ','.join(projects)
+    urls = []
+    for _ in range(total):
+        since = date(2024, 1, 1) + timedelta(days=rng.randrange(330))
+        until = since + timedelta(days=rng.randint(7, 35))
+        endpoint = 'summary' if rng.random() < 0.7 else 'contributors'
+        query = urllib.parse.urlencode({'projects': joined, 'since': since.isoformat(), 'until': until.isoformat()})
+        urls.append(f"{base_url}/api/dashboard/{endpoint}?{query}")
+    return urls
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test gunicorn worker profiles")
+    parser.add_argument("--profiles", default="sync:4:1,gthread:2:8",
+                        help="Comma separated worker_class:workers:threads")
+    parser.add_argument("--projects", type=int, default=4)
+    parser.add_argument("--commits", type=int, default=5000, help="Commits per synthetic project")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent HTTP clients")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--timeout", type=float, default=240, help="Per-request client timeout")
+    parser.add_argument("--port", type=int, default=9981)
+    parser.add_argument("--workdir", help="Reuse synthetic repositories in this directory")
+    args = parser.parse_args(argv)
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _prepare_environment(project_root)
+
+    from synthetic_repo import create_synthetic_repo
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='code996-load-')
+    projects = [
+        create_synthetic_repo(os.path.join(workdir, f"repo_{i:03d}"), commits=args.commits, seed=i)
+        for i in range(args.projects)
+    ]
+
+    print(f"projects={args.projects} commits/project={args.commits} clients={args.clients} "
+          f"requests={args.requests} cpus={os.cpu_count()} workdir={workdir}")
+    print(f"{'profile':<18} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+
+    for profile in args.profiles.split(','):
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = _start_server(project_root, profile, args.port, workdir)
+        try:
+            _wait_ready(base_url)
+            # The first request copies the repositories and builds the indexes; not measured
+            warm = _workload(base_url, projects, 1, seed=-1)[0]
+            _request(warm, args.timeout)
+
+            urls = _workload(base_url, projects, args.requests, seed=0)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.clients) as executor:
+                results = list(executor.map(lambda url: _request(url, args.timeout), urls))
+            elapsed = time.perf_counter() - started
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+        latencies = [latency * 1000 for latency, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        print(f"{profile:<18} {len(results) / elapsed:>8.1f} {_percentile(latencies, 0.5):>8.0f} "
+              f"{_percentile(latencies, 0.95):>8.0f} {_percentile(latencies, 0.99):>8.0f} {errors:>7}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -18,12 +18,10 @@ def _resolve_project_ids(projects: Iterable[str]) -> list[str]:
 
     ids: list[str] = []
 
+    projects = [project.strip() for project in projects if project.strip()]
+    entries = project_registry.get_entries(projects)
     for project in projects:
-        project = project.strip()
-        if not project:
-            continue
-
-        entry = project_registry.get_entry(project)
+        entry = entries[project]
         if entry:
             ids.append(entry.project_id)
         else:
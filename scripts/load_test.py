@@ -0,0 +1,361 @@
+"""Replay realistic dashboard traffic against a local stack and report latency.
+
+The runner generates synthetic repositories, starts a stand-in for
+``AI_ANALYZER_ENDPOINT`` (configurable latency and error rate), launches the
+app under gunicorn and drives it with ``--clients`` concurrent users for
+``--duration`` seconds. Each user repeatedly picks a scenario by weight.
+
+Scenarios are JSON lines (``--scenarios``; the built-in mix is used otherwise)::
+
+    {"name": "summary", "path": "/api/dashboard/summary", "weight": 40,
+     "params": {"projects": "$projects", "since": "$since", "until": "$until"}}
+
+Parameter values may use ``$projects`` (all projects, comma separated),
+``$project`` (one random project), ``$since`` / ``$until`` (a random window
+inside the commit history). A scenario with ``"storm": N`` fires N identical
+requests at once for a date window nobody has requested yet, which is what a
+hot response-cache key expiring under load looks like.
+
+Pass ``--base-url`` to target an already running stack instead; the project
+names then come from ``--project-names``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SCENARIOS = [
+    {"name": "summary", "path": "/api/dashboard/summary", "weight": 40,
+     "params": {"projects": "$projects", "since": "$since", "until": "$until"}},
+    {"name": "summary_default_window", "path": "/api/dashboard/summary", "weight": 20,
+     "params": {"projects": "$projects"}},
+    {"name": "contributors", "path": "/api/dashboard/contributors", "weight": 20,
+     "params": {"projects": "$projects", "since": "$since", "until": "$until"}},
+    {"name": "ai_ratio", "path": "/api/ai-ratio", "weight": 10,
+     "params": {"repo": "$project"}},
+    {"name": "summary_force_refresh", "path": "/api/dashboard/summary", "weight": 3,
+     "params": {"projects": "$project", "force_refresh": "true"}},
+    {"name": "ai_ratio_force_refresh", "path": "/api/ai-ratio", "weight": 1,
+     "params": {"repo": "$project", "force_refresh": "true"}},
+    {"name": "summary_expiry_storm", "path": "/api/dashboard/summary", "weight": 2, "storm": 16,
+     "params": {"projects": "$projects", "since": "$since", "until": "$until"}},
+]
+
+
+def _prepare_environment(project_root: str) -> None:
+    for path in (project_root, os.path.join(project_root, 'scripts')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+# ----------------------------------------------------------------------
+# Mock LLM
+# ----------------------------------------------------------------------
+class MockLLM:
+    """OpenAI-style chat completions stand-in that answers with a percentage."""
+
+    def __init__(self, port: int, latency: float, jitter: float, error_rate: float, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, name='mock-llm', daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+    def _decide(self) -> tuple[float, bool]:
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return delay, failed
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                delay, failed = mock._decide()
+                time.sleep(delay)
+                if failed:
+                    body, status = b'{"error": "mock failure"}', 500
+                else:
+                    percentage = mock._rng.randint(0, 100)
+                    body = json.dumps({"choices": [{"message": {"content": f"{percentage}%"}}]}).encode()
+                    status = 200
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ----------------------------------------------------------------------
+# App under test
+# ----------------------------------------------------------------------
+def _start_server(project_root: str, args, workdir: str, llm_endpoint: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        GIT_WORKSPACE=os.path.join(workdir, 'workspace'),
+        LOG_DIR=os.path.join(workdir, 'logs'),
+        METRICS_MULTIPROC_DIR=os.path.join(workdir, 'metrics'),
+        AI_ANALYZER_ENDPOINT=llm_endpoint,
+        AI_ANALYZER_TIMEOUT=str(args.llm_timeout),
+        REDIS_HOST=os.environ.get('REDIS_HOST', '127.0.0.1'),
+        # Keep the run's cache keys out of the database the real stack uses
+        REDIS_DB=str(args.redis_db),
+        PYTHONPATH=os.pathsep.join(filter(None, [project_root, os.environ.get('PYTHONPATH')])),
+    )
+    # gunicorn.conf.py chdirs to the project root; run from the workdir instead so
+    # nothing the app resolves relative to the cwd ends up in the real workspace
+    command = [
+        sys.executable, '-m', 'gunicorn', '-c', os.path.join(project_root, 'gunicorn.conf.py'),
+        '--chdir', workdir,
+        '--bind', f'127.0.0.1:{args.port}',
+        '--worker-class', args.worker_class,
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--access-logfile', os.devnull,
+        '--error-logfile', os.path.join(workdir, 'gunicorn.log'),
+        'app.main:app',
+    ]
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+
+
+def _wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/dashboard/health", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become healthy")
+
+
+# ----------------------------------------------------------------------
+# Load generation
+# ----------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: dict[str, list[tuple[float, bool]]] = {}
+
+    def add(self, name: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.samples.setdefault(name, []).append((latency, ok))
+
+
+def _request(url: str, timeout: float) -> tuple[float, bool]:
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = json.load(response)
+            # /ai-ratio returns the bare result dict, the dashboard routes the envelope
+            ok = body.get('code', 200) == 200
+    except (OSError, ValueError, urllib.error.HTTPError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def _render(scenario: dict, projects: list[str], rng: random.Random, history_days: int) -> str:
+    since = date(2024, 1, 1) + timedelta(days=rng.randrange(max(1, history_days - 7)))
+    until = since + timedelta(days=rng.randint(7, 60))
+    values = {
+        '$projects': ','.join(projects),
+        '$project': rng.choice(projects),
+        '$since': since.isoformat(),
+        '$until': until.isoformat(),
+    }
+    params = {key: values.get(value, value) for key, value in scenario.get('params', {}).items()}
+    return f"{scenario['path']}?{urllib.parse.urlencode(params)}"
+
+
+def _client(base_url: str, scenarios: list[dict], projects: list[str], recorder: Recorder,
+            deadline: float, timeout: float, history_days: int, seed: int) -> None:
+    rng = random.Random(seed)
+    weights = [scenario.get('weight', 1) for scenario in scenarios]
+    while time.time() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        url = base_url + _render(scenario, projects, rng, history_days)
+        storm = scenario.get('storm')
+        if storm:
+            with ThreadPoolExecutor(max_workers=storm) as executor:
+                for latency, ok in executor.map(lambda _: _request(url, timeout), range(storm)):
+                    recorder.add(scenario['name'], latency, ok)
+        else:
+            latency, ok = _request(url, timeout)
+            recorder.add(scenario['name'], latency, ok)
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summarise(name: str, samples: list[tuple[float, bool]], elapsed: float) -> dict:
+    latencies = [latency * 1000 for latency, _ in samples]
+    return {
+        'name': name,
+        'requests': len(samples),
+        'errors': sum(1 for _, ok in samples if not ok),
+        'throughput_rps': len(samples) / elapsed,
+        'p50_ms': _percentile(latencies, 0.50),
+        'p95_ms': _percentile(latencies, 0.95),
+        'p99_ms': _percentile(latencies, 0.99),
+        'max_ms': max(latencies),
+    }
+
+
+def _load_scenarios(path: str | None) -> list[dict]:
+    if not path:
+        return DEFAULT_SCENARIOS
+    with open(path, encoding='utf-8') as handle:
+        return [json.loads(line) for line in handle if line.strip() and not line.lstrip().startswith('#')]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay dashboard traffic against a local stack")
+    parser.add_argument("--scenarios", help="JSON lines scenario file (default: built-in mix)")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load after warm-up")
+    parser.add_argument("--timeout", type=float, default=240, help="Per-request client timeout")
+    parser.add_argument("--projects", type=int, default=4)
+    parser.add_argument("--commits", type=int, default=5000, help="Commits per synthetic project")
+    parser.add_argument("--days", type=int, default=365, help="Time spread of the commits")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--worker-class", default="gthread")
+    parser.add_argument("--port", type=int, default=9982)
+    parser.add_argument("--llm-port", type=int, default=0, help="Mock LLM port (0 = any free port)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Mean mock LLM latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Std deviation of the latency (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.02)
+    parser.add_argument("--llm-timeout", type=int, default=60, help="AI_ANALYZER_TIMEOUT for the app")
+    parser.add_argument("--redis-db", type=int, default=15,
+                        help="Redis database for the server's response cache (keep it off the real one)")
+    parser.add_argument("--base-url", help="Target an already running stack (no repos / server started)")
+    parser.add_argument("--project-names", help="Comma separated projects for --base-url")
+    parser.add_argument("--workdir", help="Reuse synthetic repositories in this directory")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _prepare_environment(project_root)
+    scenarios = _load_scenarios(args.scenarios)
+
+    llm = server = None
+    if args.base_url:
+        if not args.project_names:
+            parser.error("--base-url requires --project-names")
+        base_url = args.base_url.rstrip('/')
+        projects = [name.strip() for name in args.project_names.split(',') if name.strip()]
+    else:
+        from synthetic_repo import create_synthetic_repo
+
+        workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='code996-load-'))
+        projects = [
+            create_synthetic_repo(
+                os.path.join(workdir, f"repo_{i:03d}"), commits=args.commits, days=args.days, seed=i
+            )
+            for i in range(args.projects)
+        ]
+        llm = MockLLM(args.llm_port, args.llm_latency, args.llm_jitter, args.llm_error_rate, seed=args.seed)
+        llm.start()
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = _start_server(project_root, args, workdir, llm.endpoint)
+
+    recorder = Recorder()
+    try:
+        if server is not None:
+            _wait_ready(base_url)
+        # Clone / index every project once so the run measures steady state
+        for project in projects:
+            _request(f"{base_url}/api/dashboard/summary?{urllib.parse.urlencode({'projects': project})}", args.timeout)
+
+        started = time.time()
+        deadline = started + args.duration
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            futures = [
+                executor.submit(_client, base_url, scenarios, projects, recorder, deadline,
+                                args.timeout, args.days, args.seed + i)
+                for i in range(args.clients)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.time() - started
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        if llm is not None:
+            llm.stop()
+
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    if not all_samples:
+        print("no requests completed")
+        return 1
+    rows = [_summarise(name, samples, elapsed) for name, samples in sorted(recorder.samples.items())]
+    total = _summarise('TOTAL', all_samples, elapsed)
+
+    print(f"clients={args.clients} duration={elapsed:.0f}s projects={len(projects)} cpus={os.cpu_count()}")
+    if llm is not None:
+        print(f"mock llm: latency={args.llm_latency}s±{args.llm_jitter}s error_rate={args.llm_error_rate} "
+              f"calls={llm.requests} failed={llm.errors}")
+    print(f"{'scenario':<26} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for row in rows + [total]:
+        print(f"{row['name']:<26} {row['requests']:>8} {row['errors']:>7} {row['throughput_rps']:>8.1f} "
+              f"{row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} {row['p99_ms']:>8.0f}")
+
+    if args.output:
+        report = {
+            'config': {key: value for key, value in vars(args).items() if key != 'output'},
+            'elapsed_s': elapsed,
+            'mock_llm': {'calls': llm.requests, 'failed': llm.errors} if llm is not None else None,
+            'scenarios': rows,
+            'total': total,
+        }
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+"""Generate synthetic git repositories for benchmarks (via git fast-import)."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+
+def create_synthetic_repo(
+    path: str,
+    commits: int = 2000,
+    authors: int = 20,
+    files: int = 200,
+    start: datetime | None = None,
+    days: int = 365,
+    seed: int = 0,
+) -> str:
+    """Create (or reuse) a repository with ``commits`` linear commits on ``main``."""
+    if os.path.isdir(os.path.join(path, '.git')):
+        return path
+
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(['git', 'init', '-q', '-b', 'main', path], check=True)
+
+    rng = random.Random(seed)
+    start = start or datetime(2024, 1, 1, tzinfo=timezone(timedelta(hours=8)))
+    contents: dict[str, list[str]] = {}
+    stream: list[bytes] = []
+
+    timestamps = sorted(
+        start + timedelta(seconds=rng.randrange(days * 24 * 3600)) for _ in range(commits)
+    )
+    for mark, timestamp in enumerate(timestamps, start=1):
+        author = rng.randrange(authors)
+        epoch = int(timestamp.timestamp())
+        tz = timestamp.strftime('%z')
+        message = f"change {mark}\n".encode()
+
+        stream.append(b'commit refs/heads/main\n')
+        stream.append(f'mark :{mark}\n'.encode())
+        stream.append(f'author Author {author} <author{author}@example.com> {epoch} {tz}\n'.encode())
+        stream.append(f'committer Author {author} <author{author}@example.com> {epoch} {tz}\n'.encode())
+        stream.append(f'data {len(message)}\n'.encode() + message)
+        if mark > 1:
+            stream.append(f'from :{mark - 1}\n'.encode())
+
+        for _ in range(rng.randint(1, 3)):
+            name = f"src/module_{rng.randrange(files)}.py"
+            lines = contents.setdefault(name, [])
+            for _ in range(rng.randint(0, min(5, len(lines)))):
+                lines.pop(rng.randrange(len(lines)))
+            lines.extend(f"value_{mark}_{i} = {rng.random()}" for i in range(rng.randint(1, 20)))
+            data = ('\n'.join(lines) + '\n').encode()
+            stream.append(f'M 100644 inline {name}\n'.encode())
+            stream.append(f'data {len(data)}\n'.encode() + data)
+        stream.append(b'\n')
+
+    subprocess.run(
+        ['git', 'fast-import', '--quiet'], input=b''.join(stream), cwd=path, check=True
+    )
+    subprocess.run(['git', 'checkout', '-q', '-f', 'main'], cwd=path, check=True)
+    return path
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Create synthetic git repositories")
+    parser.add_argument("target", help="Directory to create the repositories in")
+    parser.add_argument("--repos", type=int, default=1)
+    parser.add_argument("--commits", type=int, default=2000)
+    parser.add_argument("--authors", type=int, default=20)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365, help="Time spread of the commits")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for index in range(args.repos):
+        path = os.path.join(args.target, f"repo_{index:03d}")
+        create_synthetic_repo(
+            path, commits=args.commits, authors=args.authors, files=args.files, days=args.days,
+            seed=args.seed + index,
+        )
+        sys.stdout.write(path + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())